@@ -0,0 +1,523 @@
+'''
+Analizador rápido para el fragmento de lógica de primer orden (lpo)
+que usa groundedPL: all, exists, -, &, |, ->, <->, =, != y
+aplicación de predicados. Las variables cuantificadas pueden anotarse
+con un dominio declarado en el Modelo: all x:fila.phi
+
+Los nodos usan __slots__ y los símbolos (variables, constantes y
+predicados) están internados, de modo que dos apariciones del mismo
+nombre son el mismo objeto. Los nombres de las clases de fórmulas
+coinciden con los de nltk.sem.logic para que LogUtils.obtener_type,
+Modelo.fundamentar y Modelo.codificar_lp las traten igual.
+'''
+import re
+import nltk
+
+from typing import Dict, List, Set, Tuple
+
+
+class Simbolo:
+    '''
+    Símbolo internado: existe una sola instancia por clase y nombre.
+    '''
+    __slots__ = ('name',)
+    _internados: Dict[str, 'Simbolo'] = {}
+
+    def __new__(cls, name:str):
+        try:
+            return cls._internados[name]
+        except KeyError:
+            simbolo = super().__new__(cls)
+            simbolo.name = name
+            cls._internados[name] = simbolo
+            return simbolo
+
+    def __getnewargs__(self):
+        return (self.name,)
+
+    @property
+    def variable(self):
+        # Compatibilidad con nltk, donde los términos exponen .variable.name
+        return self
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.name})'
+
+
+class Variable(Simbolo):
+    '''
+    Variable individual o de evento.
+    '''
+    __slots__ = ()
+    _internados = {}
+
+
+class ConstantExpression(Simbolo):
+    '''
+    Constante de individuo o de evento.
+    '''
+    __slots__ = ()
+    _internados = {}
+
+
+class Predicate(Simbolo):
+    '''
+    Símbolo de predicado.
+    '''
+    __slots__ = ()
+    _internados = {}
+
+
+class Formula:
+    '''
+    Clase base de las fórmulas del analizador.
+    '''
+    __slots__ = ()
+
+    def _clave(self) -> tuple:
+        '''
+        Valores que identifican la fórmula: por defecto, los atributos de
+        __slots__ de todas sus clases, de la base a la derivada. Las
+        subclases lo redefinen para no recorrer la jerarquía.
+        '''
+        return tuple(
+            getattr(self, atributo)
+                for clase in reversed(type(self).__mro__)
+                for atributo in clase.__dict__.get('__slots__', ())
+        )
+
+    def __eq__(self, otra):
+        return type(self) is type(otra) and self._clave() == otra._clave()
+
+    def __hash__(self):
+        return hash((type(self).__name__,) + self._clave())
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self}>'
+
+
+class ApplicationExpression(Formula):
+    '''
+    Predicado aplicado a una tupla de términos.
+    '''
+    __slots__ = ('pred', 'args')
+
+    def __init__(self, pred:Predicate, args:Tuple[Simbolo, ...]):
+        self.pred = pred
+        self.args = tuple(args)
+
+    def _clave(self) -> tuple:
+        return (self.pred, self.args)
+
+    def free(self) -> Set[Variable]:
+        return {x for x in self.args if isinstance(x, Variable)}
+
+    def constants(self) -> Set[ConstantExpression]:
+        return {x for x in self.args if isinstance(x, ConstantExpression)}
+
+    def predicates(self) -> Set[Predicate]:
+        return {self.pred}
+
+    def replace(self, variable:Variable, expresion:Simbolo) -> 'ApplicationExpression':
+        if variable not in self.args:
+            return self
+        args = tuple(expresion if x is variable else x for x in self.args)
+        return ApplicationExpression(self.pred, args)
+
+    def __str__(self):
+        return f'{self.pred}({",".join(x.name for x in self.args)})'
+
+
+class EqualityExpression(Formula):
+    '''
+    Igualdad entre dos términos.
+    '''
+    __slots__ = ('first', 'second')
+
+    def __init__(self, first:Simbolo, second:Simbolo):
+        self.first = first
+        self.second = second
+
+    def _clave(self) -> tuple:
+        return (self.first, self.second)
+
+    def free(self) -> Set[Variable]:
+        return {x for x in (self.first, self.second) if isinstance(x, Variable)}
+
+    def constants(self) -> Set[ConstantExpression]:
+        return {x for x in (self.first, self.second) if isinstance(x, ConstantExpression)}
+
+    def predicates(self) -> Set[Predicate]:
+        return set()
+
+    def replace(self, variable:Variable, expresion:Simbolo) -> 'EqualityExpression':
+        first = expresion if self.first is variable else self.first
+        second = expresion if self.second is variable else self.second
+        if first is self.first and second is self.second:
+            return self
+        return EqualityExpression(first, second)
+
+    def __str__(self):
+        return f'({self.first} = {self.second})'
+
+
+class NegatedExpression(Formula):
+    '''
+    Negación de una fórmula.
+    '''
+    __slots__ = ('term',)
+
+    def __init__(self, term:Formula):
+        self.term = term
+
+    def _clave(self) -> tuple:
+        return (self.term,)
+
+    def free(self) -> Set[Variable]:
+        return self.term.free()
+
+    def constants(self) -> Set[ConstantExpression]:
+        return self.term.constants()
+
+    def predicates(self) -> Set[Predicate]:
+        return self.term.predicates()
+
+    def replace(self, variable:Variable, expresion:Simbolo) -> 'NegatedExpression':
+        term = self.term.replace(variable, expresion)
+        return self if term is self.term else NegatedExpression(term)
+
+    def __str__(self):
+        return f'-{self.term}'
+
+
+class BinaryExpression(Formula):
+    '''
+    Clase base de los conectivos binarios.
+    '''
+    __slots__ = ('first', 'second')
+    operador = None
+
+    def __init__(self, first:Formula, second:Formula):
+        self.first = first
+        self.second = second
+
+    def _clave(self) -> tuple:
+        return (self.first, self.second)
+
+    def free(self) -> Set[Variable]:
+        return self.first.free() | self.second.free()
+
+    def constants(self) -> Set[ConstantExpression]:
+        return self.first.constants() | self.second.constants()
+
+    def predicates(self) -> Set[Predicate]:
+        return self.first.predicates() | self.second.predicates()
+
+    def replace(self, variable:Variable, expresion:Simbolo) -> 'BinaryExpression':
+        first = self.first.replace(variable, expresion)
+        second = self.second.replace(variable, expresion)
+        if first is self.first and second is self.second:
+            return self
+        return type(self)(first, second)
+
+    def __str__(self):
+        return f'({self.first} {self.operador} {self.second})'
+
+
+class AndExpression(BinaryExpression):
+    __slots__ = ()
+    operador = '&'
+
+
+class OrExpression(BinaryExpression):
+    __slots__ = ()
+    operador = '|'
+
+
+class ImpExpression(BinaryExpression):
+    __slots__ = ()
+    operador = '->'
+
+
+class IffExpression(BinaryExpression):
+    __slots__ = ()
+    operador = '<->'
+
+
+class QuantifiedExpression(Formula):
+    '''
+    Clase base de los cuantificadores. dominio es el nombre opcional
+    del dominio (sort) sobre el que se cuantifica, como en all x:fila.phi
+    '''
+    __slots__ = ('variable', 'term', 'dominio')
+    cuantificador = None
+
+    def __init__(self, variable:Variable, term:Formula, dominio:str=None):
+        self.variable = variable
+        self.term = term
+        self.dominio = dominio
+
+    def _clave(self) -> tuple:
+        return (self.variable, self.term, self.dominio)
+
+    def free(self) -> Set[Variable]:
+        return self.term.free() - {self.variable}
+
+    def constants(self) -> Set[ConstantExpression]:
+        return self.term.constants()
+
+    def predicates(self) -> Set[Predicate]:
+        return self.term.predicates()
+
+    def replace(self, variable:Variable, expresion:Simbolo) -> 'QuantifiedExpression':
+        if variable is self.variable:
+            # La variable está ligada por este cuantificador
+            return self
+        term = self.term.replace(variable, expresion)
+        return self if term is self.term else type(self)(self.variable, term, self.dominio)
+
+    def __str__(self):
+        if self.dominio is None:
+            return f'{self.cuantificador} {self.variable}.{self.term}'
+        return f'{self.cuantificador} {self.variable}:{self.dominio}.{self.term}'
+
+
+class AllExpression(QuantifiedExpression):
+    __slots__ = ()
+    cuantificador = 'all'
+
+
+class ExistsExpression(QuantifiedExpression):
+    __slots__ = ()
+    cuantificador = 'exists'
+
+
+class AnalizadorLPO:
+    '''
+    Analizador sintáctico iterativo (shunting-yard) con la misma
+    precedencia y asociatividad que nltk.sem.logic.LogicParser:
+    de más fuerte a más débil -, =, cuantificadores, &, |, ->, <->,
+    todos los binarios asociando a la izquierda.
+    '''
+
+    _token = re.compile(r'\s*(<->|->|!=|[()&|.,:=\-∧∨→↔¬]|[^\s()&|.,:=\-∧∨→↔¬!<>]+)')
+    _indvar = re.compile(r'^[a-df-z]\d*$')
+    _eventvar = re.compile(r'^e\d*$')
+    _cuantificadores = {
+        'all': AllExpression,
+        'forall': AllExpression,
+        'exists': ExistsExpression,
+        'exist': ExistsExpression,
+        'some': ExistsExpression,
+    }
+    _binarios = {
+        '=': 4, '!=': 4,
+        '&': 6, '∧': 6, 'and': 6,
+        '|': 7, '∨': 7, 'or': 7,
+        '->': 8, '→': 8, 'implies': 8,
+        '<->': 9, '↔': 9, 'iff': 9,
+    }
+    _conectivos = {
+        6: AndExpression,
+        7: OrExpression,
+        8: ImpExpression,
+        9: IffExpression,
+    }
+    _prec_negacion = 2
+    _prec_cuantificador = 5
+
+    def tokenizar(self, cadena:str) -> List[str]:
+        '''
+        Divide una cadena en tokens.
+        '''
+        cadena = cadena.strip()
+        tokens = []
+        pos = 0
+        while pos < len(cadena):
+            m = self._token.match(cadena, pos)
+            if m is None:
+                raise Exception(f'¡Caracter inválido en la posición {pos}! ({cadena[pos:pos+10]})')
+            tokens.append(m.group(1))
+            pos = m.end()
+            while pos < len(cadena) and cadena[pos].isspace():
+                pos += 1
+        return tokens
+
+    def termino(self, nombre:str) -> Simbolo:
+        '''
+        Clasifica un nombre como variable o constante siguiendo
+        la convención de nltk.
+        '''
+        if self._indvar.match(nombre) or self._eventvar.match(nombre):
+            return Variable(nombre)
+        return ConstantExpression(nombre)
+
+    def parse(self, cadena:str) -> Formula:
+        '''
+        Toma una cadena y devuelve la fórmula correspondiente.
+        Input:
+            - cadena, fórmula en notación de nltk
+        Output:
+            - formula, objeto Formula del analizador
+        '''
+        tokens = self.tokenizar(cadena)
+        operandos = []
+        # Pila de operadores: ('(',), ('-',), ('q', clase, variable, dominio) o ('b', precedencia, token)
+        operadores = []
+        espera_operando = True
+        i = 0
+        n = len(tokens)
+        while i < n:
+            tok = tokens[i]
+            if espera_operando:
+                if tok == '(':
+                    operadores.append(('(',))
+                elif tok in ('-', '¬', 'not'):
+                    operadores.append(('-',))
+                elif tok in self._cuantificadores:
+                    clase = self._cuantificadores[tok]
+                    i += 1
+                    variables = []
+                    while i < n and tokens[i] != '.':
+                        # Cada variable puede llevar un dominio: x:fila
+                        if i + 2 < n and tokens[i + 1] == ':':
+                            variables.append((Variable(tokens[i]), tokens[i + 2]))
+                            i += 3
+                        else:
+                            variables.append((Variable(tokens[i]), None))
+                            i += 1
+                    if i == n or len(variables) == 0:
+                        raise Exception(f'¡Cuantificador mal formado en {cadena}!')
+                    for v, dominio in variables:
+                        operadores.append(('q', clase, v, dominio))
+                elif tok in self._binarios or tok in (')', ',', '.'):
+                    raise Exception(f'¡Token inesperado {tok} en {cadena}!')
+                else:
+                    if i + 1 < n and tokens[i + 1] == '(':
+                        args = []
+                        i += 2
+                        while i < n and tokens[i] != ')':
+                            if tokens[i] != ',':
+                                args.append(self.termino(tokens[i]))
+                            i += 1
+                        if i == n:
+                            raise Exception(f'¡Falta cerrar paréntesis en {cadena}!')
+                        operandos.append(ApplicationExpression(Predicate(tok), tuple(args)))
+                    else:
+                        operandos.append(self.termino(tok))
+                    espera_operando = False
+            else:
+                if tok == ')':
+                    while operadores and operadores[-1][0] != '(':
+                        self._reducir(operadores.pop(), operandos)
+                    if not operadores:
+                        raise Exception(f'¡Paréntesis desbalanceados en {cadena}!')
+                    operadores.pop()
+                elif tok in self._binarios:
+                    prec = self._binarios[tok]
+                    # Si el último operando es un término, solo puede ser el
+                    # primer lado de una igualdad: como en nltk, -a = b es -(a = b)
+                    while operadores and operadores[-1][0] != '(' and self._precedencia(operadores[-1]) <= prec \
+                            and not (prec == 4 and isinstance(operandos[-1], Simbolo)):
+                        self._reducir(operadores.pop(), operandos)
+                    operadores.append(('b', prec, tok))
+                    espera_operando = True
+                else:
+                    raise Exception(f'¡Token inesperado {tok} en {cadena}!')
+            i += 1
+        if espera_operando:
+            raise Exception(f'¡Fórmula incompleta! ({cadena})')
+        while operadores:
+            op = operadores.pop()
+            if op[0] == '(':
+                raise Exception(f'¡Paréntesis desbalanceados en {cadena}!')
+            self._reducir(op, operandos)
+        formula = operandos.pop()
+        if not isinstance(formula, Formula):
+            raise Exception(f'¡Se esperaba una fórmula y se obtuvo el término {formula}!')
+        return formula
+
+    def _precedencia(self, op:tuple) -> int:
+        if op[0] == '-':
+            return self._prec_negacion
+        elif op[0] == 'q':
+            return self._prec_cuantificador
+        return op[1]
+
+    def _reducir(self, op:tuple, operandos:list):
+        if op[0] == '-':
+            operandos.append(NegatedExpression(self._formula(operandos.pop())))
+        elif op[0] == 'q':
+            operandos.append(op[1](op[2], self._formula(operandos.pop()), op[3]))
+        else:
+            second = operandos.pop()
+            first = operandos.pop()
+            prec, tok = op[1], op[2]
+            if prec == 4:
+                if not (isinstance(first, Simbolo) and isinstance(second, Simbolo)):
+                    raise Exception(f'¡La igualdad solo se admite entre términos! ({first} {tok} {second})')
+                igualdad = EqualityExpression(first, second)
+                operandos.append(igualdad if tok == '=' else NegatedExpression(igualdad))
+            else:
+                operandos.append(self._conectivos[prec](self._formula(first), self._formula(second)))
+
+    def _formula(self, x) -> Formula:
+        if not isinstance(x, Formula):
+            raise Exception(f'¡Se esperaba una fórmula y se obtuvo el término {x}!')
+        return x
+
+    @staticmethod
+    def desde_nltk(expresion:nltk.sem.logic.Expression) -> Formula:
+        '''
+        Adaptador que convierte una fórmula de nltk en una fórmula
+        del analizador.
+        Input:
+            - expresion, objeto Expression de nltk
+        Output:
+            - formula, objeto Formula del analizador
+        '''
+        logic = nltk.sem.logic
+        if isinstance(expresion, logic.ApplicationExpression):
+            funcion, argumentos = expresion.uncurry()
+            args = tuple(AnalizadorLPO._termino_nltk(x) for x in argumentos)
+            return ApplicationExpression(Predicate(str(funcion)), args)
+        elif isinstance(expresion, logic.EqualityExpression):
+            # nltk lee -a = b como (-a) = b; aquí es -(a = b)
+            first, negaciones = expresion.first, 0
+            while isinstance(first, logic.NegatedExpression):
+                first, negaciones = first.term, negaciones + 1
+            formula = EqualityExpression(
+                AnalizadorLPO._termino_nltk(first),
+                AnalizadorLPO._termino_nltk(expresion.second)
+            )
+            for _ in range(negaciones):
+                formula = NegatedExpression(formula)
+            return formula
+        elif isinstance(expresion, logic.NegatedExpression):
+            return NegatedExpression(AnalizadorLPO.desde_nltk(expresion.term))
+        elif isinstance(expresion, logic.AllExpression):
+            return AllExpression(Variable(expresion.variable.name), AnalizadorLPO.desde_nltk(expresion.term))
+        elif isinstance(expresion, logic.ExistsExpression):
+            return ExistsExpression(Variable(expresion.variable.name), AnalizadorLPO.desde_nltk(expresion.term))
+        for clase_nltk, clase in [
+            (logic.AndExpression, AndExpression),
+            (logic.OrExpression, OrExpression),
+            (logic.ImpExpression, ImpExpression),
+            (logic.IffExpression, IffExpression),
+        ]:
+            if isinstance(expresion, clase_nltk):
+                first = AnalizadorLPO.desde_nltk(expresion.first)
+                second = AnalizadorLPO.desde_nltk(expresion.second)
+                return clase(first, second)
+        raise Exception(f'¡Tipo de expresión desconocido! {type(expresion).__name__}')
+
+    @staticmethod
+    def _termino_nltk(x:nltk.sem.logic.Expression) -> Simbolo:
+        if isinstance(x, nltk.sem.logic.ConstantExpression):
+            return ConstantExpression(x.variable.name)
+        elif isinstance(x, nltk.sem.logic.AbstractVariableExpression):
+            return Variable(x.variable.name)
+        raise Exception(f'¡Término no soportado! {x}')
@@ -1,20 +1,29 @@
 import nltk
 import numpy as np
 
+from contextlib import contextmanager
+
 from nltk.sem.logic import LogicParser, Expression
 from typing import (
-	List, Optional, Tuple
+	Dict, List, Optional, Tuple
 )
 
 from groundedPL.logClases import *
 from groundedPL.logUtils import LogUtils
+from groundedPL.analizador import AnalizadorLPO, Formula, ConstantExpression
+from groundedPL.analizador import NegatedExpression as NegatedExpressionLPO
 
 class ToPropositionalLogic:
      
-    def __init__(self) -> None:
+    def __init__(self, rapido:bool=True) -> None:
         self.parser = LogicParser()
+        self.analizador = AnalizadorLPO()
+        # Si rapido es True se usa AnalizadorLPO en lugar del parser de nltk
+        self.rapido = rapido
         self.debug = False
         self.modelo_lp = Modelo()
+        # Axiomas de clases no vacías por tupla de predicados unarios
+        self.axiomas_no_vacias = {}
         self.leer_conectivo = {
             '>': ' > ',
             '∧': ' Y ',
@@ -28,15 +37,40 @@ class ToPropositionalLogic:
             '∨': ' | '
         }
 
-    def parse(self, sentence:str) -> str:
+    def a_formula(self, sentence:str):
+        '''
+        Toma una oración (cadena, Expression de nltk o Formula) y
+        devuelve la fórmula sin variables libres que se va a fundamentar.
+        '''
         if isinstance(sentence, str):
-            sentence_lp = self.parser.parse(sentence)
-        elif not isinstance(sentence, Expression):
-            raise Exception(f'Error: Expected {sentence} to be of type either string or nltk.sem.logic.Expression')
-        else:
+            if self.rapido:
+                sentence_lp = self.analizador.parse(sentence)
+            else:
+                sentence_lp = LogUtils.negar_igualdades(self.parser.parse(sentence))
+        elif isinstance(sentence, Expression):
+            sentence_lp = LogUtils.negar_igualdades(sentence)
+            if self.rapido:
+                sentence_lp = self.analizador.desde_nltk(sentence_lp)
+        elif isinstance(sentence, Formula):
             sentence_lp = sentence
+        else:
+            raise Exception(f'Error: Expected {sentence} to be of type either string, nltk.sem.logic.Expression or Formula')
         assert(len(sentence_lp.free()) == 0), f'Fórmula con variables libres: {sentence_lp}\n\{sentence_lp.free()}'
+        return sentence_lp
+
+    def preparar(self, sentence:str):
+        '''
+        Paso previo a fundamentar: analiza la oración, agrega su
+        vocabulario al modelo y skolemiza sus existenciales sobre
+        dominios abiertos (ver Modelo.skolemizar). Aplicar parse o
+        parse_clausal a su resultado no lo vuelve a cambiar.
+        '''
+        sentence_lp = self.a_formula(sentence)
         self.modelo_lp.poblar_con(sentence_lp)
+        return self.modelo_lp.skolemizar(sentence_lp)
+
+    def parse(self, sentence:str) -> str:
+        sentence_lp = self.preparar(sentence)
         formula_fundamentada = self.modelo_lp.fundamentar(sentence_lp)
         formula_lp = self.modelo_lp.codificar_lp(formula_fundamentada)
         if self.debug:
@@ -47,6 +81,19 @@ class ToPropositionalLogic:
             print(f'La fórmula codificada es:\n{formula_lp}')
         return formula_lp
 
+    def parse_clausal(self, sentence:str, procesos:Optional[int]=None) -> Tuple[List[List[str]], List[str]]:
+        '''
+        Como parse, pero fundamenta y aplica Tseitin en paralelo
+        (ver groundedPL.paralelo).
+        Output:
+            - clausal, lista de listas de literales
+            - atomos, lista de letras proposicionales de la fórmula fundamentada
+        '''
+        # Importación local: paralelo depende de tseitin, que importa este módulo
+        from groundedPL.paralelo import fundamentar_en_paralelo
+        sentence_lp = self.preparar(sentence)
+        return fundamentar_en_paralelo(self.modelo_lp, sentence_lp, procesos=procesos)
+
     def to_nltk(self, sentence:str) -> Expression:
          return self.parser.parse(sentence)
 
@@ -102,13 +149,29 @@ class ToPropositionalLogic:
     def clases_no_vacias(self, sentence:str) -> str:
         sentence_lp = self.parser.parse(sentence)
         afirmacion_existencial = LogUtils.predicados_a_existenciales(sentence_lp)         
-        afirmacion_existencial = LogUtils.existenciales_a_constantes(afirmacion_existencial)
+        if afirmacion_existencial is not None:
+            afirmacion_existencial = LogUtils.existenciales_a_constantes(afirmacion_existencial)
         if afirmacion_existencial is None:
             formula_clases_no_vacias = sentence
         else:
             formula_clases_no_vacias = f'({sentence_lp} & {afirmacion_existencial})'
         return formula_clases_no_vacias
 
+    def con_clases_no_vacias(self, formula):
+        '''
+        Como clases_no_vacias, pero sobre una fórmula ya analizada (de
+        a_formula) y sin pasar por cadenas: agrega P(p) por cada predicado
+        unario P. La conjunción de esos átomos se guarda por tupla de
+        predicados, de modo que se construye una sola vez.
+        '''
+        _, predicados = LogUtils.obtener_vocabulario(formula)
+        clave = tuple(p.nombre for p in predicados if p.aridad == 1)
+        if len(clave) == 0:
+            return formula
+        if clave not in self.axiomas_no_vacias:
+            self.axiomas_no_vacias[clave] = LogUtils.Ytoria([self.a_formula(f'{p}({p.lower()})') for p in clave])
+        return LogUtils.Ytoria([formula, self.axiomas_no_vacias[clave]])
+
 
 class ToNumeric:
 
@@ -116,6 +179,18 @@ class ToNumeric:
         self.clausal = clausal
         self.crear_vocab()
 
+    @classmethod
+    def desde_itos(cls, itos:List[str]):
+        '''
+        Reconstruye el objeto a partir de un vocabulario ya creado
+        (por ejemplo, uno guardado en un ProblemaCompilado).
+        '''
+        to_numeric = cls.__new__(cls)
+        to_numeric.clausal = None
+        to_numeric.itos = list(itos)
+        to_numeric.stoi = {token: i for i, token in enumerate(to_numeric.itos)}
+        return to_numeric
+
     def solo_atomo(self, literal:str) -> str:
         '''
         Convierte un literal a su forma atómica.
@@ -156,7 +231,7 @@ class ToNumeric:
         self.stoi = {'<PAD>': 0}	
         for sentence in clausal_no_negaciones:
             for token in sentence:
-                if token not in self.itos:
+                if token not in self.stoi:
                     self.stoi[token] = len(self.itos)
                     self.itos.append(token)
 
@@ -215,15 +290,38 @@ class ToNumeric:
             return self.itos[number] 
 
 
+# Marca en el diario de una clave que no existía
+_AUSENTE = object()
+
+
 class Modelo:
     '''
     Contendor del modelo de discurso.
     '''
     def __init__(self, formula=None):
         self.entidades = {}
+        # Conjuntos paralelos a entidades para pruebas de pertenencia en O(1)
+        self.conjuntos_entidades = {}
         self.predicados = []
         self.vocabulario = []
         self.descriptor = None
+        # Dominios (sorts) declarados: nombre => nombres de constantes
+        self.dominios = {}
+        # Dominio de cada argumento de un predicado (None si no se declaró)
+        self.firmas = {}
+        # Hechos conocidos: átomo fundamentado (como cadena) => valor
+        self.hechos = {}
+        # Si es True, las igualdades entre constantes se evalúan al fundamentar
+        # y no se usa el predicado IGUALDAD
+        self.nombres_unicos = False
+        # Dominios abiertos (ver declarar_abierto): nombre => None
+        self.abiertos = {}
+        # Número de constantes testigo creadas por skolemizar, y las que
+        # siguen en el modelo como (tipo, nombre, dominios)
+        self.testigos = 0
+        self.testigos_activos = []
+        # Registro de cambios para deshacer (None fuera de un alcance)
+        self.diario = None
         self.nltk_log_parser = nltk.sem.logic.LogicParser()
         if formula is not None:
             s = self.nltk_log_parser.parse(formula)
@@ -234,31 +332,44 @@ class Modelo:
         Toma una fórmula y extrae los individuos allí representados. 
         '''
         constantes, predicados = LogUtils.obtener_vocabulario(expresion)
+        if self.nombres_unicos:
+            # IGUALDAD se conserva si no hay otro predicado, para que el
+            # vocabulario no quede sin predicados (ver formula_constante)
+            otros = [p for p in predicados if p.nombre != 'IGUALDAD']
+            if len(otros) > 0 or len(self.predicados) > 0:
+                predicados = otros
         for p in predicados:
             if not p.en_conjunto(self.predicados):
                 self.predicados.append(p)
        # Creamos las constantes
         for c in constantes:
-            self.nueva_entidad(tipo=c.tipo, nombre=c.nombre)
+            self.agregar_entidad(tipo=c.tipo, nombre=c.nombre)
         self.actualizar()
 
     def nueva_entidad(self, tipo:str, nombre:str):
         '''
         Crea una nueva entidad en la situación.
         '''
-        try:
-            n = len(self.entidades[tipo])
-            nombres_previos = [c.nombre for c in self.entidades[tipo]]
-            if nombre in nombres_previos:
-                #print(f'¡Entidad ya existente! No se creó una nueva entidad. ({nombre})')
-                pass
-            else:
-                self.entidades[tipo].append(Constante(tipo, nombre))
-        except:
-            n = 0
-            self.entidades[tipo] = [Constante(tipo, nombre)]
+        self.agregar_entidad(tipo=tipo, nombre=nombre)
         self.actualizar()
 
+    def agregar_entidad(self, tipo:str, nombre:str) -> bool:
+        '''
+        Agrega una entidad sin actualizar el vocabulario.
+        Output:
+            - True si la entidad es nueva, False si ya existía
+        '''
+        constante = Constante(tipo, nombre)
+        if tipo not in self.entidades:
+            self.entidades[tipo] = []
+            self.conjuntos_entidades[tipo] = set()
+        if constante in self.conjuntos_entidades[tipo]:
+            #print(f'¡Entidad ya existente! No se creó una nueva entidad. ({nombre})')
+            return False
+        self.entidades[tipo].append(constante)
+        self.conjuntos_entidades[tipo].add(constante)
+        return True
+
     def actualizar(self):
         '''
         Actualiza el vocabulario de la situación.
@@ -278,72 +389,475 @@ class Modelo:
         existenciales por Otorias y los cuantificadores universales
         por Ytorias. En ambos casos se utilizan las entidades y 
         eventos de la situación.
+        Si hay hechos conocidos (ver agregar_hechos), cada instancia se
+        simplifica con ellos y la fórmula resultante es equivalente a la
+        original dado que los hechos son verdaderos. Si nombres_unicos es
+        True, las igualdades entre constantes se evalúan directamente.
         Input:
             - expresión, que es un objeto fórmula en lpo de nltk
         Output:
             - fórmula fundamentada, que es un objeto fórmula en lpo de nltk
         '''
+        formula = self.fundamentar_(expresion)
+        if isinstance(formula, bool):
+            return self.formula_constante(formula, expresion)
+        return formula
+
+    def fundamentar_(self, expresion:nltk.sem.logic):
+        '''
+        Fundamentación recursiva. Con hechos conocidos puede devolver
+        True o False en lugar de una fórmula.
+        '''
         tipo = LogUtils.obtener_type(expresion)
         if tipo in ['ExistsExpression']:
             # La expresión es un cuantificador existencial 
             # de una fórmula phi.
-            # Determinamos si la variable del cuantificador es
-            # o bien una entidad o bien un evento. 
-            phi = expresion.term
-            var = expresion.variable.name
-            tipo_var = 'evento' if var[0] == 'e' else 'entidad'
-            otoria = []
-            if tipo_var == 'evento':
-                consts = [str(c) for c in self.entidades['evento']]
-                otoria = [self.nltk_log_parser.parse(rf'\{var}.({phi})({c})').simplify() for c in consts]
-            else:
-                consts = [str(c) for c in self.entidades['individuo']]
-                otoria = [self.nltk_log_parser.parse(rf'\{var}.({phi})({c})').simplify() for c in consts]
-            return LogUtils.Otoria([self.fundamentar(f) for f in otoria])
+            otoria = [self.instanciar(expresion, c) for c in self.dominio(expresion)]
+            otoria = [self.fundamentar_(f) for f in otoria]
+            if True in otoria:
+                return True
+            otoria = [f for f in otoria if f is not False]
+            if len(otoria) == 0:
+                return False
+            return LogUtils.Otoria(otoria)
         elif tipo in ['AllExpression']:
             # La expresión es un cuantificador universal
             # de una fórmula phi.
-            # Determinamos si la variable del cuantificador es
-            # o bien una entidad o bien un evento. 
-            phi = expresion.term
-            var = expresion.variable.name
-            tipo_var = 'evento' if var[0] == 'e' else 'entidad'
-            if tipo_var == 'evento':
-                consts = [str(c) for c in self.entidades['evento']]
-#                print('\nYtoria sobre los eventos', consts)
-                ytoria = [self.nltk_log_parser.parse(rf'\{var}.({phi})({c})').simplify() for c in consts]
-            else:
-                consts = [str(c) for c in self.entidades['individuo']]
-#                print('\nYtoria sobre las entidades', consts)
-                ytoria = [self.nltk_log_parser.parse(rf'\{var}.({phi})({c})').simplify() for c in consts]
-            return LogUtils.Ytoria([self.fundamentar(f) for f in ytoria])
-        elif tipo in ['AndExpression']:
-            first = self.fundamentar(expresion.first)
-            second = self.fundamentar(expresion.second)
-            return nltk.sem.logic.AndExpression(first, second)
-        elif tipo in ['OrExpression']:
-            first = self.fundamentar(expresion.first)
-            second = self.fundamentar(expresion.second)
-            return nltk.sem.logic.OrExpression(first, second)
-        elif tipo in ['ImpExpression']:
-            first = self.fundamentar(expresion.first)
-            second = self.fundamentar(expresion.second)
-            return nltk.sem.logic.ImpExpression(first, second)
+            ytoria = [self.instanciar(expresion, c) for c in self.dominio(expresion)]
+            ytoria = [self.fundamentar_(f) for f in ytoria]
+            if False in ytoria:
+                return False
+            ytoria = [f for f in ytoria if f is not True]
+            if len(ytoria) == 0:
+                return True
+            return LogUtils.Ytoria(ytoria)
+        elif tipo in ['AndExpression', 'OrExpression', 'ImpExpression', 'IffExpression']:
+            # type(expresion) conserva la familia de la fórmula (nltk o AnalizadorLPO)
+            first = self.fundamentar_(expresion.first)
+            second = self.fundamentar_(expresion.second)
+            if isinstance(first, bool) or isinstance(second, bool):
+                return self.plegar(expresion, first, second)
+            return type(expresion)(first, second)
         elif tipo in ['NegatedExpression']:
-            term = self.fundamentar(expresion.term)
-            return nltk.sem.logic.NegatedExpression(term)
+            term = self.fundamentar_(expresion.term)
+            if isinstance(term, bool):
+                return not term
+            return type(expresion)(term)
         elif tipo in ['ApplicationExpression']:
             argumentos = expresion.args
             for x in argumentos:
                 tipo_argumento = LogUtils.obtener_type(x)
                 #assert('Constant' in tipo_argumento), f'¡Error: Átomo no fundamentado! {tipo_argumento} en {expresion}'
+            if self.hechos:
+                return self.hechos.get(str(expresion), expresion)
             return expresion
         elif tipo in ['EqualityExpression']:
             #assert(len(expresion.variables()) == 0), f'¡Error: Átomo no fundamentado! {expresion.variables()} en {expresion}'
+            if self.nombres_unicos and len(expresion.free()) == 0:
+                # Suposición de nombres únicos: constantes distintas denotan individuos distintos
+                return str(expresion.first) == str(expresion.second)
+            if self.hechos:
+                return self.hechos.get(str(expresion), expresion)
             return expresion
         else:
             raise Exception(f'¡Tipo de expresión desconocido! {tipo}')
 
+    def plegar(self, expresion, first, second):
+        '''
+        Simplifica un conectivo binario cuando alguno de sus
+        lados es True o False.
+        '''
+        tipo = LogUtils.obtener_type(expresion)
+        negar = lambda f: (not f) if isinstance(f, bool) else self.negacion(f)
+        if tipo == 'AndExpression':
+            if first is False or second is False:
+                return False
+            return second if first is True else first
+        elif tipo == 'OrExpression':
+            if first is True or second is True:
+                return True
+            return second if first is False else first
+        elif tipo == 'ImpExpression':
+            if first is False or second is True:
+                return True
+            return second if first is True else negar(first)
+        else:
+            # IffExpression
+            if isinstance(first, bool):
+                first, second = second, first
+            if isinstance(first, bool):
+                return first == second
+            return first if second else negar(first)
+
+    def negacion(self, formula):
+        '''
+        Niega una fórmula usando la familia (nltk o AnalizadorLPO) a la que pertenece.
+        '''
+        if isinstance(formula, Formula):
+            return NegatedExpressionLPO(formula)
+        return nltk.sem.logic.NegatedExpression(formula)
+
+    def agregar_hechos(self, hechos):
+        '''
+        Registra literales fundamentados cuyo valor se conoce, para
+        simplificar con ellos la fundamentación.
+        Input:
+            - hechos, una oración que es una conjunción de literales
+                    fundamentados (como la de regla_tablero), una fórmula,
+                    o una lista de ellas
+        '''
+        if not isinstance(hechos, list):
+            hechos = [hechos]
+        analizador = AnalizadorLPO()
+        pila = [analizador.parse(h) if isinstance(h, str) else h for h in hechos][::-1]
+        while pila:
+            f = pila.pop()
+            tipo = LogUtils.obtener_type(f)
+            valor = True
+            if tipo == 'AndExpression':
+                pila.append(f.second)
+                pila.append(f.first)
+                continue
+            elif tipo == 'NegatedExpression':
+                valor = False
+                f = f.term
+                tipo = LogUtils.obtener_type(f)
+            if tipo not in ['ApplicationExpression', 'EqualityExpression'] or len(f.free()) > 0:
+                raise Exception(f'Error: {f} no es un literal fundamentado.')
+            clave = str(f)
+            if self.hechos.get(clave, valor) != valor:
+                raise Exception(f'Error: Hechos contradictorios sobre {clave}.')
+            self.anotar(self.hechos, clave)
+            self.hechos[clave] = valor
+
+    def limpiar_hechos(self):
+        '''
+        Olvida los hechos conocidos.
+        '''
+        self.anotar(self.__dict__, 'hechos')
+        self.hechos = {}
+
+    def formula_constante(self, valor:bool, expresion):
+        '''
+        Devuelve una fórmula fundamentada cuyo valor es valor, sin crear
+        átomos nuevos en el vocabulario: P(c,...,c) -> P(c,...,c) (o su
+        negación). No se usa un hecho conocido porque los hechos no van
+        en la forma clausal y el solver podría falsearlo.
+        '''
+        predicados = [p for p in self.predicados if p.nombre != 'IGUALDAD'] or self.predicados
+        constantes = [c for tipo in self.entidades for c in self.entidades[tipo]]
+        if len(predicados) == 0 or len(constantes) == 0:
+            raise Exception(f'Error: No hay vocabulario para representar la constante {valor}.')
+        p, c = predicados[0], constantes[0]
+        atomo = f'{p.nombre}({",".join([c.nombre] * p.aridad)})'
+        clave = f'({atomo} -> {atomo})'
+        if isinstance(expresion, Formula):
+            formula = AnalizadorLPO().parse(clave)
+        else:
+            formula = self.nltk_log_parser.parse(clave)
+        return formula if valor else self.negacion(formula)
+
+    def declarar_dominio(self, nombre:str, constantes:list):
+        '''
+        Declara un dominio (sort) con las constantes dadas. Una constante
+        puede pertenecer a varios dominios.
+        Input:
+            - nombre, cadena con el nombre del dominio
+            - constantes, lista de nombres de constantes
+        '''
+        constantes = [str(c) for c in constantes]
+        if nombre not in self.dominios:
+            self.anotar(self.dominios, nombre)
+            self.dominios[nombre] = {}
+        dominio = self.dominios[nombre]
+        for c in constantes:
+            if c not in dominio:
+                self.anotar(dominio, c)
+            dominio[c] = None
+            tipo = 'evento' if c[0:3] == 'Ev_' else 'individuo'
+            self.agregar_entidad(tipo=tipo, nombre=c)
+        if len(self.predicados) > 0:
+            self.actualizar()
+
+    def declarar_firma(self, predicado:str, dominios:list):
+        '''
+        Declara el dominio de cada argumento de un predicado. Las
+        variables que aparecen en esas posiciones solo se instancian
+        con las constantes del dominio correspondiente.
+        Input:
+            - predicado, nombre del predicado
+            - dominios, lista con un nombre de dominio (o None) por argumento
+        '''
+        for d in dominios:
+            if d is not None and d not in self.dominios:
+                raise Exception(f'Error: Dominio {d} no declarado.')
+        self.anotar(self.firmas, predicado)
+        self.firmas[predicado] = list(dominios)
+
+    def anotar(self, diccionario:dict, clave) -> None:
+        '''
+        Guarda en el diario el valor de diccionario[clave] antes de cambiarlo.
+        '''
+        if self.diario is not None:
+            self.diario.append((diccionario, clave, diccionario.get(clave, _AUSENTE)))
+
+    def instantanea(self) -> tuple:
+        '''
+        Marca el estado actual del modelo para poder volver a él con
+        restaurar. A partir de aquí los cambios se anotan en el diario.
+        Las entidades y los predicados solo crecen al final de sus listas,
+        por lo que basta con guardar sus longitudes.
+        Output:
+            - instantanea, tupla opaca para restaurar
+        '''
+        nuevo_diario = self.diario is None
+        if nuevo_diario:
+            self.diario = []
+        longitudes = {tipo: len(lista) for tipo, lista in self.entidades.items()}
+        return (
+            nuevo_diario, len(self.diario), longitudes, len(self.predicados),
+            self.vocabulario, self.descriptor
+        )
+
+    def restaurar(self, instantanea:tuple) -> None:
+        '''
+        Deshace los cambios hechos desde la instantánea: entidades,
+        predicados, dominios, firmas, hechos, vocabulario y descriptor.
+        El costo es proporcional al número de cambios.
+        '''
+        nuevo_diario, posicion, longitudes, n_predicados, vocabulario, descriptor = instantanea
+        for tipo in list(self.entidades):
+            n = longitudes.get(tipo, 0)
+            for c in self.entidades[tipo][n:]:
+                self.conjuntos_entidades[tipo].discard(c)
+            del self.entidades[tipo][n:]
+            if tipo not in longitudes:
+                del self.entidades[tipo]
+                del self.conjuntos_entidades[tipo]
+        del self.predicados[n_predicados:]
+        while len(self.diario) > posicion:
+            diccionario, clave, anterior = self.diario.pop()
+            if anterior is _AUSENTE:
+                del diccionario[clave]
+            else:
+                diccionario[clave] = anterior
+        # actualizar crea listas y descriptores nuevos, así que los anteriores siguen intactos
+        self.vocabulario = vocabulario
+        self.descriptor = descriptor
+        if nuevo_diario:
+            self.diario = None
+
+    @contextmanager
+    def alcance(self):
+        '''
+        Contexto en el que los cambios al modelo son temporales:
+
+            with modelo.alcance():
+                ...
+        '''
+        instantanea = self.instantanea()
+        try:
+            yield self
+        finally:
+            self.restaurar(instantanea)
+
+    def inferir_dominios(self, expresion) -> List[str]:
+        '''
+        Toma un cuantificador y devuelve los dominios declarados para
+        las posiciones de predicado donde aparece su variable.
+        '''
+        var = expresion.variable.name
+        dominios = {}
+        pila = [expresion.term]
+        while pila:
+            f = pila.pop()
+            tipo = LogUtils.obtener_type(f)
+            if tipo in ['AllExpression', 'ExistsExpression']:
+                if f.variable.name != var:
+                    pila.append(f.term)
+            elif tipo in ['NegatedExpression']:
+                pila.append(f.term)
+            elif tipo in ['AndExpression', 'OrExpression', 'ImpExpression', 'IffExpression']:
+                pila.append(f.second)
+                pila.append(f.first)
+            elif tipo in ['ApplicationExpression']:
+                firma = self.firmas.get(str(f.pred))
+                if firma is None:
+                    continue
+                for x, d in zip(f.args, firma):
+                    if d is not None and str(x) == var:
+                        dominios[d] = None
+        return list(dominios)
+
+    def dominio(self, expresion) -> List[str]:
+        '''
+        Toma un cuantificador y devuelve los nombres de las constantes
+        sobre las que se instancia.
+        Si la variable está anotada con un dominio (all x:fila.phi), o
+        si aparece en argumentos de predicados con firma declarada, se
+        usa ese dominio (la unión si son varios). En otro caso
+        determinamos si la variable del cuantificador es
+        o bien una entidad o bien un evento. 
+        '''
+        nombre = getattr(expresion, 'dominio', None)
+        if nombre is not None:
+            if nombre not in self.dominios:
+                raise Exception(f'Error: Dominio {nombre} no declarado.')
+            return list(self.dominios[nombre])
+        if len(self.firmas) > 0:
+            nombres = self.inferir_dominios(expresion)
+            if len(nombres) == 1:
+                return list(self.dominios[nombres[0]])
+            elif len(nombres) > 1:
+                union = {}
+                for n in nombres:
+                    union.update(self.dominios[n])
+                return list(union)
+        var = expresion.variable.name
+        tipo_var = 'evento' if var[0] == 'e' else 'entidad'
+        if tipo_var == 'evento':
+            return [str(c) for c in self.entidades['evento']]
+        else:
+            return [str(c) for c in self.entidades['individuo']]
+
+    def instanciar(self, expresion, constante:str):
+        '''
+        Toma un cuantificador Qx.phi(x) y devuelve phi(constante).
+        Input:
+            - expresion, cuantificador de nltk o de AnalizadorLPO
+            - constante, nombre de la constante
+        Output:
+            - phi con las ocurrencias libres de x sustituidas por la constante
+        '''
+        if isinstance(expresion, Formula):
+            return expresion.term.replace(expresion.variable, ConstantExpression(constante))
+        var = expresion.variable.name
+        phi = expresion.term
+        return self.nltk_log_parser.parse(rf'\{var}.({phi})({constante})').simplify()
+
+    def declarar_abierto(self, nombre:str):
+        '''
+        Declara abierto un dominio: además de sus constantes puede tener
+        elementos sin nombre. Los existenciales externos sobre un dominio
+        abierto se skolemizan al fundamentar (ver skolemizar).
+        Input:
+            - nombre, dominio declarado, o 'individuo' o 'evento' para las
+                        variables sin dominio declarado
+        '''
+        if nombre not in self.dominios and nombre not in ['individuo', 'evento']:
+            raise Exception(f'Error: Dominio {nombre} no declarado.')
+        self.anotar(self.abiertos, nombre)
+        self.abiertos[nombre] = None
+
+    def dominios_de(self, expresion) -> List[str]:
+        '''
+        Nombres de los dominios de un cuantificador: el anotado, los
+        inferidos de las firmas o, si no hay, 'individuo' o 'evento'.
+        '''
+        nombre = getattr(expresion, 'dominio', None)
+        if nombre is not None:
+            if nombre not in self.dominios:
+                raise Exception(f'Error: Dominio {nombre} no declarado.')
+            return [nombre]
+        if len(self.firmas) > 0:
+            nombres = self.inferir_dominios(expresion)
+            if len(nombres) > 0:
+                return nombres
+        return ['evento' if expresion.variable.name[0] == 'e' else 'individuo']
+
+    def skolemizar(self, expresion):
+        '''
+        Cambia los existenciales más externos sobre dominios abiertos
+        (ver declarar_abierto) por constantes testigo nuevas, de modo que
+        fundamentar no los expande en Otorias. Solo se tocan los que no
+        están bajo un universal ni bajo un bicondicional, teniendo en
+        cuenta la polaridad: exists x.phi en posición positiva y all x.phi
+        en posición negativa (bajo una negación o en el antecedente de
+        una implicación).
+        Cada testigo se agrega al modelo como individuo (o como evento,
+        con prefijo Ev_, si la variable es de evento) y a los dominios de
+        su variable, así que los universales también lo recorren. En un
+        dominio abierto esto es correcto; los dominios cerrados no se
+        tocan, así que sin dominios abiertos la fórmula no cambia. Con
+        nombres_unicos tampoco se skolemiza, pues el testigo podría ser
+        una de las constantes con nombre.
+        Los testigos quedan en el modelo hasta llamar a retirar_testigos.
+        Input:
+            - expresion, fórmula cerrada de nltk o de AnalizadorLPO
+        Output:
+            - fórmula sin esos cuantificadores, de la misma familia
+        '''
+        if len(self.abiertos) == 0 or self.nombres_unicos:
+            return expresion
+        testigos = len(self.testigos_activos)
+        formula = self.skolemizar_(expresion, True)
+        if len(self.testigos_activos) > testigos:
+            self.actualizar()
+        return formula
+
+    def skolemizar_(self, expresion, positiva:bool):
+        '''
+        Skolemización recursiva; positiva es la polaridad de la expresión.
+        '''
+        tipo = LogUtils.obtener_type(expresion)
+        if (tipo == 'ExistsExpression' and positiva) or (tipo == 'AllExpression' and not positiva):
+            dominios = self.dominios_de(expresion)
+            if any(d not in self.abiertos for d in dominios):
+                return expresion
+            constante = self.testigo(expresion, dominios)
+            return self.skolemizar_(self.instanciar(expresion, constante), positiva)
+        elif tipo == 'NegatedExpression':
+            term = self.skolemizar_(expresion.term, not positiva)
+            return expresion if term is expresion.term else type(expresion)(term)
+        elif tipo in ['AndExpression', 'OrExpression', 'ImpExpression']:
+            first = self.skolemizar_(expresion.first, positiva if tipo != 'ImpExpression' else not positiva)
+            second = self.skolemizar_(expresion.second, positiva)
+            if first is expresion.first and second is expresion.second:
+                return expresion
+            return type(expresion)(first, second)
+        # Universales, bicondicionales y átomos quedan como están
+        return expresion
+
+    def testigo(self, expresion, dominios:List[str]) -> str:
+        '''
+        Crea la constante testigo de un cuantificador y la agrega a sus
+        dominios declarados.
+        '''
+        evento = expresion.variable.name[0] == 'e'
+        prefijo = 'Ev_sk' if evento else 'sk'
+        nombres = set(str(c) for tipo in self.entidades for c in self.entidades[tipo])
+        while f'{prefijo}{self.testigos}' in nombres:
+            self.testigos += 1
+        nombre = f'{prefijo}{self.testigos}'
+        self.testigos += 1
+        tipo = 'evento' if evento else 'individuo'
+        dominios = [d for d in dominios if d in self.dominios]
+        self.agregar_entidad(tipo=tipo, nombre=nombre)
+        for d in dominios:
+            self.declarar_dominio(d, [nombre])
+        self.testigos_activos.append((tipo, nombre, dominios))
+        return nombre
+
+    def retirar_testigos(self):
+        '''
+        Quita del modelo las constantes testigo creadas por skolemizar,
+        para que no entren en el dominio de las consultas siguientes.
+        '''
+        if len(self.testigos_activos) == 0:
+            return
+        for tipo, nombre, dominios in self.testigos_activos:
+            constante = Constante(tipo, nombre)
+            if constante in self.conjuntos_entidades.get(tipo, ()):
+                self.entidades[tipo].remove(constante)
+                self.conjuntos_entidades[tipo].discard(constante)
+            for d in dominios:
+                if nombre in self.dominios.get(d, {}):
+                    self.anotar(self.dominios[d], nombre)
+                    del self.dominios[d][nombre]
+        self.testigos_activos = []
+        if len(self.predicados) > 0:
+            self.actualizar()
+
     def codificar_lp(self, expresion:nltk.sem.logic) -> str:
         '''
         Toma una fórmula y devuelve su versión codificada 
@@ -368,6 +882,10 @@ class Modelo:
             first = self.codificar_lp(expresion.first)
             second = self.codificar_lp(expresion.second)
             return f'({first}>{second})'
+        elif tipo in ['IffExpression']:
+            first = self.codificar_lp(expresion.first)
+            second = self.codificar_lp(expresion.second)
+            return f'({first}={second})'
         elif tipo in ['NegatedExpression']:
             term = self.codificar_lp(expresion.term)
             return f'-{term}'
@@ -388,7 +906,7 @@ class Modelo:
         assert(tipo in ['ApplicationExpression', 'EqualityExpression'])
         if tipo == 'EqualityExpression':
             predicado = [self.vocabulario.index('IGUALDAD')]
-            argumentos = [self.vocabulario.index(str(x)) for x in pred.constants()]
+            argumentos = [self.vocabulario.index(str(x)) for x in [pred.first, pred.second]]
         else:
             try:
                 predicado = [self.vocabulario.index(str(pred.pred))]
@@ -418,6 +936,32 @@ class Modelo:
         formula_atomica = f'{neg}{predicado}({argumentos})'
         return formula_atomica
 
+    def ejes(self, predicado:Predicado) -> List[List[str]]:
+        '''
+        Devuelve, para cada argumento del predicado, la lista ordenada de
+        constantes que indexa ese eje en decodificar_tensores: el dominio
+        declarado en su firma o, si no hay, todas las constantes.
+        '''
+        constantes = [c.nombre for tipo in self.entidades for c in self.entidades[tipo]]
+        firma = self.firmas.get(predicado.nombre, [None] * predicado.aridad)
+        return [
+            list(self.dominios[d]) if d is not None else constantes
+                for d in firma
+        ]
+
+    def decodificar_tensores(
+                self,
+                modelo:List[int],
+                to_numeric:ToNumeric,
+                atomos:Optional[List[str]]=None
+            ) -> dict:
+        '''
+        Decodifica un modelo del solver como un arreglo booleano denso
+        por predicado, con el vocabulario actual (ver decodificar_tensores).
+        '''
+        ejes = {p.nombre: self.ejes(p) for p in self.predicados}
+        return decodificar_tensores(modelo, to_numeric, atomos, self.vocabulario, self.descriptor, ejes)
+
     def nombre_a_predicado(self, nombre_predicado:str) -> Predicado:
         for predicado in self.predicados:
              if predicado.nombre == nombre_predicado:
@@ -441,6 +985,73 @@ class Modelo:
         return cadena
 
 
+def decodificar_tensores(
+        modelo:List[int],
+        to_numeric:ToNumeric,
+        atomos:Optional[List[str]],
+        vocabulario:List[str],
+        descriptor,
+        ejes:Dict[str, List[List[str]]]
+    ) -> dict:
+    '''
+    Decodifica un modelo del solver como un arreglo booleano denso
+    por predicado, en una sola pasada vectorizada.
+    Input:
+        - modelo, lista de enteros devuelta por el solver
+        - to_numeric, objeto ToNumeric con el que se numeró la fórmula
+        - atomos, letras proposicionales de la fórmula fundamentada
+                (las letras de Tseitin se descartan), o None
+        - vocabulario, descriptor, los del Modelo con que se codificó
+        - ejes, diccionario nombre de predicado => Modelo.ejes(predicado)
+    Output:
+        - tensores, diccionario nombre de predicado => np.ndarray de bool
+                con un eje por argumento, indexado según ejes
+    '''
+    L = len(vocabulario)
+    m = len(descriptor.args_lista)
+    # Código del descriptor de cada variable del solver (-1 si no es un
+    # átomo): las letras se ven como enteros UCS-4, una fila por letra
+    letras = np.asarray(to_numeric.itos, dtype=str)
+    puntos = letras.view(np.uint32).reshape(len(letras), -1).astype(np.int64)
+    es_atomo = (puntos[:, 0] > 0) if puntos.shape[1] == 1 else (puntos[:, 0] > 0) & (puntos[:, 1] == 0)
+    if atomos is not None:
+        es_atomo &= np.isin(puntos[:, 0], [ord(a) for a in atomos if len(a) == 1])
+    codigos = np.where(es_atomo, puntos[:, 0] - descriptor.chrInit, -1)
+    modelo = np.asarray(modelo, dtype=np.int64)
+    verdaderas = modelo[(modelo > 0) & (modelo < len(codigos))]
+    cods = codigos[verdaderas]
+    cods = cods[cods >= 0]
+    # Dígitos en base L, del menos significativo al más significativo
+    digitos = np.empty((len(cods), m), dtype=np.int64)
+    resto = cods.copy()
+    for k in range(m):
+        digitos[:, k] = resto % L
+        resto //= L
+    if np.any(resto != 0):
+        raise Exception(f'Error: Hay códigos que no caben en {m} dígitos en base {L}.')
+    indice_vocabulario = {}
+    for i, nombre in enumerate(vocabulario):
+        indice_vocabulario.setdefault(nombre, i)
+    tensores = {}
+    for nombre, ejes_predicado in ejes.items():
+        tensor = np.zeros([len(eje) for eje in ejes_predicado], dtype=bool)
+        filas = digitos[digitos[:, 0] == indice_vocabulario[nombre]]
+        indices = []
+        for k, eje in enumerate(ejes_predicado):
+            # Traduce índice de vocabulario => posición en el eje
+            traduccion = np.full(L, -1, dtype=np.int64)
+            traduccion[[indice_vocabulario[c] for c in eje]] = np.arange(len(eje))
+            indices.append(traduccion[filas[:, k + 1]])
+        if len(indices) > 0:
+            indices = np.stack(indices)
+            indices = indices[:, np.all(indices >= 0, axis=0)]
+            tensor[tuple(indices)] = True
+        elif len(filas) > 0:
+            tensor[()] = True
+        tensores[nombre] = tensor
+    return tensores
+
+
 class Descriptor:
     '''
     Codifica una lista de N argumentos mediante un solo caracter
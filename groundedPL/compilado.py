@@ -0,0 +1,169 @@
+'''
+Serialización binaria de un problema ya compilado (tabla de
+símbolos, parámetros del descriptor y cláusulas numéricas), para
+arrancar sin volver a fundamentar ni codificar.
+
+Formato del archivo:
+    - 4 bytes, la marca b'GPLC'
+    - uint32, versión del formato
+    - uint64, longitud n de los metadatos
+    - n bytes, metadatos en JSON (ASCII)
+    - relleno con ceros hasta un múltiplo de 8
+    - int32 little-endian, las cláusulas una tras otra, cada una
+      terminada en 0 (como en DIMACS)
+'''
+import json
+import struct
+import numpy as np
+
+from typing import Iterator, List, Optional
+
+from groundedPL.logClases import Predicado
+from groundedPL.codificacion import Modelo, ToNumeric
+
+
+MARCA = b'GPLC'
+VERSION = 1
+_CABECERA = struct.Struct('<4sIQ')
+
+
+class ProblemaCompilado:
+    '''
+    Todo lo necesario para resolver una fórmula y decodificar sus
+    modelos sin repetir el pipeline: el Modelo poblado, los átomos de
+    la fórmula fundamentada (las demás letras son de Tseitin), el
+    vocabulario de ToNumeric y las cláusulas como un solo arreglo.
+    '''
+
+    def __init__(self, modelo:Modelo, atomos:List[str], itos:List[str], cnf:np.ndarray) -> None:
+        '''
+        Input:
+            - modelo, objeto Modelo con el que se codificó la fórmula
+            - atomos, letras proposicionales de la fórmula fundamentada
+            - itos, lista entero => letra de ToNumeric
+            - cnf, arreglo de int32 con las cláusulas terminadas en 0
+        '''
+        self.modelo = modelo
+        self.atomos = atomos
+        self.itos = itos
+        self.cnf = cnf
+
+    @staticmethod
+    def desde_clausulas(modelo:Modelo, atomos:List[str], to_numeric:ToNumeric, clausulas:List[List[int]]):
+        '''
+        Construye el problema a partir de la salida de ToNumeric.
+        '''
+        cnf = np.fromiter(
+            (l for C in clausulas for l in (*C, 0)), dtype=np.int32,
+            count=sum(len(C) + 1 for C in clausulas)
+        )
+        return ProblemaCompilado(modelo, list(atomos), list(to_numeric.itos), cnf)
+
+    def clausulas(self, bloque:int=1 << 16) -> Iterator[List[int]]:
+        '''
+        Recorre las cláusulas como listas de enteros. El arreglo se lee
+        por trozos de bloque literales y la cláusula que queda cortada al
+        final de un trozo se completa con el siguiente, de modo que un
+        arreglo mapeado en memoria no se carga entero (se puede pasar a
+        Solver.append_formula).
+        '''
+        pendiente = []
+        for desde in range(0, len(self.cnf), bloque):
+            trozo = self.cnf[desde:desde + bloque]
+            inicio = 0
+            for fin in np.flatnonzero(trozo == 0).tolist():
+                clausula = trozo[inicio:fin].tolist()
+                if pendiente:
+                    clausula = pendiente + clausula
+                    pendiente = []
+                yield clausula
+                inicio = fin + 1
+            if inicio < len(trozo):
+                pendiente += trozo[inicio:].tolist()
+        if pendiente:
+            raise Exception('Error: La última cláusula no termina en 0.')
+
+    def to_numeric(self) -> ToNumeric:
+        return ToNumeric.desde_itos(self.itos)
+
+    def metadatos(self) -> dict:
+        m = self.modelo
+        return {
+            'entidades': {tipo: [c.nombre for c in lista] for tipo, lista in m.entidades.items()},
+            'predicados': [[p.nombre, p.tipos_argumentos] for p in m.predicados],
+            'dominios': {nombre: list(d) for nombre, d in m.dominios.items()},
+            'firmas': m.firmas,
+            'hechos': list(m.hechos.items()),
+            'nombres_unicos': m.nombres_unicos,
+            'descriptor': {
+                'args_lista': [int(x) for x in m.descriptor.args_lista],
+                'chrInit': m.descriptor.chrInit,
+            },
+            'atomos': self.atomos,
+            'itos': self.itos,
+            'num_literales': int(len(self.cnf)),
+        }
+
+    def guardar(self, ruta:str) -> None:
+        '''
+        Escribe el problema en un archivo binario.
+        '''
+        meta = json.dumps(self.metadatos()).encode('ascii')
+        cabecera = _CABECERA.pack(MARCA, VERSION, len(meta))
+        relleno = -(len(cabecera) + len(meta)) % 8
+        with open(ruta, 'wb') as archivo:
+            archivo.write(cabecera)
+            archivo.write(meta)
+            archivo.write(b'\0' * relleno)
+            archivo.write(self.cnf.astype('<i4', copy=False).tobytes())
+
+    @staticmethod
+    def cargar(ruta:str, mmap:bool=True):
+        '''
+        Lee un problema escrito con guardar.
+        Input:
+            - ruta, cadena con la ruta del archivo
+            - mmap, si es True las cláusulas se mapean en memoria en
+                    lugar de leerse, de modo que varios procesos comparten
+                    las mismas páginas
+        Output:
+            - problema, objeto ProblemaCompilado
+        '''
+        with open(ruta, 'rb') as archivo:
+            marca, version, n = _CABECERA.unpack(archivo.read(_CABECERA.size))
+            if marca != MARCA:
+                raise Exception(f'Error: {ruta} no es un problema compilado.')
+            if version != VERSION:
+                raise Exception(f'Error: Versión {version} no soportada (se esperaba {VERSION}).')
+            meta = json.loads(archivo.read(n).decode('ascii'))
+            inicio = _CABECERA.size + n
+            inicio += -inicio % 8
+            num_literales = meta['num_literales']
+            if mmap and num_literales > 0:
+                cnf = np.memmap(archivo, dtype='<i4', mode='r', offset=inicio, shape=(num_literales,))
+            else:
+                archivo.seek(inicio)
+                cnf = np.fromfile(archivo, dtype='<i4', count=num_literales)
+        modelo = ProblemaCompilado.modelo_desde(meta)
+        return ProblemaCompilado(modelo, meta['atomos'], meta['itos'], cnf)
+
+    @staticmethod
+    def modelo_desde(meta:dict) -> Modelo:
+        '''
+        Reconstruye el Modelo. Como actualizar es determinista, basta con
+        agregar entidades y predicados en el mismo orden.
+        '''
+        modelo = Modelo()
+        modelo.nombres_unicos = meta['nombres_unicos']
+        for tipo, nombres in meta['entidades'].items():
+            for nombre in nombres:
+                modelo.agregar_entidad(tipo=tipo, nombre=nombre)
+        modelo.predicados = [Predicado(nombre, tipos) for nombre, tipos in meta['predicados']]
+        modelo.dominios = {nombre: dict.fromkeys(d) for nombre, d in meta['dominios'].items()}
+        modelo.firmas = meta['firmas']
+        modelo.hechos = dict((clave, valor) for clave, valor in meta['hechos'])
+        modelo.actualizar()
+        descriptor = meta['descriptor']
+        if list(modelo.descriptor.args_lista) != descriptor['args_lista'] or modelo.descriptor.chrInit != descriptor['chrInit']:
+            raise Exception('Error: El descriptor reconstruido no coincide con el guardado.')
+        return modelo
@@ -0,0 +1,485 @@
+'''
+Generador de oraciones aleatorias de primer orden y verificación
+diferencial del pipeline contra un oráculo de fuerza bruta.
+
+    python -m groundedPL.generador [--casos 200] [--semilla 0]
+
+El oráculo evalúa la oración directamente (sin fundamentar) en todas
+las interpretaciones de los átomos sobre un dominio pequeño. Cada
+camino del pipeline debe coincidir con él en si la oración es
+satisfacible y, si lo es, devolver un modelo que la haga verdadera.
+Los caminos que cambian la semántica (hechos, nombres únicos, dominios
+abiertos) le indican al oráculo el contexto con que debe comparar.
+'''
+import argparse
+import os
+import random
+import sys
+import tempfile
+
+from itertools import product
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from groundedPL.logUtils import LogUtils
+from groundedPL.analizador import AnalizadorLPO
+from groundedPL.codificacion import ToPropositionalLogic
+from groundedPL.compilado import ProblemaCompilado
+from groundedPL.logic_tester import LogicTester
+from groundedPL.lazy_grounding import LazyGrounder
+from groundedPL.knowledge_base import KnowledgeBase
+
+
+VARIABLES = ['x', 'y', 'z', 'w', 'v', 'u']
+CONECTIVOS = {'&': 1.0, '|': 1.0, '->': 1.0, '<->': 0.5, '-': 1.0}
+
+
+class GeneradorFormulas:
+    '''
+    Genera oraciones cerradas con tamaño y forma controlables.
+    '''
+
+    def __init__(
+                self,
+                semilla:Optional[int]=None,
+                tamano_dominio:int=2,
+                num_predicados:int=2,
+                aridad_maxima:int=2,
+                profundidad:int=3,
+                profundidad_cuantificadores:int=2,
+                prob_cuantificador:float=0.3,
+                conectivos:Optional[Dict[str, float]]=None,
+                prob_igualdad:float=0.1,
+                num_eventos:int=0,
+                prob_evento:float=0.3
+            ) -> None:
+        '''
+        Input:
+            - semilla, semilla del generador aleatorio
+            - tamano_dominio, número de constantes
+            - num_predicados, número de predicados
+            - aridad_maxima, aridad máxima de los predicados (al menos 1)
+            - profundidad, profundidad máxima de conectivos
+            - profundidad_cuantificadores, máximo de cuantificadores anidados
+            - prob_cuantificador, probabilidad de abrir un cuantificador
+                        en cada nodo (si quedan)
+            - conectivos, pesos de '&', '|', '->', '<->' y '-'
+            - prob_igualdad, probabilidad de que un átomo sea una igualdad
+            - num_eventos, número de constantes de evento (Ev_ev0, ...);
+                        si es 0 no hay variables de evento
+            - prob_evento, probabilidad de que un cuantificador sea sobre
+                        eventos (variables e0, e1, ...)
+        '''
+        assert(len(VARIABLES) >= profundidad_cuantificadores), f'A lo sumo {len(VARIABLES)} cuantificadores anidados'
+        self.azar = random.Random(semilla)
+        self.constantes = [f'ent{i}' for i in range(tamano_dominio)]
+        self.eventos = [f'Ev_ev{i}' for i in range(num_eventos)]
+        self.predicados = [
+            (f'PRED{chr(65 + i)}', self.azar.randint(1, aridad_maxima))
+                for i in range(num_predicados)
+        ]
+        self.profundidad = profundidad
+        self.profundidad_cuantificadores = profundidad_cuantificadores
+        self.prob_cuantificador = prob_cuantificador
+        self.conectivos = conectivos if conectivos is not None else CONECTIVOS
+        self.prob_igualdad = prob_igualdad
+        self.prob_evento = prob_evento
+
+    def termino(self, variables:List[str]) -> str:
+        if variables and self.azar.random() < 0.7:
+            return self.azar.choice(variables)
+        return self.azar.choice(self.constantes + self.eventos)
+
+    def atomo(self, variables:List[str]) -> str:
+        if self.azar.random() < self.prob_igualdad:
+            return f'({self.termino(variables)} = {self.termino(variables)})'
+        nombre, aridad = self.azar.choice(self.predicados)
+        argumentos = [self.termino(variables) for _ in range(aridad)]
+        return f'{nombre}({",".join(argumentos)})'
+
+    def formula(self, profundidad:Optional[int]=None, variables:Optional[List[str]]=None) -> str:
+        '''
+        Devuelve una oración aleatoria (sin variables libres).
+        '''
+        profundidad = self.profundidad if profundidad is None else profundidad
+        variables = [] if variables is None else variables
+        if profundidad == 0 or self.azar.random() < 0.15:
+            return self.atomo(variables)
+        if len(variables) < self.profundidad_cuantificadores and self.azar.random() < self.prob_cuantificador:
+            if self.eventos and self.azar.random() < self.prob_evento:
+                variable = f'e{len(variables)}'
+            else:
+                variable = VARIABLES[len(variables)]
+            cuantificador = self.azar.choice(['all', 'exists'])
+            cuerpo = self.formula(profundidad - 1, variables + [variable])
+            return f'({cuantificador} {variable}.{cuerpo})'
+        conectivo = self.azar.choices(list(self.conectivos), weights=list(self.conectivos.values()))[0]
+        if conectivo == '-':
+            return f'-{self.formula(profundidad - 1, variables)}'
+        izquierda = self.formula(profundidad - 1, variables)
+        derecha = self.formula(profundidad - 1, variables)
+        return f'({izquierda} {conectivo} {derecha})'
+
+    def teoria(self, num_formulas:int) -> List[str]:
+        return [self.formula() for _ in range(num_formulas)]
+
+
+def argumentos_de(formula, entorno:Dict[str, str]) -> Tuple[str, Tuple[str, ...]]:
+    '''
+    Átomo fundamentado de una fórmula atómica, como par (predicado,
+    argumentos). Sin nombres únicos, a = b es el átomo IGUALDAD(a, b).
+    '''
+    if LogUtils.obtener_type(formula) == 'EqualityExpression':
+        return ('IGUALDAD', tuple(entorno.get(a.name, a.name) for a in (formula.first, formula.second)))
+    return (formula.pred.name, tuple(entorno.get(a.name, a.name) for a in formula.args))
+
+
+def evaluar(
+            formula,
+            verdaderos:Set[Tuple],
+            entorno:Optional[Dict[str, str]]=None,
+            dominio:List[str]=(),
+            eventos:List[str]=(),
+            nombres_unicos:bool=False
+        ) -> bool:
+    '''
+    Valor de verdad de una fórmula de AnalizadorLPO en la interpretación
+    donde los átomos verdaderos son los de verdaderos, como pares
+    (predicado, tupla de constantes). Las variables que empiezan por e
+    recorren eventos y las demás dominio. Con nombres_unicos, a = b es
+    verdadera sii a y b son la misma constante.
+    '''
+    entorno = {} if entorno is None else entorno
+    tipo = LogUtils.obtener_type(formula)
+    valor = lambda f, e=entorno: evaluar(f, verdaderos, e, dominio, eventos, nombres_unicos)
+    if tipo in ['ApplicationExpression', 'EqualityExpression']:
+        atomo = argumentos_de(formula, entorno)
+        if tipo == 'EqualityExpression' and nombres_unicos:
+            return atomo[1][0] == atomo[1][1]
+        return atomo in verdaderos
+    elif tipo == 'NegatedExpression':
+        return not valor(formula.term)
+    elif tipo == 'AndExpression':
+        return valor(formula.first) and valor(formula.second)
+    elif tipo == 'OrExpression':
+        return valor(formula.first) or valor(formula.second)
+    elif tipo == 'ImpExpression':
+        return not valor(formula.first) or valor(formula.second)
+    elif tipo == 'IffExpression':
+        return valor(formula.first) == valor(formula.second)
+    elif tipo in ['AllExpression', 'ExistsExpression']:
+        recorrido = eventos if formula.variable.name[0] == 'e' else dominio
+        valores = (valor(formula.term, {**entorno, formula.variable.name: c}) for c in recorrido)
+        return all(valores) if tipo == 'AllExpression' else any(valores)
+    raise Exception(f'¡Tipo de expresión desconocido! {tipo}')
+
+
+def atomos_relevantes(
+            formula,
+            dominio:List[str],
+            eventos:List[str]=(),
+            nombres_unicos:bool=False,
+            entorno:Optional[Dict[str, str]]=None
+        ) -> Set[Tuple]:
+    '''
+    Átomos fundamentados de los que depende el valor de la fórmula.
+    '''
+    entorno = {} if entorno is None else entorno
+    tipo = LogUtils.obtener_type(formula)
+    relevantes = lambda f, e=entorno: atomos_relevantes(f, dominio, eventos, nombres_unicos, e)
+    if tipo in ['ApplicationExpression', 'EqualityExpression']:
+        if tipo == 'EqualityExpression' and nombres_unicos:
+            return set()
+        return {argumentos_de(formula, entorno)}
+    elif tipo == 'NegatedExpression':
+        return relevantes(formula.term)
+    elif tipo in ['AndExpression', 'OrExpression', 'ImpExpression', 'IffExpression']:
+        return relevantes(formula.first) | relevantes(formula.second)
+    elif tipo in ['AllExpression', 'ExistsExpression']:
+        recorrido = eventos if formula.variable.name[0] == 'e' else dominio
+        atomos = set()
+        for c in recorrido:
+            atomos |= relevantes(formula.term, {**entorno, formula.variable.name: c})
+        return atomos
+    raise Exception(f'¡Tipo de expresión desconocido! {tipo}')
+
+
+def oraculo(
+            oracion:str,
+            dominio:List[str],
+            max_atomos:int=14,
+            eventos:List[str]=(),
+            hechos:Optional[Dict[Tuple, bool]]=None,
+            nombres_unicos:bool=False
+        ) -> Optional[Set[Tuple]]:
+    '''
+    Busca por fuerza bruta una interpretación que haga verdadera la
+    oración. Solo se recorren los átomos de los que depende la oración;
+    los de hechos tienen su valor fijo.
+    Output:
+        - verdaderos, conjunto de átomos verdaderos de un modelo, o None
+                    si la oración es insatisfacible
+    '''
+    formula = AnalizadorLPO().parse(oracion)
+    hechos = {} if hechos is None else hechos
+    atomos = sorted(atomos_relevantes(formula, dominio, eventos, nombres_unicos) - set(hechos))
+    if len(atomos) > max_atomos:
+        raise Exception(f'Error: {len(atomos)} átomos son demasiados para el oráculo (máximo {max_atomos}).')
+    fijos = {a for a, v in hechos.items() if v}
+    for valores in product([False, True], repeat=len(atomos)):
+        verdaderos = fijos | {a for a, v in zip(atomos, valores) if v}
+        if evaluar(formula, verdaderos, dominio=dominio, eventos=eventos, nombres_unicos=nombres_unicos):
+            return verdaderos
+    return None
+
+
+def como_par(atomo:str) -> Tuple[str, Tuple[str, ...]]:
+    '''
+    Átomo decodificado, como 'P(a, b)', en forma de par (predicado, argumentos).
+    '''
+    nombre, resto = atomo.split('(', 1)
+    return (nombre, tuple(a for a in resto[:-1].split(', ') if a))
+
+
+def decodificar_modelo(tester:LogicTester, res:List[int]) -> Set[Tuple]:
+    '''
+    Átomos verdaderos de un modelo del solver, como pares (predicado, argumentos).
+    '''
+    verdaderos = set()
+    for x in res:
+        literal = tester.to_numeric.literal(x)
+        if x > 0 and literal in tester.tseitin.atomos:
+            verdaderos.add(como_par(tester.to_lp.modelo_lp.decodificar(literal)))
+    return verdaderos
+
+
+def nuevo_tester(dominio:List[str], rapido:bool=True, eventos:List[str]=()) -> LogicTester:
+    tester = LogicTester()
+    tester.to_lp = ToPropositionalLogic(rapido=rapido)
+    for c in dominio:
+        tester.to_lp.modelo_lp.agregar_entidad(tipo='individuo', nombre=c)
+    for c in eventos:
+        tester.to_lp.modelo_lp.agregar_entidad(tipo='evento', nombre=c)
+    return tester
+
+
+def resolver(tester:LogicTester, sentencia:str) -> Optional[Set[Tuple]]:
+    res = tester.SATsolve(sentencia)
+    return None if res == 'UNSAT' else decodificar_modelo(tester, res)
+
+
+# Cada camino devuelve los átomos verdaderos del modelo hallado (None si
+# la oración es insatisfacible) y los cambios que su configuración
+# implica en el contexto del oráculo (hechos, nombres_unicos, dominio,
+# eventos).
+
+def camino_analizador(oracion, dominio, eventos):
+    tester = nuevo_tester(dominio, eventos=eventos)
+    return resolver(tester, tester.translation_to_prover(oracion)), {}
+
+
+def camino_nltk(oracion, dominio, eventos):
+    tester = nuevo_tester(dominio, rapido=False, eventos=eventos)
+    return resolver(tester, tester.translation_to_prover(oracion)), {}
+
+
+def camino_preprocesado(oracion, dominio, eventos):
+    tester = nuevo_tester(dominio, eventos=eventos)
+    tester.preprocesar = True
+    return resolver(tester, tester.translation_to_prover(oracion)), {}
+
+
+def camino_paralelo(oracion, dominio, eventos):
+    tester = nuevo_tester(dominio, eventos=eventos)
+    tester.procesos = 2
+    return resolver(tester, tester.translation_to_clausal(oracion)), {}
+
+
+def camino_compilado(oracion, dominio, eventos):
+    problema = nuevo_tester(dominio, eventos=eventos).compile(oracion)
+    descriptor, ruta = tempfile.mkstemp(suffix='.gplc')
+    os.close(descriptor)
+    try:
+        problema.guardar(ruta)
+        problema = ProblemaCompilado.cargar(ruta, mmap=False)
+    finally:
+        os.remove(ruta)
+    tester = LogicTester()
+    res = tester.solve_compiled(problema)
+    return (None if res == 'UNSAT' else decodificar_modelo(tester, res)), {}
+
+
+def camino_hechos(oracion, dominio, eventos):
+    # Hasta dos átomos de la oración con valor conocido, elegidos a partir de la oración
+    azar = random.Random(oracion)
+    formula = AnalizadorLPO().parse(oracion)
+    atomos = sorted(a for a in atomos_relevantes(formula, dominio, eventos) if a[0] != 'IGUALDAD')
+    hechos = {a: azar.random() < 0.5 for a in azar.sample(atomos, min(2, len(atomos)))}
+    tester = nuevo_tester(dominio, eventos=eventos)
+    if hechos:
+        tester.to_lp.modelo_lp.agregar_hechos([
+            f'{"" if valor else "-"}{nombre}({",".join(argumentos)})'
+                for (nombre, argumentos), valor in hechos.items()
+        ])
+    return resolver(tester, tester.translation_to_prover(oracion)), {'hechos': hechos}
+
+
+def camino_nombres_unicos(oracion, dominio, eventos):
+    tester = nuevo_tester(dominio, eventos=eventos)
+    tester.to_lp.modelo_lp.nombres_unicos = True
+    return resolver(tester, tester.translation_to_prover(oracion)), {'nombres_unicos': True}
+
+
+def camino_abierto(oracion, dominio, eventos):
+    # En dominios abiertos se skolemiza, así que el oráculo recorre el
+    # dominio junto con los testigos
+    tester = nuevo_tester(dominio, eventos=eventos)
+    modelo = tester.to_lp.modelo_lp
+    modelo.declarar_abierto('individuo')
+    modelo.declarar_abierto('evento')
+    verdaderos = resolver(tester, tester.translation_to_prover(oracion))
+    testigos = [(tipo, nombre) for tipo, nombre, _ in modelo.testigos_activos]
+    ajustes = {
+        'dominio': list(dominio) + [n for t, n in testigos if t == 'individuo'],
+        'eventos': list(eventos) + [n for t, n in testigos if t == 'evento'],
+    }
+    return verdaderos, ajustes
+
+
+def camino_simetrias(oracion, dominio, eventos):
+    tester = nuevo_tester(dominio, eventos=eventos)
+    tester.simetrias = True
+    modelo = tester.query(oracion).model()
+    return (None if modelo is None else set(como_par(a) for a in modelo)), {}
+
+
+def camino_perezoso(oracion, dominio, eventos):
+    tester = nuevo_tester(dominio, eventos=eventos)
+    with LazyGrounder(oracion, to_lp=tester.to_lp) as grounder:
+        res = grounder.solve()
+    return (None if res == 'UNSAT' else set(como_par(a) for a in res)), {}
+
+
+def camino_base(oracion, dominio, eventos):
+    # Sin premisas, la base implica -oracion sii la oración es insatisfacible
+    with KnowledgeBase([]) as base:
+        base.to_lp = nuevo_tester(dominio, eventos=eventos).to_lp
+        if base.entails(f'-{oracion}'):
+            return None, {}
+        return set(como_par(a) for a in base.last_model), {}
+
+
+CAMINOS: Dict[str, Callable] = {
+    'analizador': camino_analizador,
+    'nltk': camino_nltk,
+    'preprocesado': camino_preprocesado,
+    'paralelo': camino_paralelo,
+    'compilado': camino_compilado,
+    'hechos': camino_hechos,
+    'nombres_unicos': camino_nombres_unicos,
+    'abierto': camino_abierto,
+    'simetrias': camino_simetrias,
+    'perezoso': camino_perezoso,
+    'base': camino_base,
+}
+
+
+def diferencial(
+            casos:int=100,
+            semilla:int=0,
+            caminos:Optional[List[str]]=None,
+            max_atomos:int=14,
+            **perillas
+        ) -> Tuple[List[str], int]:
+    '''
+    Compara cada camino del pipeline con el oráculo en oraciones aleatorias.
+    Las oraciones que dependen de más de max_atomos átomos se descartan;
+    si el contexto de un camino (por ejemplo, el dominio con testigos)
+    excede ese máximo, ese camino no se verifica en ese caso. Si el
+    oráculo falla por otra razón, se cuenta como una falla.
+    Input:
+        - casos, número de oraciones
+        - semilla, semilla del generador
+        - caminos, nombres de CAMINOS a verificar (por defecto, todos)
+        - max_atomos, máximo de átomos que recorre el oráculo
+        - perillas, argumentos de GeneradorFormulas (por defecto con un evento)
+    Output:
+        - fallas, lista de descripciones de las discrepancias
+        - generados, número de oraciones verificadas (puede ser menor
+                    que casos si pocas oraciones caben en max_atomos)
+    '''
+    perillas.setdefault('num_eventos', 1)
+    generador = GeneradorFormulas(semilla=semilla, **perillas)
+    caminos = list(CAMINOS) if caminos is None else caminos
+    dominio, eventos = generador.constantes, generador.eventos
+    fallas = []
+    generados = 0
+    for _ in range(100 * casos):
+        if generados == casos:
+            break
+        oracion = generador.formula()
+        formula = AnalizadorLPO().parse(oracion)
+        if len(atomos_relevantes(formula, dominio, eventos)) > max_atomos:
+            continue
+        generados += 1
+        esperados = {}
+        for nombre in caminos:
+            try:
+                verdaderos, ajustes = CAMINOS[nombre](oracion, dominio, eventos)
+            except Exception as e:
+                fallas.append(f'{nombre}: {oracion}\n\terror: {e!r}')
+                continue
+            contexto = {'dominio': dominio, 'eventos': eventos, 'hechos': {}, 'nombres_unicos': False, **ajustes}
+            clave = repr(sorted(contexto.items()))
+            if clave not in esperados:
+                atomos = atomos_relevantes(formula, contexto['dominio'], contexto['eventos'], contexto['nombres_unicos'])
+                if len(atomos - set(contexto['hechos'])) > max_atomos:
+                    esperados[clave] = False
+                else:
+                    try:
+                        esperados[clave] = oraculo(oracion, max_atomos=max_atomos, **contexto)
+                    except Exception as e:
+                        esperados[clave] = e
+            esperado = esperados[clave]
+            if esperado is False:
+                continue
+            if isinstance(esperado, Exception):
+                fallas.append(f'{nombre}: {oracion}\n\toráculo: error {esperado!r}')
+                continue
+            if (verdaderos is None) != (esperado is None):
+                fallas.append(f'{nombre}: {oracion}\n\tsolver: {"UNSAT" if verdaderos is None else "SAT"}, oráculo: {"UNSAT" if esperado is None else "SAT"}')
+            elif verdaderos is not None:
+                # Los hechos no llegan al solver: su valor es el conocido
+                verdaderos = (verdaderos - set(contexto['hechos'])) | {a for a, v in contexto['hechos'].items() if v}
+                if not evaluar(formula, verdaderos, dominio=contexto['dominio'], eventos=contexto['eventos'], nombres_unicos=contexto['nombres_unicos']):
+                    fallas.append(f'{nombre}: {oracion}\n\tel modelo {sorted(verdaderos)} no satisface la oración')
+    return fallas, generados
+
+
+def main(argumentos:Optional[List[str]]=None) -> int:
+    parser = argparse.ArgumentParser(description='Verificación diferencial contra fuerza bruta.')
+    parser.add_argument('--casos', type=int, default=100)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--caminos', nargs='+', choices=list(CAMINOS), default=None)
+    parser.add_argument('--dominio', type=int, default=2)
+    parser.add_argument('--predicados', type=int, default=2)
+    parser.add_argument('--aridad', type=int, default=2)
+    parser.add_argument('--profundidad', type=int, default=3)
+    parser.add_argument('--cuantificadores', type=int, default=2)
+    parser.add_argument('--eventos', type=int, default=1)
+    parser.add_argument('--igualdad', type=float, default=0.1)
+    args = parser.parse_args(argumentos)
+    fallas, generados = diferencial(
+        casos=args.casos, semilla=args.semilla, caminos=args.caminos,
+        tamano_dominio=args.dominio, num_predicados=args.predicados,
+        aridad_maxima=args.aridad, profundidad=args.profundidad,
+        profundidad_cuantificadores=args.cuantificadores,
+        num_eventos=args.eventos, prob_igualdad=args.igualdad
+    )
+    for falla in fallas:
+        print(falla)
+    print(f'{generados} casos, {len(fallas)} fallas')
+    return 1 if fallas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
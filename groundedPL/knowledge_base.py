@@ -0,0 +1,339 @@
+'''
+Premisas fijas compiladas una sola vez en un solver persistente.
+'''
+import threading
+
+from typing import Dict, List, Optional
+from pysat.solvers import Solver
+
+from groundedPL import solvers
+from groundedPL.logUtils import LogUtils
+from groundedPL.tseitin import TseitinTransform
+from groundedPL.codificacion import ToPropositionalLogic
+
+
+def quantifier_free(formula) -> bool:
+    '''
+    Determina si una fórmula (de nltk o de AnalizadorLPO) no tiene cuantificadores.
+    Input:
+        - formula, fórmula a revisar
+    Output:
+        - True si la fórmula no tiene cuantificadores, False en otro caso
+    '''
+    stack = [formula]
+    while stack:
+        f = stack.pop()
+        kind = LogUtils.obtener_type(f)
+        if kind in ['ExistsExpression', 'AllExpression']:
+            return False
+        elif kind == 'NegatedExpression':
+            stack.append(f.term)
+        elif kind in ['AndExpression', 'OrExpression', 'ImpExpression', 'IffExpression']:
+            stack.append(f.first)
+            stack.append(f.second)
+    return True
+
+
+class GroundedSolver:
+    '''
+    Solver persistente de pysat al que se le agregan fórmulas fundamentadas.
+    Los átomos se identifican por su nombre decodificado (p.ej.
+    'MORTAL(socrates)') y no por su código de un carácter, pues los
+    códigos cambian cada vez que crece el vocabulario.
+    '''
+
+    def __init__(self, solver:str=solvers.DEFAULT_SOLVER, to_lp:Optional[ToPropositionalLogic]=None) -> None:
+        '''
+        Input:
+            - solver, nombre del solver de pysat
+            - to_lp, traductor cuyo modelo se usa para fundamentar
+                        (por defecto, uno nuevo)
+        '''
+        self.to_lp = to_lp if to_lp is not None else ToPropositionalLogic()
+        self.tseitin = TseitinTransform()
+        self.debug = False
+        self.solver_name = solvers.check_solver(solver)
+        self.solver = Solver(name=self.solver_name)
+        self.lock = threading.RLock()
+        self.stoi: Dict[str, int] = {}
+        self.itos: List[str] = ['<PAD>']
+        self.blocks = 0
+
+    def conjuncts(self, formula) -> list:
+        '''
+        Aplana las conjunciones del nivel superior de una fórmula.
+        Input:
+            - formula, fórmula a aplanar
+        Output:
+            - lista de los conyuntos, en orden de izquierda a derecha
+        '''
+        conjuncts = []
+        stack = [formula]
+        while stack:
+            f = stack.pop()
+            if LogUtils.obtener_type(f) == 'AndExpression':
+                stack.append(f.second)
+                stack.append(f.first)
+            else:
+                conjuncts.append(f)
+        return conjuncts
+
+    def constants(self) -> set:
+        '''
+        Output:
+            - conjunto con los nombres de las constantes del modelo
+        '''
+        modelo = self.to_lp.modelo_lp
+        return set(c.nombre for tipo in modelo.entidades for c in modelo.entidades[tipo])
+
+    def new_var(self, name:str) -> int:
+        '''
+        Crea una variable nueva del solver.
+        Input:
+            - name, nombre de la variable
+        Output:
+            - número de la variable
+        '''
+        self.stoi[name] = len(self.itos)
+        self.itos.append(name)
+        return self.stoi[name]
+
+    def var(self, name:str) -> int:
+        '''
+        Devuelve el número de la variable, creándola si no existe.
+        Input:
+            - name, nombre de la variable
+        Output:
+            - número de la variable
+        '''
+        if name not in self.stoi:
+            return self.new_var(name)
+        return self.stoi[name]
+
+    def encode(self, formula) -> List[List[int]]:
+        '''
+        Fundamenta, codifica con Tseitin y numera una fórmula cerrada.
+        Input:
+            - formula, fórmula cerrada
+        Output:
+            - lista de cláusulas numéricas; la primera es la cláusula
+                        unitaria que afirma la fórmula
+        '''
+        modelo = self.to_lp.modelo_lp
+        formula_lp = modelo.codificar_lp(modelo.fundamentar(formula))
+        clausal = self.tseitin.tseitin(formula_lp)
+        names = {a: modelo.decodificar(a) for a in self.tseitin.atomos}
+        names.update({a: f'{a}_{self.blocks}' for a in self.tseitin.atomos_tseitin})
+        self.blocks += 1
+        clauses = []
+        for C in clausal:
+            C_ = []
+            for literal in C:
+                if literal[0] == '-':
+                    C_.append(-self.var(names[literal[1:]]))
+                else:
+                    C_.append(self.var(names[literal]))
+            clauses.append(C_)
+        return clauses
+
+    def add_formula(self, formula, selector:Optional[int]=None) -> None:
+        '''
+        Agrega una fórmula al solver, condicionada al selector si se da.
+        Solo la cláusula raíz necesita la guarda: las definiciones de
+        Tseitin son satisfacibles para cualquier valor de los átomos
+        originales.
+        Input:
+            - formula, fórmula cerrada
+            - selector, variable que activa la fórmula al suponerla
+        '''
+        clauses = self.encode(formula)
+        if selector is not None:
+            clauses[0] = [-selector] + clauses[0]
+        for C in clauses:
+            self.solver.add_clause(C)
+
+    def solve_limited(
+                self,
+                assumptions:List[int],
+                timeout:Optional[float]=None,
+                conf_budget:Optional[int]=None,
+                prop_budget:Optional[int]=None
+            ) -> Optional[bool]:
+        '''
+        Resuelve bajo suposiciones, con límites opcionales.
+        Input:
+            - assumptions, literales supuestos
+            - timeout, segundos máximos de búsqueda
+            - conf_budget, máximo de conflictos
+            - prop_budget, máximo de propagaciones
+        Output:
+            - True/False, o None si se alcanzó un límite antes de responder
+        '''
+        if timeout is not None and self.solver_name in solvers.NO_INTERRUPT:
+            raise Exception(f'Error: Solver {self.solver_name} cannot be interrupted; use a different backend for timeouts')
+        if conf_budget is not None:
+            self.solver.conf_budget(conf_budget)
+        if prop_budget is not None:
+            self.solver.prop_budget(prop_budget)
+        if timeout is None and conf_budget is None and prop_budget is None:
+            return self.solver.solve(assumptions=assumptions)
+        timer = None
+        if timeout is not None:
+            timer = threading.Timer(timeout, self.solver.interrupt)
+            timer.start()
+        try:
+            return self.solver.solve_limited(assumptions=assumptions, expect_interrupt=True)
+        finally:
+            if timer is not None:
+                timer.cancel()
+            self.solver.clear_interrupt()
+
+    def true_atoms(self) -> List[str]:
+        '''
+        Output:
+            - átomos fundamentados verdaderos en el último modelo del solver
+        '''
+        return [self.itos[l] for l in self.solver.get_model() if l > 0 and '(' in self.itos[l]]
+
+    def close(self) -> None:
+        '''
+        Libera el solver de pysat.
+        '''
+        self.solver.delete()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class KnowledgeBase(GroundedSolver):
+    '''
+    Responde muchas consultas de implicación sobre un conjunto fijo de
+    premisas. Las premisas se fundamentan y codifican una sola vez y se
+    mantienen en un solver incremental. Cada consulta solo codifica la
+    conclusión negada, guardada por un selector nuevo que se supone
+    durante esa búsqueda y se retira después.
+
+    Cuando una conclusión trae constantes nuevas, el dominio se extiende
+    de forma incremental: los conyuntos del nivel superior de la forma
+    all x1...all xn.phi, con phi sin cuantificadores, solo reciben las
+    instancias que usan alguna constante nueva. Las demás premisas están
+    guardadas por un selector de época; cuando cambia el dominio, la
+    época se retira y esas premisas se fundamentan de nuevo sobre el
+    dominio ampliado.
+    '''
+
+    def __init__(self, premisas:List[any], solver:str=solvers.DEFAULT_SOLVER) -> None:
+        '''
+        Input:
+            - premisas, lista de premisas (cadenas, expresiones de nltk o Formula)
+            - solver, nombre del solver de pysat
+        '''
+        super().__init__(solver)
+        # Átomos verdaderos del contramodelo de la última consulta fallida
+        self.last_model = None
+        # La misma expansión de las premisas que en LogicTester.check_implication
+        formulas = [self.to_lp.con_clases_no_vacias(self.to_lp.a_formula(p)) for p in premisas]
+        modelo = self.to_lp.modelo_lp
+        for f in formulas:
+            modelo.poblar_con(f)
+        self.incremental = []
+        self.regrounded = []
+        for f in formulas:
+            for conjunct in self.conjuncts(f):
+                body = conjunct
+                while LogUtils.obtener_type(body) == 'AllExpression':
+                    body = body.term
+                if quantifier_free(body):
+                    self.incremental.append(conjunct)
+                else:
+                    self.regrounded.append(conjunct)
+        self.known = self.constants()
+        self.epoch = self.new_var('epoch')
+        for f in self.incremental:
+            self.add_formula(f)
+        for f in self.regrounded:
+            self.add_formula(f, selector=self.epoch)
+
+    def new_instances(self, formula, new:set) -> list:
+        '''
+        Instancias de all x1...all xn.phi que usan al menos una constante
+        de new. En el cuantificador más interno, si todavía no se usó
+        ninguna constante nueva, solo se prueban las constantes nuevas.
+        Input:
+            - formula, fórmula de la forma all x1...all xn.phi
+            - new, conjunto de constantes nuevas
+        Output:
+            - lista de instancias sin cuantificadores
+        '''
+        modelo = self.to_lp.modelo_lp
+        instances = []
+        stack = [(formula, False)]
+        while stack:
+            f, used = stack.pop()
+            if LogUtils.obtener_type(f) != 'AllExpression':
+                if used:
+                    instances.append(f)
+                continue
+            innermost = LogUtils.obtener_type(f.term) != 'AllExpression'
+            for c in modelo.dominio(f):
+                if innermost and not used and c not in new:
+                    continue
+                stack.append((modelo.instanciar(f, c), used or c in new))
+        return instances
+
+    def extend_domain(self) -> None:
+        '''
+        Actualiza las premisas con las constantes que hay ahora en el modelo.
+        '''
+        new = self.constants() - self.known
+        if len(new) == 0:
+            return
+        if self.debug:
+            print(f'Nuevas constantes: {sorted(new)}')
+        self.known |= new
+        for f in self.incremental:
+            for instance in self.new_instances(f, new):
+                self.add_formula(instance)
+        if len(self.regrounded) > 0:
+            self.solver.add_clause([-self.epoch])
+            self.epoch = self.new_var(f'epoch_{self.blocks}')
+            for f in self.regrounded:
+                self.add_formula(f, selector=self.epoch)
+
+    def entails(
+                self,
+                conclusion:any,
+                timeout:Optional[float]=None,
+                conf_budget:Optional[int]=None,
+                prop_budget:Optional[int]=None
+            ) -> Optional[bool]:
+        '''
+        Determina si las premisas implican la conclusión.
+        Input:
+            - conclusion, conclusión (cadena, expresión de nltk o Formula)
+            - timeout, segundos máximos de búsqueda
+            - conf_budget, máximo de conflictos
+            - prop_budget, máximo de propagaciones
+        Output:
+            - True/False, o None si se alcanzó un límite antes de responder
+        '''
+        with self.lock:
+            modelo = self.to_lp.modelo_lp
+            negated = modelo.negacion(self.to_lp.a_formula(conclusion))
+            modelo.poblar_con(negated)
+            self.extend_domain()
+            query = self.new_var(f'query_{self.blocks}')
+            self.add_formula(negated, selector=query)
+            res = self.solve_limited(
+                [self.epoch, query], timeout=timeout,
+                conf_budget=conf_budget, prop_budget=prop_budget
+            )
+            self.last_model = self.true_atoms() if res else None
+            # La consulta se retira para que las siguientes no la vean
+            self.solver.add_clause([-query])
+            if res is None:
+                return None
+            return not res
@@ -0,0 +1,254 @@
+'''
+Instanciación de cuantificadores universales guiada por contraejemplos.
+'''
+from typing import Dict, List, Optional, Tuple, Union
+
+from groundedPL import solvers
+from groundedPL.logUtils import LogUtils
+from groundedPL.codificacion import ToPropositionalLogic
+from groundedPL.knowledge_base import GroundedSolver
+
+
+class LazyGrounder(GroundedSolver):
+    '''
+    Decide una oración sin expandir de antemano sus universales externos
+    sobre todo el dominio.
+
+    La oración se divide en conjunciones de primer nivel, llevando las
+    negaciones a través de -, |, -> y exists, de modo que -(A -> all x.B)
+    da A y exists x.-B, y -exists x.B da un universal sobre -B. Los
+    conyuntos de la forma all x1...all xn.phi (salvo esas negaciones) son
+    perezosos; los demás se fundamentan como siempre. En cada ronda se
+    resuelven las instancias agregadas hasta el momento y se evalúa phi en
+    el modelo candidato, completado con False en los átomos que el solver
+    no ha visto. Solo las instancias violadas se fundamentan y se agregan
+    antes de volver a resolver.
+
+    La oración implica cada instancia, así que una respuesta UNSAT es
+    definitiva, y un modelo que no viola ninguna instancia es modelo de la
+    oración. Ninguna instancia se agrega dos veces, así que el ciclo
+    termina con la misma respuesta que la fundamentación completa.
+    '''
+
+    def __init__(
+                self,
+                sentence:any,
+                solver:str=solvers.DEFAULT_SOLVER,
+                to_lp:Optional[ToPropositionalLogic]=None
+            ) -> None:
+        '''
+        Input:
+            - sentence, oración cerrada (cadena, expresión de nltk o Formula)
+            - solver, nombre del solver de pysat
+            - to_lp, traductor cuyo modelo da el dominio (por defecto, uno nuevo)
+        '''
+        super().__init__(solver, to_lp=to_lp)
+        formula = self.to_lp.a_formula(sentence) if isinstance(sentence, str) else sentence
+        modelo = self.to_lp.modelo_lp
+        modelo.poblar_con(formula)
+        formula = modelo.skolemizar(formula)
+        # Conyuntos perezosos como (fórmula, polaridad, cadena de cuantificadores,
+        # cuerpo, polaridad del cuerpo)
+        self.lazy = []
+        self.domains = {}
+        self.added = set()
+        self.rounds = 0
+        self.instances = 0
+        self.last_model = None
+        for f, positive in self.split(formula):
+            if self.universal(f, positive):
+                self.lazy.append((f, positive) + self.chain(f, positive))
+            else:
+                self.add_formula(f if positive else modelo.negacion(f))
+
+    def split(self, formula) -> List[Tuple[any, bool]]:
+        '''
+        Conyuntos de primer nivel de la fórmula, cada uno con su polaridad.
+        '''
+        conjuncts = []
+        stack = [(formula, True)]
+        while stack:
+            f, positive = stack.pop()
+            kind = LogUtils.obtener_type(f)
+            if kind == 'NegatedExpression':
+                stack.append((f.term, not positive))
+            elif kind == 'AndExpression' and positive:
+                stack.append((f.second, True))
+                stack.append((f.first, True))
+            elif kind == 'OrExpression' and not positive:
+                stack.append((f.second, False))
+                stack.append((f.first, False))
+            elif kind == 'ImpExpression' and not positive:
+                stack.append((f.second, False))
+                stack.append((f.first, True))
+            else:
+                conjuncts.append((f, positive))
+        return conjuncts
+
+    def universal(self, f, positive:bool) -> bool:
+        kind = LogUtils.obtener_type(f)
+        return (kind == 'AllExpression' and positive) or (kind == 'ExistsExpression' and not positive)
+
+    def chain(self, f, positive:bool) -> Tuple[list, any, bool]:
+        '''
+        Cuantificadores que actúan como universales al comienzo de f, su
+        cuerpo y la polaridad del cuerpo.
+        '''
+        quantifiers = []
+        while True:
+            if LogUtils.obtener_type(f) == 'NegatedExpression':
+                f, positive = f.term, not positive
+            elif self.universal(f, positive):
+                quantifiers.append(f)
+                f = f.term
+            else:
+                return quantifiers, f, positive
+
+    def domain(self, quantifier) -> List[str]:
+        key = id(quantifier)
+        if key not in self.domains:
+            self.domains[key] = self.to_lp.modelo_lp.dominio(quantifier)
+        return self.domains[key]
+
+    def value(self, f, env:Dict[str, Optional[str]], true:set) -> Optional[bool]:
+        '''
+        Valor trivalente de f cuando las variables de env están ligadas a
+        constantes, o a None si aún no lo están (sus átomos se desconocen).
+        '''
+        kind = LogUtils.obtener_type(f)
+        modelo = self.to_lp.modelo_lp
+        if kind == 'ApplicationExpression':
+            args = [env.get(str(a), str(a)) for a in f.args]
+            if None in args:
+                return None
+            if modelo.hechos:
+                known = modelo.hechos.get(f'{f.pred}({",".join(args)})')
+                if known is not None:
+                    return known
+            return f'{f.pred}({", ".join(args)})' in true
+        elif kind == 'EqualityExpression':
+            first, second = [env.get(str(a), str(a)) for a in (f.first, f.second)]
+            if first is None or second is None:
+                return None
+            if modelo.nombres_unicos:
+                return first == second
+            if modelo.hechos:
+                known = modelo.hechos.get(f'({first} = {second})')
+                if known is not None:
+                    return known
+            return f'IGUALDAD({first}, {second})' in true
+        elif kind == 'NegatedExpression':
+            v = self.value(f.term, env, true)
+            return None if v is None else not v
+        elif kind in ['AndExpression', 'OrExpression', 'ImpExpression', 'IffExpression']:
+            first = self.value(f.first, env, true)
+            if kind == 'ImpExpression' and first is not None:
+                first = not first
+            if kind != 'IffExpression':
+                # Cortocircuito: False en una conjunción, True en una disyunción
+                decisive = kind != 'AndExpression'
+                if first is decisive:
+                    return decisive
+                second = self.value(f.second, env, true)
+                if second is decisive:
+                    return decisive
+                return None if first is None or second is None else not decisive
+            second = self.value(f.second, env, true)
+            return None if first is None or second is None else first == second
+        elif kind in ['AllExpression', 'ExistsExpression']:
+            decisive = kind == 'ExistsExpression'
+            unknown = False
+            for c in self.domain(f):
+                v = self.value(f.term, {**env, f.variable.name: c}, true)
+                if v is decisive:
+                    return decisive
+                unknown = unknown or v is None
+            return None if unknown else not decisive
+        raise Exception(f'¡Tipo de expresión desconocido! {kind}')
+
+    def violations(self, quantifiers:list, body, positive:bool, true:set) -> List[Tuple[str, ...]]:
+        '''
+        Asignaciones de los cuantificadores bajo las cuales el cuerpo no
+        tiene la polaridad requerida. Una asignación parcial se poda en
+        cuanto el cuerpo se cumple sean cuales sean las constantes que faltan.
+        '''
+        found = []
+        stack = [({q.variable.name: None for q in quantifiers}, ())]
+        while stack:
+            env, constants = stack.pop()
+            v = self.value(body, env, true)
+            if v is positive:
+                continue
+            if len(constants) == len(quantifiers):
+                found.append(constants)
+                continue
+            q = quantifiers[len(constants)]
+            for c in self.domain(q):
+                stack.append(({**env, q.variable.name: c}, constants + (c,)))
+        return found
+
+    def instance(self, f, positive:bool, constants:Tuple[str, ...]):
+        '''
+        Instancia la cadena de universales de f con las constantes dadas.
+        '''
+        modelo = self.to_lp.modelo_lp
+        for c in constants:
+            while LogUtils.obtener_type(f) == 'NegatedExpression':
+                f, positive = f.term, not positive
+            f = modelo.instanciar(f, c)
+        return f if positive else modelo.negacion(f)
+
+    def close(self) -> None:
+        super().close()
+        # Los testigos de Skolem solo hacen falta mientras se fundamentan instancias
+        self.to_lp.modelo_lp.retirar_testigos()
+
+    def total_instances(self) -> int:
+        '''
+        Número de instancias que produciría la fundamentación completa.
+        '''
+        total = 0
+        for _, _, quantifiers, _, _ in self.lazy:
+            size = 1
+            for q in quantifiers:
+                size *= len(self.domain(q))
+            total += size
+        return total
+
+    def solve(
+                self,
+                timeout:Optional[float]=None,
+                conf_budget:Optional[int]=None,
+                prop_budget:Optional[int]=None
+            ) -> Union[List[str], str]:
+        '''
+        Output:
+            - model, lista de los átomos fundamentados verdaderos, 'UNSAT', o
+                        'UNKNOWN' si se alcanzó un límite (los límites
+                        valen para cada ronda)
+        '''
+        with self.lock:
+            while True:
+                self.rounds += 1
+                res = self.solve_limited([], timeout=timeout, conf_budget=conf_budget, prop_budget=prop_budget)
+                if res is None:
+                    return solvers.UNKNOWN
+                if not res:
+                    return 'UNSAT'
+                model = self.true_atoms()
+                true = set(model)
+                pending = []
+                for i, (f, positive, quantifiers, body, body_positive) in enumerate(self.lazy):
+                    for constants in self.violations(quantifiers, body, body_positive, true):
+                        assert((i, constants) not in self.added), f'Instancia repetida {constants}'
+                        pending.append((i, constants))
+                if self.debug:
+                    print(f'Ronda {self.rounds}: {len(pending)} instancias violadas')
+                if len(pending) == 0:
+                    self.last_model = model
+                    return model
+                for i, constants in pending:
+                    f, positive = self.lazy[i][:2]
+                    self.added.add((i, constants))
+                    self.add_formula(self.instance(f, positive, constants))
+                    self.instances += 1
@@ -6,22 +6,43 @@ class Constante:
     '''
     Define las constantes del lenguaje. Estas representarán
     los individuos del universo.
+    Las constantes están internadas: dos llamadas con el mismo
+    tipo y nombre devuelven el mismo objeto. La igualdad y el
+    hash dependen solo del nombre.
     '''
-    def __init__(self, tipo:str='individuo', nombre:str=''):
-        self.tipo = tipo
-        self.nombre = nombre
+    __slots__ = ('tipo', 'nombre')
+    _internadas = {}
 
-    def en_conjunto(self, constantes:list) -> bool:
+    def __new__(cls, tipo:str='individuo', nombre:str=''):
+        clave = (tipo, nombre)
+        try:
+            return cls._internadas[clave]
+        except KeyError:
+            constante = super().__new__(cls)
+            constante.tipo = tipo
+            constante.nombre = nombre
+            cls._internadas[clave] = constante
+            return constante
+
+    def __getnewargs__(self):
+        return (self.tipo, self.nombre)
+
+    def en_conjunto(self, constantes) -> bool:
         '''
         Determina si la constante está en un conjunto
         de constantes dado.
         Input:
-            - constantes, lista de constantes
+            - constantes, lista o conjunto de constantes
         Output:
             - True/False
         '''
-        nombres = [c.nombre for c in constantes]
-        return self.nombre in nombres
+        return self in constantes
+
+    def __eq__(self, otra):
+        return isinstance(otra, Constante) and self.nombre == otra.nombre
+
+    def __hash__(self):
+        return hash(self.nombre)
 
     def __str__(self):
         return self.nombre
@@ -30,23 +51,44 @@ class Predicado:
     '''
     Define las constantes de predicado del lenguaje.
     Requiere un nombre y una lista de tipos (como cadenas).
+    Los predicados están internados: dos llamadas con el mismo
+    nombre y tipos devuelven el mismo objeto. La igualdad y el
+    hash dependen solo del nombre.
     '''
-    def __init__(self, nombre:str, tipos_argumentos:list):
-        self.nombre = nombre
-        self.aridad = len(tipos_argumentos)
-        self.tipos_argumentos = tipos_argumentos
+    __slots__ = ('nombre', 'aridad', 'tipos_argumentos')
+    _internados = {}
+
+    def __new__(cls, nombre:str, tipos_argumentos:list):
+        clave = (nombre, tuple(tipos_argumentos))
+        try:
+            return cls._internados[clave]
+        except KeyError:
+            predicado = super().__new__(cls)
+            predicado.nombre = nombre
+            predicado.aridad = len(tipos_argumentos)
+            predicado.tipos_argumentos = list(tipos_argumentos)
+            cls._internados[clave] = predicado
+            return predicado
 
-    def en_conjunto(self, predicados:list) -> bool:
+    def __getnewargs__(self):
+        return (self.nombre, self.tipos_argumentos)
+
+    def en_conjunto(self, predicados) -> bool:
         '''
         Determina si la constante está en un conjunto
         de predicados dado.
         Input:
-            - predicados, lista de predicados
+            - predicados, lista o conjunto de predicados
         Output:
             - True/False
         '''
-        nombres = [p.nombre for p in predicados]
-        return self.nombre in nombres
+        return self in predicados
+
+    def __eq__(self, otro):
+        return isinstance(otro, Predicado) and self.nombre == otro.nombre
+
+    def __hash__(self):
+        return hash(self.nombre)
 
     def __str__(self):
-        return self.nombre
\ No newline at end of file
+        return self.nombre
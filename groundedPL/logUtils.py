@@ -3,6 +3,7 @@ Funciones auxiliares sobre fórmulas en lógica de primer orden (lpo).
 '''
 import nltk
 from groundedPL.logClases import *
+from groundedPL import analizador
 
 lp = nltk.sem.logic.LogicParser()
 
@@ -136,11 +137,8 @@ class LogUtils:
         Output
             - lista de objetos constante
         '''
-        unicos = [c for c in consts1]
-        for c in consts2:
-            if not c.en_conjunto(consts1):
-                unicos.append(c)
-        return unicos
+        # dict conserva el orden de inserción y la primera constante de cada nombre
+        return list(dict.fromkeys([*consts1, *consts2]))
  
     @staticmethod
     def unir_predicados(preds1:list, preds2:list) -> list:
@@ -153,17 +151,25 @@ class LogUtils:
         Output
             - lista de objetos predicado
         '''
-        unicos = [p for p in preds1]
-        for p in preds2:
-            if not p.en_conjunto(preds1):
-                unicos.append(p)
-        return unicos
+        return list(dict.fromkeys([*preds1, *preds2]))
+
+    @staticmethod
+    def constante_de(nombre:str) -> Constante:
+        '''
+        Crea la constante con el tipo que corresponde a su nombre
+        (evento si empieza por Ev_, individuo en otro caso).
+        '''
+        if nombre[0:3] == 'Ev_':
+            return Constante(tipo='evento', nombre=nombre)
+        return Constante(tipo='individuo', nombre=nombre)
 
     @staticmethod
     def obtener_vocabulario(expresion:nltk.sem.logic) -> list:
         '''
         Toma una fórmula en lpo de nltk y devuelve sus
         constantes y predicados como objetos de parseSit.
+        El recorrido es iterativo y acumula en conjuntos ordenados,
+        por lo que es lineal en el tamaño de la fórmula.
         Input:
             - expresion, que es una fórmula en lpo de nltk
         Output:
@@ -172,59 +178,41 @@ class LogUtils:
             - predicados, que es un conjunto de
                         predicados (como objetos de parseSit)
         '''
-        tipo = LogUtils.obtener_type(expresion)
-        #print(f'tipo: {tipo}')
-        if tipo in ['ExistsExpression', 'AllExpression', 'LambdaExpression', 'NegatedExpression']:
-            return LogUtils.obtener_vocabulario(expresion.term)
-        elif tipo in ['AndExpression', 'OrExpression', 'ImpExpression']:
-            constantes1, predicados1 = LogUtils.obtener_vocabulario(expresion.first)
-            constantes2, predicados2 = LogUtils.obtener_vocabulario(expresion.second)
-            return  LogUtils.unir_constantes(constantes1, constantes2), LogUtils.unir_predicados(predicados1, predicados2)
-        elif tipo in ['ApplicationExpression']:
-            # Creamos el predicado
-            predicados_ = expresion.predicates()
-            assert(len(predicados_) == 1)
-            argumentos = expresion.args
-            #print(argumentos)
-            tipos_argumentos = [LogUtils.obtener_type(x) for x in argumentos]
-            #print(tipos_argumentos)
-            predicado = Predicado(
-                nombre=str(list(predicados_)[0]), 
-                tipos_argumentos=tipos_argumentos
-            )
-            #print(predicado.nombre)
-            #print(predicado.tipos_argumentos)
-            predicados = [predicado] 
-            # Creamos las constantes
-            constantes = []
-            for x in argumentos:
-                #print('for x in argumentos')
-                #print(x)
-                tipo_x = LogUtils.obtener_type(x)
-                if 'Constant' in tipo_x:
-                    if str(x)[0:3] == 'Ev_':
-                        tipo_constante = 'evento'
-                    else:
-                        tipo_constante = 'individuo'
-                    c = Constante(tipo=tipo_constante, nombre=str(x))
-                    if not c.en_conjunto(constantes):
-                        constantes.append(c)
-            return  constantes, predicados
-        elif tipo in ['EqualityExpression']:
-            constantes = []
-            for x in expresion.constants():
-                if str(x)[0:3] == 'Ev_':
-                    tipo_constante = 'evento'
-                else:
-                    tipo_constante = 'individuo'
-                c = Constante(tipo=tipo_constante, nombre=str(x))
-                if not c.en_conjunto(constantes):
-                    constantes.append(c)    
-            predicado = Predicado(nombre='IGUALDAD', tipos_argumentos=['any', 'any'])
-            predicados = [predicado] 
-            return constantes, predicados
-        else:
-            raise Exception(f'¡Tipo de expresión desconocido! {tipo}')
+        constantes = {}
+        predicados = {}
+        pila = [expresion]
+        while pila:
+            expresion = pila.pop()
+            tipo = LogUtils.obtener_type(expresion)
+            if tipo in ['ExistsExpression', 'AllExpression', 'LambdaExpression', 'NegatedExpression']:
+                pila.append(expresion.term)
+            elif tipo in ['AndExpression', 'OrExpression', 'ImpExpression', 'IffExpression']:
+                # Se apila second primero para visitar first antes
+                pila.append(expresion.second)
+                pila.append(expresion.first)
+            elif tipo in ['ApplicationExpression']:
+                # Creamos el predicado
+                predicados_ = expresion.predicates()
+                assert(len(predicados_) == 1)
+                argumentos = expresion.args
+                tipos_argumentos = [LogUtils.obtener_type(x) for x in argumentos]
+                predicado = Predicado(
+                    nombre=str(list(predicados_)[0]), 
+                    tipos_argumentos=tipos_argumentos
+                )
+                predicados.setdefault(predicado, None)
+                # Creamos las constantes
+                for x, tipo_x in zip(argumentos, tipos_argumentos):
+                    if 'Constant' in tipo_x:
+                        constantes.setdefault(LogUtils.constante_de(str(x)), None)
+            elif tipo in ['EqualityExpression']:
+                for x in expresion.constants():
+                    constantes.setdefault(LogUtils.constante_de(str(x)), None)
+                predicado = Predicado(nombre='IGUALDAD', tipos_argumentos=['any', 'any'])
+                predicados.setdefault(predicado, None)
+            else:
+                raise Exception(f'¡Tipo de expresión desconocido! {tipo}')
+        return list(constantes), list(predicados)
 
     @staticmethod
     def encuentra_nombre(variable:str, predicados:list, formula) -> str:
@@ -257,6 +245,7 @@ class LogUtils:
         Toma una lista de formulas y las une mediante &.
         Input:
             - lista_forms, que es una lista de fórmulas como objetos de nltk
+                        o de AnalizadorLPO
         Output:
             - formula, que es un objeto de nltk
         '''
@@ -265,9 +254,13 @@ class LogUtils:
         elif len(lista_forms) == 1:
             return lista_forms[0]
         else:
+            if isinstance(lista_forms[0], nltk.sem.logic.Expression):
+                conectivo = nltk.sem.logic.AndExpression
+            else:
+                conectivo = analizador.AndExpression
             form = lista_forms[0]
             for f in lista_forms[1:]:
-                form = nltk.sem.logic.AndExpression(form, f)
+                form = conectivo(form, f)
             return form
 
     @staticmethod
@@ -276,6 +269,7 @@ class LogUtils:
         Toma una lista de formulas y las une mediante |.
         Input:
             - lista_forms, que es una lista de fórmulas como objetos de nltk
+                        o de AnalizadorLPO
         Output:
             - formula, que es un objeto de nltk
         '''
@@ -284,11 +278,60 @@ class LogUtils:
         elif len(lista_forms) == 1:
             return lista_forms[0]
         else:
+            if isinstance(lista_forms[0], nltk.sem.logic.Expression):
+                conectivo = nltk.sem.logic.OrExpression
+            else:
+                conectivo = analizador.OrExpression
             form = lista_forms[0]
             for f in lista_forms[1:]:
-                form = nltk.sem.logic.OrExpression(form, f)
+                form = conectivo(form, f)
             return form
  
+    @staticmethod
+    def implicacion(first, second):
+        '''
+        Toma dos fórmulas de la misma familia (nltk o AnalizadorLPO) y
+        devuelve first -> second.
+        '''
+        if isinstance(first, nltk.sem.logic.Expression):
+            return nltk.sem.logic.ImpExpression(first, second)
+        return analizador.ImpExpression(first, second)
+
+    @staticmethod
+    def negar_igualdades(expresion:nltk.sem.logic) -> nltk.sem.logic:
+        '''
+        nltk lee -a = b como la igualdad entre el término -a y b. Esta
+        función la reescribe como -(a = b), que es como la lee AnalizadorLPO.
+        Input:
+            - expresion, objeto nltk de lógica de primer orden
+        Output:
+            - expresion, la misma fórmula con las negaciones fuera de las igualdades
+        '''
+        logic = nltk.sem.logic
+        if isinstance(expresion, logic.EqualityExpression):
+            first, negaciones = expresion.first, 0
+            while isinstance(first, logic.NegatedExpression):
+                first, negaciones = first.term, negaciones + 1
+            if negaciones == 0:
+                return expresion
+            igualdad = logic.EqualityExpression(first, expresion.second)
+            for _ in range(negaciones):
+                igualdad = logic.NegatedExpression(igualdad)
+            return igualdad
+        elif isinstance(expresion, logic.NegatedExpression):
+            term = LogUtils.negar_igualdades(expresion.term)
+            return expresion if term is expresion.term else logic.NegatedExpression(term)
+        elif isinstance(expresion, logic.QuantifiedExpression):
+            term = LogUtils.negar_igualdades(expresion.term)
+            return expresion if term is expresion.term else expresion.__class__(expresion.variable, term)
+        elif isinstance(expresion, logic.BinaryExpression):
+            first = LogUtils.negar_igualdades(expresion.first)
+            second = LogUtils.negar_igualdades(expresion.second)
+            if first is expresion.first and second is expresion.second:
+                return expresion
+            return expresion.__class__(first, second)
+        return expresion
+
     @staticmethod
     def maxima_aridad(predicados:list) -> int:
         '''
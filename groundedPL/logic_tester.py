@@ -1,10 +1,96 @@
 # import pycosat
-from typing import List
-from pysat.solvers import Solver, Minisat22
+import asyncio
+import contextlib
+import functools
+import threading
+from typing import List, Optional, Tuple, Union
+from pysat.solvers import Solver
 
+from groundedPL import solvers
 from groundedPL.logUtils import LogUtils
+from groundedPL.paralelo import renombrar_auxiliares
 from groundedPL.tseitin import TseitinTransform
-from groundedPL.codificacion import ToPropositionalLogic, ToNumeric
+from groundedPL.codificacion import ToPropositionalLogic, ToNumeric, decodificar_tensores
+from groundedPL.preprocesamiento import Preprocesador
+from groundedPL.compilado import ProblemaCompilado
+from groundedPL.lazy_grounding import LazyGrounder
+from groundedPL.simetrias import Simetrias
+
+
+class Query:
+    '''
+    Everything that belongs to one query: its encoding, the solver's
+    answer and a snapshot of the symbol table used to encode it, so the
+    model can be decoded even after other queries grow the vocabulary.
+    '''
+
+    def __init__(self, sentence:any) -> None:
+        self.sentence = sentence
+        self.formula_lp = None
+        self.clausal = None
+        self.atomos = []
+        self.to_numeric = None
+        self.preprocesador = None
+        self.solver = None
+        # Model (list of integers), 'UNSAT' or 'UNKNOWN'
+        self.res = None
+        # True/False/None: satisfiable for query, implied for implication_query
+        self.answer = None
+        self.grounder = None
+        # Interchangeable constants found when simetrias is on (see Simetrias)
+        self.simetrias = None
+        self.vocabulario = None
+        self.descriptor = None
+        self.aridades = None
+        self.ejes = None
+
+    def snapshot(self, modelo) -> None:
+        '''
+        Keep the vocabulary and descriptor of the model. Modelo.actualizar
+        replaces both instead of mutating them, so references are enough.
+        The tensor axes of each predicate are copied, since the entities
+        and domains are mutated.
+        '''
+        self.vocabulario = modelo.vocabulario
+        self.descriptor = modelo.descriptor
+        self.aridades = {p.nombre: p.aridad for p in modelo.predicados}
+        self.ejes = {p.nombre: modelo.ejes(p) for p in modelo.predicados}
+
+    def decode(self, literal:str) -> str:
+        '''
+        Decode a ground literal of this query, as Modelo.decodificar.
+        '''
+        neg, atomo = ('-', literal[1:]) if literal[0] == '-' else ('', literal)
+        valores = self.descriptor.decodifica(atomo)
+        nombre = self.vocabulario[valores[0]]
+        argumentos = ', '.join(self.vocabulario[i] for i in valores[1:self.aridades[nombre] + 1])
+        return f'{neg}{nombre}({argumentos})'
+
+    def model(self) -> Optional[List[str]]:
+        '''
+        True ground atoms of the model found, or None if there is none.
+        '''
+        if self.grounder is not None:
+            return self.grounder.last_model
+        if self.res in ['UNSAT', solvers.UNKNOWN, None]:
+            return None
+        atomos = set(self.atomos)
+        return [
+            self.decode(a) for a in (self.to_numeric.literal(x) for x in self.res if x > 0)
+                if a in atomos
+        ]
+
+
+    def tensors(self) -> Optional[dict]:
+        '''
+        The model found as one dense boolean NumPy array per predicate
+        (see decodificar_tensores), or None if there is none.
+        '''
+        if self.grounder is not None:
+            raise Exception('Error: Models found by LazyGrounder are not numbered; use model() instead.')
+        if self.res in ['UNSAT', solvers.UNKNOWN, None]:
+            return None
+        return decodificar_tensores(self.res, self.to_numeric, self.atomos, self.vocabulario, self.descriptor, self.ejes)
 
 
 class LogicTester:
@@ -16,6 +102,44 @@ class LogicTester:
         # self.tseitin.debug = True
         self.debug = False
         self.to_numeric = None
+        # Si preprocesar es True se simplifica la forma clausal antes del solver
+        self.preprocesar = False
+        self.preprocesador = None
+        # pysat backend, or a list of backends to race in parallel processes
+        self.solver = solvers.DEFAULT_SOLVER
+        self.portfolio = None
+        self.last_solver = None
+        # Default limits for every query (None means no limit)
+        self.timeout = None
+        self.conf_budget = None
+        self.prop_budget = None
+        # Number of processes for parallel grounding (None grounds sequentially)
+        self.procesos = None
+        # Si relevancia es True, check_implication prueba primero solo con las
+        # premisas conectadas al vocabulario de la conclusión
+        self.relevancia = False
+        # Si aislar es True, cada consulta deshace al terminar los cambios que
+        # hizo en el modelo, de modo que el dominio no crece entre consultas
+        self.aislar = False
+        # Si perezoso es True, check_implication instancia los universales
+        # externos a demanda (ver LazyGrounder)
+        self.perezoso = False
+        self.last_grounder = None
+        # Si simetrias es True, translate agrega cláusulas lex-leader para las
+        # constantes intercambiables (ver Simetrias); se conserva al menos un
+        # modelo de cada clase de modelos simétricos
+        self.simetrias = False
+        # Maximum number of atoms compared per symmetry (None compares all)
+        self.simetrias_limite = None
+        # Serialises the steps that read or mutate the shared model and
+        # parsers. Queries made with query and implication_query only hold
+        # it while translating; encoding and solving use their own state.
+        self.lock = threading.RLock()
+        # Last Query answered; to_numeric, preprocesador, last_solver and
+        # tseitin.atomos are copies kept for single-threaded callers
+        self.last_query = None
+        # Premises used by the last implication_core refutation
+        self.last_core = None
     
     def negate_sentence(self, sentence:str) -> str:
         '''
@@ -31,50 +155,609 @@ class LogicTester:
 
     def translation_to_prover(self, sentence:str) -> str:
         '''
-        Translate a sentence to prover format.
+        Translate a sentence to prover format. Skolem witnesses of the
+        previous sentence are retired first; those of this one stay in
+        the model so that its models can be decoded.
         '''
+        self.to_lp.modelo_lp.retirar_testigos()
         sentence_lp = self.to_lp.parse(sentence)
         return sentence_lp
+
+    def translation_to_clausal(self, sentence:str) -> List[List[str]]:
+        '''
+        Ground and Tseitin-encode a sentence across self.procesos worker
+        processes. The result can be passed to SATsolve.
+        '''
+        self.to_lp.modelo_lp.retirar_testigos()
+        formula_tseitin, atomos = self.to_lp.parse_clausal(sentence, procesos=self.procesos)
+        self.tseitin.atomos = atomos
+        return formula_tseitin
     
-    def SATsolve(self, formula_lp:str) -> bool:
-        formula_tseitin = self.tseitin.tseitin(formula_lp)
+    def encode(self, formula_lp:Union[str, List[List[str]]]) -> Tuple[List[List[int]], ToNumeric, Optional[Preprocesador]]:
+        '''
+        Encode a propositional formula, or clauses already produced by
+        translation_to_clausal, as integer clauses.
+        '''
+        if isinstance(formula_lp, str):
+            with self.lock:
+                formula_tseitin = self.tseitin.tseitin(formula_lp)
+        else:
+            formula_tseitin = formula_lp
         to_numeric = ToNumeric(formula_tseitin)
         formula_numeros = to_numeric.to_numeric(formula_tseitin)
+        preprocesador = None
+        if self.preprocesar:
+            preprocesador = Preprocesador(formula_numeros)
+            formula_numeros = preprocesador.simplificar()
+            if self.debug:
+                print(preprocesador.reporte())
+        return formula_numeros, to_numeric, preprocesador
+
+    def solve_encoded(
+                self,
+                formula_numeros:List[List[int]],
+                preprocesador:Optional[Preprocesador]=None,
+                timeout:Optional[float]=None,
+                conf_budget:Optional[int]=None,
+                prop_budget:Optional[int]=None,
+                interrupt:Optional[solvers.Interrupt]=None
+            ) -> Tuple[Union[List[int], str], Optional[str]]:
+        '''
+        Solve integer clauses with the configured backend and limits.
+        Per-query limits override the instance defaults.
+        '''
+        if preprocesador is not None and preprocesador.insatisfacible:
+            return 'UNSAT', None
+        limits = dict(
+            timeout=self.timeout if timeout is None else timeout,
+            conf_budget=self.conf_budget if conf_budget is None else conf_budget,
+            prop_budget=self.prop_budget if prop_budget is None else prop_budget,
+            interrupt=interrupt,
+        )
         # res = pycosat.solve(formula_numeros)
-        with Minisat22(bootstrap_with=formula_numeros) as m:
-            if m.solve():
-                res = m.get_model()
+        if self.portfolio:
+            res, solver = solvers.solve_portfolio(formula_numeros, self.portfolio, **limits)
+        else:
+            res = solvers.solve(formula_numeros, self.solver, **limits)
+            solver = self.solver
+        if res not in ['UNSAT', solvers.UNKNOWN] and preprocesador is not None:
+            res = preprocesador.reconstruir(res)
+        return res, solver
+
+    def SATsolve(
+                self,
+                formula_lp:Union[str, List[List[str]]],
+                timeout:Optional[float]=None,
+                conf_budget:Optional[int]=None,
+                prop_budget:Optional[int]=None,
+                interrupt:Optional[solvers.Interrupt]=None
+            ) -> Union[List[int], str]:
+        '''
+        Solve a propositional formula.
+        Output:
+            - model, list of integers, 'UNSAT', or 'UNKNOWN' if a limit
+                        was reached or the solve was interrupted
+        '''
+        formula_numeros, self.to_numeric, self.preprocesador = self.encode(formula_lp)
+        res, self.last_solver = self.solve_encoded(
+            formula_numeros, self.preprocesador, timeout=timeout,
+            conf_budget=conf_budget, prop_budget=prop_budget, interrupt=interrupt
+        )
+        if self.debug:
+            print(f'Solver: {self.last_solver}')
+        return res
+
+    async def SATsolve_async(
+                self,
+                formula_lp:Union[str, List[List[str]]],
+                timeout:Optional[float]=None,
+                conf_budget:Optional[int]=None,
+                prop_budget:Optional[int]=None
+            ) -> Union[List[int], str]:
+        '''
+        Async version of SATsolve. Encoding and solving run in the
+        default executor; cancelling the task interrupts the solver.
+        As with SATsolve, the encoder is kept in to_numeric so that the
+        model can be decoded; concurrent tasks should use query_async,
+        whose Query keeps its own.
+        '''
+        loop = asyncio.get_running_loop()
+        formula_numeros, to_numeric, preprocesador = await loop.run_in_executor(None, self.encode, formula_lp)
+        interrupt = solvers.Interrupt()
+        solve = functools.partial(
+            self.solve_encoded, formula_numeros, preprocesador, timeout=timeout,
+            conf_budget=conf_budget, prop_budget=prop_budget, interrupt=interrupt
+        )
+        try:
+            res, solver = await loop.run_in_executor(None, solve)
+        except asyncio.CancelledError:
+            interrupt.cancel()
+            raise
+        with self.lock:
+            self.to_numeric = to_numeric
+            self.preprocesador = preprocesador
+            self.last_solver = solver
+        return res
+
+    async def query_async(
+                self,
+                sentence:any,
+                timeout:Optional[float]=None,
+                conf_budget:Optional[int]=None,
+                prop_budget:Optional[int]=None
+            ) -> Query:
+        '''
+        Async version of query. Cancelling the task interrupts the solver.
+        '''
+        loop = asyncio.get_running_loop()
+        query = await loop.run_in_executor(None, self.translate, sentence)
+        interrupt = solvers.Interrupt()
+        solve = functools.partial(
+            self.solve_query, query, timeout=timeout, conf_budget=conf_budget,
+            prop_budget=prop_budget, interrupt=interrupt
+        )
+        try:
+            await loop.run_in_executor(None, solve)
+        except asyncio.CancelledError:
+            interrupt.cancel()
+            raise
+        self.remember(query)
+        return query
+
+    def scope(self):
+        '''
+        Context for the changes a query makes to the model: a rolled back
+        scope if aislar is True, otherwise the changes are kept.
+        '''
+        if self.aislar:
+            return self.to_lp.modelo_lp.alcance()
+        return contextlib.nullcontext()
+
+    def translate(self, sentence:any, vocabulario:Optional[any]=None) -> Query:
+        '''
+        Ground and encode a sentence into a new Query. Only this step
+        holds the lock.
+        Input:
+            - sentence, sentence to translate
+            - vocabulario, optional formula whose vocabulary is added to
+                        the model first, so that the domain covers it
+        '''
+        query = Query(sentence)
+        with self.lock, self.scope():
+            if vocabulario is not None:
+                self.to_lp.modelo_lp.poblar_con(self.to_lp.a_formula(vocabulario))
+            if self.simetrias:
+                sentence = self.to_lp.preparar(sentence)
+                query.simetrias = Simetrias(self.to_lp.modelo_lp, sentence, limite=self.simetrias_limite)
+            if self.procesos:
+                query.clausal, query.atomos = self.to_lp.parse_clausal(sentence, procesos=self.procesos)
             else:
-                res = 'UNSAT'
-        self.to_numeric = to_numeric
+                query.formula_lp = self.to_lp.parse(sentence)
+            query.snapshot(self.to_lp.modelo_lp)
+            # The snapshot keeps the witnesses needed to decode this query
+            self.to_lp.modelo_lp.retirar_testigos()
+        if query.clausal is None:
+            tseitin = TseitinTransform()
+            query.clausal = tseitin.tseitin(query.formula_lp)
+            query.atomos = tseitin.atomos
+        if query.simetrias is not None:
+            query.clausal = query.clausal + query.simetrias.clausulas(query.atomos)
+        return query
+
+    def solve_query(
+                self,
+                query:Query,
+                timeout:Optional[float]=None,
+                conf_budget:Optional[int]=None,
+                prop_budget:Optional[int]=None,
+                interrupt:Optional[solvers.Interrupt]=None
+            ) -> Query:
+        '''
+        Number, preprocess and solve a translated query, without the lock.
+        '''
+        query.to_numeric = ToNumeric(query.clausal)
+        formula_numeros = query.to_numeric.to_numeric(query.clausal)
+        if self.preprocesar:
+            query.preprocesador = Preprocesador(formula_numeros)
+            formula_numeros = query.preprocesador.simplificar()
+        query.res, query.solver = self.solve_encoded(
+            formula_numeros, query.preprocesador, timeout=timeout,
+            conf_budget=conf_budget, prop_budget=prop_budget, interrupt=interrupt
+        )
+        query.answer = None if query.res == solvers.UNKNOWN else query.res != 'UNSAT'
+        return query
+
+    def remember(self, query:Query) -> None:
+        '''
+        Copy the state of the last query to the legacy attributes.
+        '''
+        with self.lock:
+            self.last_query = query
+            self.to_numeric = query.to_numeric
+            self.preprocesador = query.preprocesador
+            self.last_solver = query.solver
+            self.tseitin.atomos = query.atomos
+            self.last_grounder = query.grounder
+
+    def query(
+                self,
+                sentence:any,
+                timeout:Optional[float]=None,
+                conf_budget:Optional[int]=None,
+                prop_budget:Optional[int]=None,
+                interrupt:Optional[solvers.Interrupt]=None
+            ) -> Query:
+        '''
+        Check whether a sentence is satisfiable. Safe to call from
+        several threads on the same tester.
+        Output:
+            - query, with answer True/False (None if a limit was reached),
+                        the solver's result in res and the model in model()
+        '''
+        query = self.solve_query(
+            self.translate(sentence), timeout=timeout, conf_budget=conf_budget,
+            prop_budget=prop_budget, interrupt=interrupt
+        )
+        self.remember(query)
+        return query
+
+    def compile(self, sentence:any) -> ProblemaCompilado:
+        '''
+        Run the whole pipeline on a sentence and keep the result, which
+        can be saved with ProblemaCompilado.guardar and solved later with
+        solve_compiled.
+        '''
+        with self.lock:
+            if self.procesos:
+                formula_lp = self.translation_to_clausal(sentence)
+            else:
+                formula_lp = self.translation_to_prover(sentence)
+            formula_tseitin = formula_lp if not isinstance(formula_lp, str) else self.tseitin.tseitin(formula_lp)
+            to_numeric = ToNumeric(formula_tseitin)
+            formula_numeros = to_numeric.to_numeric(formula_tseitin)
+            return ProblemaCompilado.desde_clausulas(
+                self.to_lp.modelo_lp, self.tseitin.atomos, to_numeric, formula_numeros
+            )
+
+    def solve_compiled(
+                self,
+                problema:ProblemaCompilado,
+                timeout:Optional[float]=None,
+                conf_budget:Optional[int]=None,
+                prop_budget:Optional[int]=None,
+                interrupt:Optional[solvers.Interrupt]=None
+            ) -> Union[List[int], str]:
+        '''
+        Solve a compiled problem. Its model, atoms and vocabulary replace
+        the tester's, so the result can be decoded as after SATsolve.
+        '''
+        with self.lock:
+            self.to_lp.modelo_lp = problema.modelo
+            self.tseitin.atomos = problema.atomos
+            self.to_numeric = problema.to_numeric()
+        # The solver takes the clauses one at a time; the preprocessor and
+        # the portfolio need them all
+        formula_numeros = problema.clausulas()
+        if self.preprocesar or self.portfolio:
+            formula_numeros = list(formula_numeros)
+        self.preprocesador = None
+        if self.preprocesar:
+            self.preprocesador = Preprocesador(formula_numeros)
+            formula_numeros = self.preprocesador.simplificar()
+        res, self.last_solver = self.solve_encoded(
+            formula_numeros, self.preprocesador, timeout=timeout,
+            conf_budget=conf_budget, prop_budget=prop_budget, interrupt=interrupt
+        )
         return res
 
-    def check_implication(self, premisas:List[any], conclusion:any) -> bool:
+    def model_tensors(self, query:Query) -> Optional[dict]:
+        '''
+        Decode the model of a query as one dense boolean NumPy array per
+        predicate, with the symbol table the query was encoded with (see
+        Query.tensors).
+        '''
+        return query.tensors()
+
+    def enumerate_models(self, sentence:any, limit:Optional[int]=None) -> List[List[str]]:
+        '''
+        List the models of a sentence, projected on its ground atoms: the
+        Tseitin letters are ignored, so every model returned is different.
+        Input:
+            - sentence, sentence to translate
+            - limit, maximum number of models (None lists them all)
+        Output:
+            - models, list of models, each a list of its true atoms (decoded)
+        '''
+        query = self.translate(sentence)
+        # Without preprocessing, which could eliminate ground atoms
+        query.to_numeric = ToNumeric(query.clausal)
+        formula_numeros = query.to_numeric.to_numeric(query.clausal)
+        atomos = [query.to_numeric.stoi[a] for a in query.atomos if a in query.to_numeric.stoi]
+        models = []
+        with Solver(name=solvers.check_solver(self.solver), bootstrap_with=formula_numeros) as m:
+            while (limit is None or len(models) < limit) and m.solve():
+                valores = m.get_model()
+                proyeccion = [valores[v - 1] for v in atomos]
+                models.append([
+                    query.decode(query.to_numeric.literal(l)) for l in proyeccion if l > 0
+                ])
+                # Blocking clause over the ground atoms only
+                m.add_clause([-l for l in proyeccion])
+        self.remember(query)
+        return models
+
+    def implication_formula(self, premisas:List[any], conclusion:any):
+        '''
+        Build the formula that is unsatisfiable iff the premises imply the
+        conclusion, -(premises -> conclusion), as an expression of the
+        translator's family. Strings are parsed once; expressions are used
+        as they are. With no premises this is -conclusion, so the
+        conclusion is implied iff it is valid, as in implication_core and
+        KnowledgeBase.entails.
+        '''
+        conclusion = self.to_lp.a_formula(conclusion)
         if len(premisas) == 0:
-            formula = conclusion
-        else:
-            premisas_ = [self.to_lp.clases_no_vacias(formula) for formula in premisas]
-            premisas_ = LogUtils.Ytoria(premisas_)
-            formula = f'-({premisas_}->{conclusion})'
-            # formula = f'({premisas_}∧{self.negate_sentence(conclusion)})'
-        formula_lp = self.translation_to_prover(formula)
-        res = self.SATsolve(formula_lp)
+            return self.to_lp.modelo_lp.negacion(conclusion)
+        premisas_ = [self.to_lp.con_clases_no_vacias(self.to_lp.a_formula(p)) for p in premisas]
+        return self.to_lp.modelo_lp.negacion(LogUtils.implicacion(LogUtils.Ytoria(premisas_), conclusion))
+
+    def relevant_premises(self, premisas:List[any], conclusion:any) -> List[any]:
+        '''
+        Keep the premises connected to the conclusion in the graph where
+        two formulas are adjacent if they share a predicate. Premises that
+        share no predicate, directly or through other premises, cannot
+        constrain any atom of the conclusion.
+        '''
+        _, predicados_conclusion = LogUtils.obtener_vocabulario(self.to_lp.a_formula(conclusion))
+        nombres = [
+            [predicado.nombre for predicado in LogUtils.obtener_vocabulario(self.to_lp.a_formula(p))[1]]
+                for p in premisas
+        ]
+        por_predicado = {}
+        for i, nombres_premisa in enumerate(nombres):
+            for nombre in nombres_premisa:
+                por_predicado.setdefault(nombre, []).append(i)
+        alcanzados = set()
+        visitados = set()
+        pila = [predicado.nombre for predicado in predicados_conclusion]
+        while pila:
+            nombre = pila.pop()
+            if nombre in visitados:
+                continue
+            visitados.add(nombre)
+            for i in por_predicado.get(nombre, []):
+                if i not in alcanzados:
+                    alcanzados.add(i)
+                    pila.extend(nombres[i])
+        relevantes = [p for i, p in enumerate(premisas) if i in alcanzados]
+        if self.debug:
+            print(f'Premisas relevantes: {len(relevantes)} de {len(premisas)}')
+        return relevantes
+
+    def check_implication(
+                self,
+                premisas:List[any],
+                conclusion:any,
+                timeout:Optional[float]=None,
+                conf_budget:Optional[int]=None,
+                prop_budget:Optional[int]=None,
+                interrupt:Optional[solvers.Interrupt]=None
+            ) -> Optional[bool]:
+        '''
+        Check whether the premises imply the conclusion.
+        Output:
+            - True/False, or None if a limit was reached before an answer
+        '''
+        return self.implication_query(
+            premisas, conclusion, timeout=timeout, conf_budget=conf_budget,
+            prop_budget=prop_budget, interrupt=interrupt
+        ).answer
+
+    def implication_query(
+                self,
+                premisas:List[any],
+                conclusion:any,
+                timeout:Optional[float]=None,
+                conf_budget:Optional[int]=None,
+                prop_budget:Optional[int]=None,
+                interrupt:Optional[solvers.Interrupt]=None
+            ) -> Query:
+        '''
+        As check_implication, but returns the Query, whose answer is True
+        if the premises imply the conclusion. Safe to call from several
+        threads on the same tester: only the translation holds the lock
+        (with aislar, the model is rolled back as soon as the query is
+        translated) and the solver runs on the query's own state.
+        '''
+        with self.lock:
+            premisas = [self.to_lp.a_formula(p) for p in premisas]
+            conclusion = self.to_lp.a_formula(conclusion)
+        if self.perezoso:
+            with self.lock, self.scope():
+                query = Query(self.implication_formula(premisas, conclusion))
+                self.lazy_check(query, timeout=timeout, conf_budget=conf_budget, prop_budget=prop_budget)
+            self.remember(query)
+            return query
+        etapas = [premisas]
+        vocabulario = None
+        if self.relevancia and len(premisas) > 0:
+            with self.lock:
+                relevantes = self.relevant_premises(premisas, conclusion)
+                if len(relevantes) < len(premisas):
+                    etapas.insert(0, relevantes)
+                    # The sliced check grounds over the same domain as the full one
+                    vocabulario = self.implication_formula(premisas, conclusion)
+        for k, etapa in enumerate(etapas):
+            with self.lock:
+                formula = self.implication_formula(etapa, conclusion)
+                query = self.translate(formula, vocabulario=vocabulario)
+            self.solve_query(
+                query, timeout=timeout, conf_budget=conf_budget,
+                prop_budget=prop_budget, interrupt=interrupt
+            )
+            # Implied iff premises and negated conclusion are unsatisfiable
+            query.answer = None if query.answer is None else not query.answer
+            # A subset of the premises implying the conclusion is enough;
+            # otherwise the answer must come from the full set
+            if query.answer is not False or k == len(etapas) - 1:
+                break
+            if self.debug:
+                print('Las premisas relevantes no bastan; se usan todas las premisas')
         if self.debug:
             print('Las premisas son:\n')
-            for p in premisas:
+            for p in etapa:
                 print('\t', p, end='\n\n')
             print('\nLa conclusion es:\n\n\t', conclusion)
             print(f'La fórmula a chequear es:\n\n\t{formula}')
-            if res == 'UNSAT':
+            if query.answer is True:
                 print('\n¡La conclusión se sigue lógicamente de las premisas!')
+            elif query.answer is None:
+                print('\n¡No se obtuvo respuesta dentro de los límites!')
             else:
                 print('\n¡La conclusión NO se sigue lógicamente de las premisas')
-                modelo = [self.to_numeric.literal(x) for x in res]
-                modelo = [x for x in modelo if self.to_numeric.solo_atomo(x) in self.tseitin.atomos] 
-                print(f'\nUn modelo es:\n\n\t{modelo}')
-                modelo = [self.to_lp.modelo_lp.decodificar(x) for x in modelo]
-                print(f'\nEl modelo decodificado es:\n\n\t{modelo}')
-        return (res == 'UNSAT')
+                print(f'\nEl modelo decodificado es:\n\n\t{query.model()}')
+        self.remember(query)
+        return query
+
+    def lazy_check(
+                self,
+                query:Query,
+                timeout:Optional[float]=None,
+                conf_budget:Optional[int]=None,
+                prop_budget:Optional[int]=None
+            ) -> Query:
+        '''
+        Check that the query's sentence is unsatisfiable with LazyGrounder,
+        over the tester's model. The grounder is kept in query.grounder.
+        '''
+        with self.lock:
+            query.grounder = LazyGrounder(query.sentence, solver=self.solver, to_lp=self.to_lp)
+            query.grounder.debug = self.debug
+            try:
+                query.res = query.grounder.solve(
+                    timeout=self.timeout if timeout is None else timeout,
+                    conf_budget=self.conf_budget if conf_budget is None else conf_budget,
+                    prop_budget=self.prop_budget if prop_budget is None else prop_budget
+                )
+            finally:
+                query.grounder.close()
+        query.solver = self.solver
+        query.answer = None if query.res == solvers.UNKNOWN else query.res == 'UNSAT'
+        if self.debug:
+            print(f'Instancias perezosas: {query.grounder.instances} de {query.grounder.total_instances()}')
+            if query.answer is False:
+                print(f'\nEl modelo decodificado es:\n\n\t{query.res}')
+        return query
+
+    def implication_core(
+                self,
+                premisas:List[any],
+                conclusion:any,
+                minimize:bool=False,
+                timeout:Optional[float]=None,
+                conf_budget:Optional[int]=None,
+                prop_budget:Optional[int]=None,
+                interrupt:Optional[solvers.Interrupt]=None
+            ) -> Tuple[Optional[bool], Optional[List[any]]]:
+        '''
+        Check whether the premises imply the conclusion and, if they do,
+        which premises were needed. Each premise is encoded separately and
+        guarded by a selector literal, and the CNF is solved once under the
+        assumption that every selector is true; the unsat core over the
+        selectors gives the premises used in the refutation.
+        Input:
+            - premisas, conclusion, as in check_implication
+            - minimize, if True the core is shrunk on the same solver until
+                        every premise in it is necessary
+        Output:
+            - True/False, or None if a limit was reached before an answer
+            - core, list of the premises in the core (None unless True)
+        '''
+        with self.lock, self.scope():
+            modelo = self.to_lp.modelo_lp
+            formulas = [self.to_lp.con_clases_no_vacias(self.to_lp.a_formula(p)) for p in premisas]
+            formulas.append(modelo.negacion(self.to_lp.a_formula(conclusion)))
+            # The descriptor depends on the whole vocabulary, so the model is
+            # populated with every formula before any of them is encoded
+            for f in formulas:
+                modelo.poblar_con(f)
+            clausal = []
+            atomos = {}
+            selectores = []
+            for k, f in enumerate(formulas):
+                formula_lp = modelo.codificar_lp(modelo.fundamentar(f))
+                tseitin = TseitinTransform()
+                bloque = tseitin.tseitin(formula_lp)
+                bloque = renombrar_auxiliares(bloque, tseitin.atomos_tseitin, k)
+                if k < len(premisas):
+                    # The first clause asserts the root of the premise
+                    selector = f'sel_{k}'
+                    bloque[0] = ['-' + selector] + bloque[0]
+                    selectores.append(selector)
+                clausal += bloque
+                atomos.update(dict.fromkeys(tseitin.atomos))
+            query = Query(formulas)
+            query.snapshot(modelo)
+        query.clausal = clausal
+        query.atomos = list(atomos)
+        query.to_numeric = ToNumeric(clausal)
+        formula_numeros = query.to_numeric.to_numeric(clausal)
+        suposiciones = [query.to_numeric.stoi[s] for s in selectores]
+        if self.preprocesar:
+            query.preprocesador = Preprocesador(formula_numeros, congeladas=suposiciones)
+            formula_numeros = query.preprocesador.simplificar()
+        if query.preprocesador is not None and query.preprocesador.insatisfacible:
+            # The negated conclusion is unsatisfiable without any premise
+            res, core = 'UNSAT', []
+        else:
+            res, core = solvers.solve_with_core(
+                formula_numeros, suposiciones, self.solver, minimize=minimize,
+                timeout=self.timeout if timeout is None else timeout,
+                conf_budget=self.conf_budget if conf_budget is None else conf_budget,
+                prop_budget=self.prop_budget if prop_budget is None else prop_budget,
+                interrupt=interrupt
+            )
+            query.solver = self.solver
+            if res not in ['UNSAT', solvers.UNKNOWN] and query.preprocesador is not None:
+                res = query.preprocesador.reconstruir(res)
+        query.res = res
+        query.answer = None if res == solvers.UNKNOWN else res == 'UNSAT'
+        self.remember(query)
+        if query.answer is not True:
+            self.last_core = None
+            return query.answer, None
+        core = set(core)
+        self.last_core = [p for p, s in zip(premisas, suposiciones) if s in core]
+        if self.debug:
+            print('Las premisas usadas son:\n')
+            for p in self.last_core:
+                print('\t', p, end='\n\n')
+        return True, self.last_core
+
+    async def check_implication_async(
+                self,
+                premisas:List[any],
+                conclusion:any,
+                timeout:Optional[float]=None,
+                conf_budget:Optional[int]=None,
+                prop_budget:Optional[int]=None
+            ) -> Optional[bool]:
+        '''
+        Async version of check_implication. Cancelling the task
+        interrupts the solver.
+        '''
+        loop = asyncio.get_running_loop()
+        interrupt = solvers.Interrupt()
+        check = functools.partial(
+            self.implication_query, premisas, conclusion, timeout=timeout,
+            conf_budget=conf_budget, prop_budget=prop_budget, interrupt=interrupt
+        )
+        try:
+            query = await loop.run_in_executor(None, check)
+        except asyncio.CancelledError:
+            interrupt.cancel()
+            raise
+        return query.answer
 
     def test_negacion(self, sentence1:str, sentence2:str) -> bool:
         '''
@@ -0,0 +1,220 @@
+'''
+Ejecución por lotes de consultas en JSONL.
+
+    python -m groundedPL.lote consultas.jsonl -o resultados.jsonl --procesos 8 --timeout 5
+
+Cada línea de entrada es un objeto JSON con un campo 'consulta' y los
+argumentos de esa consulta:
+
+    {"id": 1, "consulta": "implicacion", "premisas": ["..."], "conclusion": "..."}
+    {"id": 2, "consulta": "equivalencia", "oracion1": "...", "oracion2": "..."}
+    {"id": 3, "consulta": "negacion", "oracion1": "...", "oracion2": "..."}
+    {"id": 4, "consulta": "satisfacibilidad", "oracion": "..."}
+    {"id": 5, "consulta": "modelos", "oracion": "...", "limite": 10}
+
+Cada resultado se escribe en cuanto termina (no en el orden de entrada)
+como {"id", "consulta", "resultado", "segundos"} o {"id", "error"}.
+Solo hay a lo sumo 2 * procesos consultas leídas y sin responder, así
+que la memoria no depende del largo de la entrada.
+'''
+import argparse
+import json
+import sys
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterable, Iterator, List, Optional
+
+from groundedPL import solvers
+from groundedPL.logic_tester import LogicTester
+
+
+# Tester de cada proceso trabajador
+_tester = None
+
+
+def crear_tester(configuracion:dict) -> LogicTester:
+    '''
+    Crea un LogicTester con las opciones de la línea de comandos. Cada
+    consulta se hace en un alcance aislado del modelo, para que el
+    dominio no crezca a lo largo del lote.
+    '''
+    tester = LogicTester()
+    tester.aislar = True
+    tester.timeout = configuracion.get('timeout')
+    tester.conf_budget = configuracion.get('conf_budget')
+    tester.solver = configuracion.get('solver') or solvers.DEFAULT_SOLVER
+    tester.portfolio = configuracion.get('portfolio')
+    tester.preprocesar = configuracion.get('preprocesar', False)
+    return tester
+
+
+def _inicializar(configuracion:dict) -> None:
+    global _tester
+    _tester = crear_tester(configuracion)
+
+
+def conjuncion(resultado1:Optional[bool], resultado2:Optional[bool]) -> Optional[bool]:
+    '''
+    Conjunción de dos resultados con tres valores.
+    Output:
+        - False si alguno es False, None si alguno es None (sin False),
+                    True en otro caso
+    '''
+    if resultado1 is False or resultado2 is False:
+        return False
+    if resultado1 is None or resultado2 is None:
+        return None
+    return True
+
+
+def resolver(tester:LogicTester, consulta:dict):
+    '''
+    Responde una consulta con el tester dado.
+    Output:
+        - resultado, True/False/None (None si se alcanzó un límite) o,
+                    para 'modelos', la lista de modelos
+    '''
+    tipo = consulta.get('consulta')
+    if tipo == 'implicacion':
+        return tester.check_implication(consulta['premisas'], consulta['conclusion'])
+    elif tipo == 'equivalencia':
+        oracion1, oracion2 = consulta['oracion1'], consulta['oracion2']
+        return conjuncion(
+            tester.check_implication([oracion1], oracion2),
+            tester.check_implication([oracion2], oracion1)
+        )
+    elif tipo == 'negacion':
+        oracion1, oracion2 = consulta['oracion1'], consulta['oracion2']
+        return conjuncion(
+            tester.check_implication([oracion1], tester.negate_sentence(oracion2)),
+            tester.check_implication([tester.negate_sentence(oracion1)], oracion2)
+        )
+    elif tipo == 'satisfacibilidad':
+        return tester.query(consulta['oracion']).answer
+    elif tipo == 'modelos':
+        return tester.enumerate_models(consulta['oracion'], limit=consulta.get('limite'))
+    raise Exception(f'Error: Consulta desconocida {tipo}')
+
+
+def responder(consulta:dict, tester:Optional[LogicTester]=None) -> dict:
+    '''
+    Responde una consulta y devuelve el objeto de salida, con el error
+    si la consulta falló.
+    '''
+    tester = tester if tester is not None else _tester
+    inicio = time.perf_counter()
+    salida = {'id': consulta.get('id'), 'consulta': consulta.get('consulta')}
+    try:
+        salida['resultado'] = resolver(tester, consulta)
+    except Exception as e:
+        salida['error'] = f'{type(e).__name__}: {e}'
+    salida['segundos'] = round(time.perf_counter() - inicio, 4)
+    return salida
+
+
+def leer_consultas(lineas:Iterable[str]) -> Iterator[dict]:
+    '''
+    Lee consultas de un flujo JSONL de forma perezosa. Las líneas vacías
+    se ignoran y las que no son JSON válido se devuelven como consultas
+    con error; el id por defecto es el número de línea.
+    '''
+    for numero, linea in enumerate(lineas, start=1):
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            consulta = json.loads(linea)
+            if not isinstance(consulta, dict):
+                raise ValueError('se esperaba un objeto')
+        except ValueError as e:
+            consulta = {'id': numero, 'consulta': None, 'error': f'JSON inválido: {e}'}
+        consulta.setdefault('id', numero)
+        yield consulta
+
+
+def ejecutar(consultas:Iterable[dict], salida, procesos:int=1, configuracion:Optional[dict]=None) -> dict:
+    '''
+    Responde las consultas y escribe cada resultado en salida en cuanto
+    está listo.
+    Input:
+        - consultas, iterable de diccionarios (se consume perezosamente)
+        - salida, archivo de texto abierto para escribir
+        - procesos, número de procesos trabajadores (1 responde en este proceso)
+        - configuracion, opciones para crear_tester
+    Output:
+        - resumen, conteo de consultas, errores y segundos totales
+    '''
+    configuracion = configuracion or {}
+    resumen = {'consultas': 0, 'errores': 0, 'segundos': 0.0}
+    inicio = time.perf_counter()
+
+    def escribir(resultado:dict) -> None:
+        resumen['consultas'] += 1
+        resumen['errores'] += 'error' in resultado
+        salida.write(json.dumps(resultado, ensure_ascii=False) + '\n')
+        salida.flush()
+
+    if procesos <= 1:
+        tester = crear_tester(configuracion)
+        for consulta in consultas:
+            if 'error' in consulta:
+                escribir({'id': consulta['id'], 'error': consulta['error']})
+            else:
+                escribir(responder(consulta, tester))
+    else:
+        with ProcessPoolExecutor(procesos, initializer=_inicializar, initargs=(configuracion,)) as pool:
+            pendientes = set()
+            for consulta in consultas:
+                if 'error' in consulta:
+                    escribir({'id': consulta['id'], 'error': consulta['error']})
+                    continue
+                pendientes.add(pool.submit(responder, consulta))
+                # Ventana acotada: no se lee más entrada hasta que algo termine
+                if len(pendientes) >= 2 * procesos:
+                    listos, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+                    for futuro in listos:
+                        escribir(futuro.result())
+            for futuro in wait(pendientes).done:
+                escribir(futuro.result())
+    resumen['segundos'] = round(time.perf_counter() - inicio, 3)
+    return resumen
+
+
+def main(argumentos:Optional[List[str]]=None) -> int:
+    parser = argparse.ArgumentParser(description='Responde consultas de groundedPL leídas de un archivo JSONL.')
+    parser.add_argument('entrada', nargs='?', default='-', help="archivo JSONL ('-' para la entrada estándar)")
+    parser.add_argument('-o', '--salida', default='-', help="archivo JSONL de resultados ('-' para la salida estándar)")
+    parser.add_argument('--procesos', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=None, help='segundos de solver por consulta')
+    parser.add_argument('--conf-budget', type=int, default=None, help='máximo de conflictos por consulta')
+    parser.add_argument('--solver', default=solvers.DEFAULT_SOLVER)
+    parser.add_argument('--portfolio', nargs='+', default=None, help='varios solvers en carrera')
+    parser.add_argument('--preprocesar', action='store_true')
+    args = parser.parse_args(argumentos)
+    solvers.check_solver(args.solver)
+    configuracion = {
+        'timeout': args.timeout,
+        'conf_budget': args.conf_budget,
+        'solver': args.solver,
+        'portfolio': args.portfolio,
+        'preprocesar': args.preprocesar,
+    }
+    entrada = sys.stdin if args.entrada == '-' else open(args.entrada, encoding='utf-8')
+    salida = sys.stdout if args.salida == '-' else open(args.salida, 'w', encoding='utf-8')
+    try:
+        resumen = ejecutar(leer_consultas(entrada), salida, procesos=args.procesos, configuracion=configuracion)
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        if salida is not sys.stdout:
+            salida.close()
+    print(
+        f"{resumen['consultas']} consultas, {resumen['errores']} errores, {resumen['segundos']} s",
+        file=sys.stderr
+    )
+    return 1 if resumen['errores'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
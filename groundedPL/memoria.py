@@ -0,0 +1,210 @@
+'''
+Medición de memoria del pipeline de codificación por etapas, para
+detectar regresiones. Se ejecuta como
+
+    python -m groundedPL.memoria [--tamanos 4 8 12] [--actualizar]
+
+Para cada tamaño de dominio se mide, en cada etapa, el pico de memoria
+y la memoria retenida (con tracemalloc) y el RSS del proceso. Si una
+etapa supera el presupuesto guardado en presupuesto_memoria.json (más
+una tolerancia), el programa termina con código 1.
+'''
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from typing import Dict, List, Optional, Tuple
+
+from groundedPL.tseitin import TseitinTransform
+from groundedPL.codificacion import ToPropositionalLogic, ToNumeric
+from groundedPL.generador import GeneradorFormulas
+
+
+RUTA_PRESUPUESTO = os.path.join(os.path.dirname(__file__), 'presupuesto_memoria.json')
+TAMANOS = [4, 8, 12, 16]
+TOLERANCIA = 0.1
+# Margen absoluto para que las etapas pequeñas no fallen por ruido
+HOLGURA = 64 * 1024
+
+
+def teoria(n:int) -> str:
+    '''
+    Teoría de prueba cuyo tamaño fundamentado crece como n**3: una
+    relación transitiva e irreflexiva sobre n casillas en la que toda
+    casilla libre tiene una mina vecina.
+    '''
+    casillas = [f'casilla{i}' for i in range(n)]
+    formulas = [
+        'all x.all y.all z.((MINA(x,y) & MINA(y,z)) -> MINA(x,z))',
+        'all x.(LIBRE(x) -> exists y.MINA(x,y))',
+    ]
+    formulas += [f'-MINA({c},{c})' for c in casillas]
+    formulas += [f'LIBRE({c})' for c in casillas[::2]]
+    return '(' + ' & '.join(formulas) + ')'
+
+
+def rss() -> int:
+    '''
+    Memoria residente del proceso en bytes.
+    '''
+    try:
+        with open('/proc/self/statm') as archivo:
+            return int(archivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        # En Linux ru_maxrss está en KB y es el pico, no el valor actual
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def teoria_aleatoria(n:int, semilla:int) -> Tuple[str, List[str]]:
+    '''
+    Conjunción de oraciones de GeneradorFormulas sobre n constantes.
+    Output:
+        - cadena, la oración
+        - constantes, el dominio (no todas aparecen en la oración)
+    '''
+    generador = GeneradorFormulas(
+        semilla=semilla, tamano_dominio=n, num_predicados=4, aridad_maxima=2,
+        profundidad=5, profundidad_cuantificadores=3, prob_cuantificador=0.5
+    )
+    return '(' + ' & '.join(generador.teoria(8)) + ')', generador.constantes
+
+
+def medir(n:int, semilla:Optional[int]=None) -> Dict[str, dict]:
+    '''
+    Corre el pipeline sobre teoria(n) (o sobre teoria_aleatoria(n, semilla)
+    si se da una semilla) y mide cada etapa. Los resultados de todas las
+    etapas se conservan hasta el final, como en LogicTester.SATsolve.
+    Output:
+        - registro, diccionario etapa => {'pico', 'retenido', 'rss', 'segundos'}
+                    en bytes, más la entrada 'totales'
+    '''
+    to_lp = ToPropositionalLogic()
+    tseitin = TseitinTransform()
+    modelo = to_lp.modelo_lp
+    registro = {}
+
+    def etapa(nombre, funcion):
+        gc.collect()
+        antes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        inicio = time.perf_counter()
+        resultado = funcion()
+        segundos = time.perf_counter() - inicio
+        actual, pico = tracemalloc.get_traced_memory()
+        registro[nombre] = {
+            'pico': pico - antes,
+            'retenido': actual - antes,
+            'rss': rss(),
+            'segundos': round(segundos, 4),
+        }
+        return resultado
+
+    if semilla is None:
+        cadena = teoria(n)
+    else:
+        cadena, constantes = teoria_aleatoria(n, semilla)
+        for c in constantes:
+            modelo.agregar_entidad(tipo='individuo', nombre=c)
+    tracemalloc.start()
+    try:
+        inicial = tracemalloc.get_traced_memory()[0]
+        formula = etapa('analizar', lambda: to_lp.a_formula(cadena))
+        etapa('poblar', lambda: modelo.poblar_con(formula))
+        fundamentada = etapa('fundamentar', lambda: modelo.fundamentar(formula))
+        formula_lp = etapa('codificar_lp', lambda: modelo.codificar_lp(fundamentada))
+        clausal = etapa('tseitin', lambda: tseitin.tseitin(formula_lp))
+        to_numeric = etapa('to_numeric', lambda: ToNumeric(clausal))
+        numerica = etapa('numerica', lambda: to_numeric.to_numeric(clausal))
+        gc.collect()
+        retenido = tracemalloc.get_traced_memory()[0] - inicial
+    finally:
+        tracemalloc.stop()
+    registro['totales'] = {
+        'clausulas': len(numerica),
+        'atomos': len(tseitin.atomos),
+        'retenido': retenido,
+        'bytes_por_clausula': round(registro['numerica']['retenido'] / max(len(numerica), 1), 1),
+        'bytes_por_atomo': round(retenido / max(len(tseitin.atomos), 1), 1),
+    }
+    return registro
+
+
+def comparar(resultados:dict, presupuesto:dict, tolerancia:float) -> List[str]:
+    '''
+    Devuelve una línea por cada etapa cuyo pico o memoria retenida
+    supera el presupuesto más la tolerancia (y la holgura).
+    '''
+    excesos = []
+    for n, registro in resultados.items():
+        for nombre, medida in registro.items():
+            limite = presupuesto.get(n, {}).get(nombre)
+            if limite is None or nombre == 'totales':
+                continue
+            for clave in ['pico', 'retenido']:
+                if medida[clave] > limite[clave] * (1 + tolerancia) + HOLGURA:
+                    excesos.append(
+                        f'n={n} {nombre}.{clave}: {medida[clave]} > {limite[clave]} (+{tolerancia:.0%})'
+                    )
+    return excesos
+
+
+def reporte(resultados:dict) -> str:
+    lineas = []
+    for n, registro in resultados.items():
+        t = registro['totales']
+        lineas.append(
+            f"n={n}: {t['clausulas']} cláusulas, {t['atomos']} átomos, "
+            f"{t['bytes_por_clausula']} B/cláusula, {t['bytes_por_atomo']} B/átomo"
+        )
+        for nombre, medida in registro.items():
+            if nombre == 'totales':
+                continue
+            lineas.append(
+                f"\t{nombre:<13} pico {medida['pico'] / 2**20:8.2f} MB  "
+                f"retenido {medida['retenido'] / 2**20:8.2f} MB  "
+                f"rss {medida['rss'] / 2**20:8.1f} MB  {medida['segundos']:.3f} s"
+            )
+    return '\n'.join(lineas)
+
+
+def main(argumentos:Optional[List[str]]=None) -> int:
+    parser = argparse.ArgumentParser(description='Memoria por etapa del pipeline de codificación.')
+    parser.add_argument('--tamanos', type=int, nargs='+', default=TAMANOS)
+    parser.add_argument('--presupuesto', default=RUTA_PRESUPUESTO)
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA)
+    parser.add_argument('--actualizar', action='store_true', help='guarda las medidas como nuevo presupuesto')
+    parser.add_argument('--json', action='store_true', help='imprime las medidas en JSON')
+    parser.add_argument('--aleatoria', type=int, default=None, metavar='SEMILLA',
+                        help='mide sobre oraciones de GeneradorFormulas en lugar de la teoría fija')
+    args = parser.parse_args(argumentos)
+    resultados = {str(n): medir(n, semilla=args.aleatoria) for n in args.tamanos}
+    print(json.dumps(resultados, indent=2) if args.json else reporte(resultados))
+    if args.aleatoria is not None:
+        # El presupuesto guardado corresponde a la teoría fija
+        return 0
+    if args.actualizar:
+        presupuesto = {
+            n: {nombre: {'pico': m['pico'], 'retenido': m['retenido']} for nombre, m in registro.items() if nombre != 'totales'}
+                for n, registro in resultados.items()
+        }
+        with open(args.presupuesto, 'w') as archivo:
+            json.dump(presupuesto, archivo, indent=2)
+        return 0
+    if not os.path.exists(args.presupuesto):
+        print(f'No hay presupuesto en {args.presupuesto}; use --actualizar para crearlo.')
+        return 0
+    with open(args.presupuesto) as archivo:
+        presupuesto = json.load(archivo)
+    excesos = comparar(resultados, presupuesto, args.tolerancia)
+    for exceso in excesos:
+        print('EXCESO', exceso)
+    return 1 if excesos else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+'''
+Fundamentación en paralelo de conjunciones grandes.
+'''
+import multiprocessing as mp
+
+from typing import List, Optional, Tuple
+
+from groundedPL.logUtils import LogUtils
+from groundedPL.tseitin import TseitinTransform
+
+
+# Estado de solo lectura de cada proceso trabajador
+_modelo = None
+_conjuntos = None
+
+
+def conjuntos_independientes(modelo, expresion) -> list:
+    '''
+    Divide una fórmula en subfórmulas cuya conjunción es equivalente
+    a ella: aplana las conjunciones de primer nivel y expande los
+    universales de primer nivel sobre su dominio.
+    Input:
+        - modelo, objeto Modelo ya poblado con la fórmula
+        - expresion, fórmula de nltk o de AnalizadorLPO
+    Output:
+        - conjuntos, lista de fórmulas
+    '''
+    conjuntos = []
+    pila = [expresion]
+    while pila:
+        f = pila.pop()
+        tipo = LogUtils.obtener_type(f)
+        if tipo == 'AndExpression':
+            pila.append(f.second)
+            pila.append(f.first)
+        elif tipo == 'AllExpression':
+            instancias = [modelo.instanciar(f, c) for c in modelo.dominio(f)]
+            pila.extend(reversed(instancias))
+        else:
+            conjuntos.append(f)
+    return conjuntos
+
+
+def renombrar_auxiliares(clausal:List[List[str]], atomos_tseitin:List[str], k:int) -> List[List[str]]:
+    '''
+    Renombra las letras auxiliares de Tseitin de un bloque agregándoles
+    el sufijo _k, para poder unir cláusulas obtenidas por separado.
+    '''
+    renombrar = {a: f'{a}_{k}' for a in atomos_tseitin}
+    clausal_ = []
+    for C in clausal:
+        C_ = []
+        for literal in C:
+            if literal[0] == '-':
+                C_.append('-' + renombrar.get(literal[1:], literal[1:]))
+            else:
+                C_.append(renombrar.get(literal, literal))
+        clausal_.append(C_)
+    return clausal_
+
+
+def _inicializar(modelo, conjuntos) -> None:
+    global _modelo, _conjuntos
+    _modelo = modelo
+    _conjuntos = conjuntos
+
+
+def _codificar_bloque(rango:Tuple[int, int]) -> Tuple[List[List[str]], List[str], List[str]]:
+    '''
+    Fundamenta y aplica Tseitin a los conjuntos en el rango dado.
+    '''
+    inicio, fin = rango
+    formula = LogUtils.Ytoria(_conjuntos[inicio:fin])
+    formula_fundamentada = _modelo.fundamentar(formula)
+    formula_lp = _modelo.codificar_lp(formula_fundamentada)
+    tseitin = TseitinTransform()
+    clausal = tseitin.tseitin(formula_lp)
+    return clausal, tseitin.atomos, tseitin.atomos_tseitin
+
+
+def fundamentar_en_paralelo(
+            modelo,
+            expresion,
+            procesos:Optional[int]=None,
+            bloques_por_proceso:int=4
+        ) -> Tuple[List[List[str]], List[str]]:
+    '''
+    Fundamenta una fórmula repartiendo sus conjuntos independientes
+    entre varios procesos. Cada proceso aplica Tseitin a su parte y
+    las letras auxiliares se renombran por bloque antes de unir las
+    cláusulas, de modo que ToNumeric numera todo de forma consistente.
+    Input:
+        - modelo, objeto Modelo ya poblado con la fórmula
+        - expresion, fórmula de nltk o de AnalizadorLPO
+        - procesos, número de procesos (por defecto, el número de núcleos)
+        - bloques_por_proceso, número de bloques en que se divide el trabajo de cada proceso
+    Output:
+        - clausal, lista de listas de literales
+        - atomos, lista de letras proposicionales de la fórmula fundamentada
+    '''
+    conjuntos = conjuntos_independientes(modelo, expresion)
+    if len(conjuntos) == 0:
+        return [], []
+    procesos = procesos or mp.cpu_count()
+    n_bloques = max(1, min(len(conjuntos), procesos * bloques_por_proceso))
+    tam = -(-len(conjuntos) // n_bloques)
+    rangos = [(i, min(i + tam, len(conjuntos))) for i in range(0, len(conjuntos), tam)]
+    if procesos == 1 or len(rangos) == 1:
+        _inicializar(modelo, conjuntos)
+        resultados = [_codificar_bloque(r) for r in rangos]
+    else:
+        # Con fork el modelo se hereda sin copiarlo ni serializarlo
+        metodos = mp.get_all_start_methods()
+        ctx = mp.get_context('fork' if 'fork' in metodos else None)
+        with ctx.Pool(procesos, initializer=_inicializar, initargs=(modelo, conjuntos)) as pool:
+            resultados = pool.map(_codificar_bloque, rangos)
+    clausal = []
+    atomos = {}
+    for k, (clausal_bloque, atomos_bloque, atomos_tseitin) in enumerate(resultados):
+        clausal += renombrar_auxiliares(clausal_bloque, atomos_tseitin, k)
+        atomos.update(dict.fromkeys(atomos_bloque))
+    return clausal, list(atomos)
@@ -0,0 +1,281 @@
+'''
+Preprocesamiento de fórmulas en forma clausal numérica (la salida
+de ToNumeric) antes de enviarlas al solver.
+'''
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+
+class Preprocesador:
+    '''
+    Simplifica una lista de cláusulas de enteros mediante propagación
+    unitaria, eliminación de literales puros, subsunción y eliminación
+    acotada de variables. Guarda una pila de reconstrucción para
+    extender un modelo de la fórmula simplificada a un modelo de la
+    fórmula original.
+    '''
+
+    def __init__(
+                self,
+                clausulas:List[List[int]],
+                congeladas:Optional[Iterable[int]]=None,
+                eliminar_variables:bool=True,
+                max_ocurrencias:int=10,
+                max_longitud_resolvente:int=20
+            ) -> None:
+        '''
+        Input:
+            - clausulas, lista de listas de enteros
+            - congeladas, variables que no se pueden eliminar (por ejemplo,
+                        las que se usarán como suposiciones en el solver)
+            - eliminar_variables, si es False no se hace eliminación de variables
+            - max_ocurrencias, máximo de ocurrencias por polaridad para
+                        intentar eliminar una variable
+            - max_longitud_resolvente, longitud máxima de un resolvente
+        '''
+        self.congeladas = set(abs(v) for v in congeladas) if congeladas is not None else set()
+        self.eliminar_variables = eliminar_variables
+        self.max_ocurrencias = max_ocurrencias
+        self.max_longitud_resolvente = max_longitud_resolvente
+        self.num_variables = max([abs(l) for C in clausulas for l in C], default=0)
+        self.clausulas: List[Optional[Set[int]]] = []
+        self.ocurrencias: Dict[int, Set[int]] = defaultdict(set)
+        self.valor: Dict[int, bool] = {}
+        self.unidades_congeladas: List[int] = []
+        self.pila = []
+        self.pendientes = []
+        self.insatisfacible = False
+        self.estadisticas = {
+            'clausulas_iniciales': len(clausulas),
+            'variables_iniciales': self.num_variables,
+            'unidades': 0,
+            'puros': 0,
+            'subsumidas': 0,
+            'eliminadas': 0,
+            'resolventes': 0,
+            'clausulas_finales': 0,
+            'variables_finales': 0,
+        }
+        for C in clausulas:
+            self.agregar_clausula(C)
+
+    def agregar_clausula(self, C:Iterable[int]) -> None:
+        '''
+        Agrega una cláusula descartando tautologías y literales repetidos.
+        '''
+        clausula = set(C)
+        if any(-l in clausula for l in clausula):
+            return
+        if len(clausula) == 0:
+            self.insatisfacible = True
+            return
+        i = len(self.clausulas)
+        self.clausulas.append(clausula)
+        for l in clausula:
+            self.ocurrencias[l].add(i)
+        if len(clausula) == 1:
+            self.pendientes.append(next(iter(clausula)))
+
+    def borrar_clausula(self, i:int) -> None:
+        for l in self.clausulas[i]:
+            self.ocurrencias[l].discard(i)
+        self.clausulas[i] = None
+
+    def asignar(self, literal:int) -> None:
+        '''
+        Fija el valor de un literal y simplifica las cláusulas donde aparece.
+        '''
+        v = abs(literal)
+        if v in self.valor:
+            if self.valor[v] != (literal > 0):
+                self.insatisfacible = True
+            return
+        self.valor[v] = literal > 0
+        if v in self.congeladas:
+            self.unidades_congeladas.append(literal)
+        self.pila.append(('fijo', literal))
+        for i in list(self.ocurrencias[literal]):
+            self.borrar_clausula(i)
+        for i in list(self.ocurrencias[-literal]):
+            clausula = self.clausulas[i]
+            clausula.discard(-literal)
+            self.ocurrencias[-literal].discard(i)
+            if len(clausula) == 0:
+                self.insatisfacible = True
+            elif len(clausula) == 1:
+                self.pendientes.append(next(iter(clausula)))
+
+    def propagar(self) -> bool:
+        '''
+        Propagación unitaria.
+        Output:
+            - True si se asignó alguna variable
+        '''
+        cambio = False
+        while self.pendientes and not self.insatisfacible:
+            literal = self.pendientes.pop()
+            if abs(literal) not in self.valor:
+                self.estadisticas['unidades'] += 1
+                cambio = True
+            self.asignar(literal)
+        return cambio
+
+    def eliminar_puros(self) -> bool:
+        '''
+        Asigna los literales que aparecen con una sola polaridad.
+        Output:
+            - True si se asignó alguna variable
+        '''
+        cambio = False
+        for v in range(1, self.num_variables + 1):
+            if v in self.valor or v in self.congeladas:
+                continue
+            positivas = len(self.ocurrencias[v])
+            negativas = len(self.ocurrencias[-v])
+            if positivas > 0 and negativas == 0:
+                self.asignar(v)
+            elif negativas > 0 and positivas == 0:
+                self.asignar(-v)
+            else:
+                continue
+            self.estadisticas['puros'] += 1
+            cambio = True
+        return cambio
+
+    def subsumir(self) -> bool:
+        '''
+        Borra las cláusulas que contienen a otra cláusula.
+        Output:
+            - True si se borró alguna cláusula
+        '''
+        cambio = False
+        indices = [i for i, C in enumerate(self.clausulas) if C is not None]
+        indices.sort(key=lambda i: len(self.clausulas[i]))
+        for i in indices:
+            C = self.clausulas[i]
+            if C is None:
+                continue
+            # Los candidatos deben contener el literal de C con menos ocurrencias
+            literal = min(C, key=lambda l: len(self.ocurrencias[l]))
+            for j in list(self.ocurrencias[literal]):
+                D = self.clausulas[j]
+                if j != i and D is not None and len(D) >= len(C) and C <= D:
+                    self.borrar_clausula(j)
+                    self.estadisticas['subsumidas'] += 1
+                    cambio = True
+        return cambio
+
+    def eliminar_variable(self, v:int) -> bool:
+        '''
+        Reemplaza las cláusulas donde aparece v por sus resolventes
+        si estos no son más que las cláusulas originales.
+        Output:
+            - True si se eliminó la variable
+        '''
+        positivas = list(self.ocurrencias[v])
+        negativas = list(self.ocurrencias[-v])
+        if len(positivas) == 0 or len(negativas) == 0:
+            return False
+        if len(positivas) > self.max_ocurrencias and len(negativas) > self.max_ocurrencias:
+            return False
+        limite = len(positivas) + len(negativas)
+        resolventes = []
+        for i in positivas:
+            for j in negativas:
+                resolvente = (self.clausulas[i] | self.clausulas[j]) - {v, -v}
+                if any(-l in resolvente for l in resolvente):
+                    continue
+                if len(resolvente) > self.max_longitud_resolvente:
+                    return False
+                resolventes.append(resolvente)
+                if len(resolventes) > limite:
+                    return False
+        guardadas = [sorted(self.clausulas[i]) for i in positivas + negativas]
+        self.pila.append(('eliminada', v, guardadas))
+        for i in positivas + negativas:
+            self.borrar_clausula(i)
+        for resolvente in resolventes:
+            self.agregar_clausula(resolvente)
+        self.estadisticas['eliminadas'] += 1
+        self.estadisticas['resolventes'] += len(resolventes)
+        return True
+
+    def eliminar_variables_acotadas(self) -> bool:
+        '''
+        Eliminación acotada de variables, empezando por las de menos ocurrencias.
+        Output:
+            - True si se eliminó alguna variable
+        '''
+        eliminadas = set(x[1] for x in self.pila if x[0] == 'eliminada')
+        candidatas = [
+            v for v in range(1, self.num_variables + 1)
+                if v not in self.valor and v not in self.congeladas and v not in eliminadas
+        ]
+        candidatas.sort(key=lambda v: len(self.ocurrencias[v]) * len(self.ocurrencias[-v]))
+        cambio = False
+        for v in candidatas:
+            if self.insatisfacible:
+                break
+            if self.eliminar_variable(v):
+                cambio = True
+                self.propagar()
+        return cambio
+
+    def simplificar(self) -> List[List[int]]:
+        '''
+        Aplica las simplificaciones hasta llegar a un punto fijo.
+        Output:
+            - clausal_num, lista de listas de enteros simplificada. Si se
+                        detecta insatisfacibilidad, self.insatisfacible es True
+        '''
+        cambio = True
+        while cambio and not self.insatisfacible:
+            cambio = self.propagar()
+            if self.insatisfacible:
+                break
+            cambio = self.eliminar_puros() or cambio
+            cambio = self.subsumir() or cambio
+            if self.eliminar_variables:
+                cambio = self.eliminar_variables_acotadas() or cambio
+        clausulas = [sorted(C) for C in self.clausulas if C is not None]
+        # Las unidades sobre variables congeladas se conservan para el solver
+        clausulas += [[l] for l in self.unidades_congeladas]
+        self.estadisticas['clausulas_finales'] = len(clausulas)
+        self.estadisticas['variables_finales'] = len(set(abs(l) for C in clausulas for l in C))
+        return clausulas
+
+    def reconstruir(self, modelo:List[int]) -> List[int]:
+        '''
+        Extiende un modelo de la fórmula simplificada a un modelo de
+        la fórmula original.
+        Input:
+            - modelo, lista de enteros devuelta por el solver
+        Output:
+            - modelo, lista de enteros con un literal por cada variable
+        '''
+        valor = {abs(l): l > 0 for l in modelo}
+        for entrada in reversed(self.pila):
+            if entrada[0] == 'fijo':
+                literal = entrada[1]
+                valor[abs(literal)] = literal > 0
+            else:
+                v, guardadas = entrada[1], entrada[2]
+                valor[v] = False
+                for C in guardadas:
+                    if v in C and not any(valor.get(abs(l), False) == (l > 0) for l in C if l != v):
+                        valor[v] = True
+                        break
+        return [v if valor.get(v, False) else -v for v in range(1, self.num_variables + 1)]
+
+    def reporte(self) -> str:
+        '''
+        Resume cuánto se removió en el preprocesamiento.
+        '''
+        e = self.estadisticas
+        cadena = f"Cláusulas: {e['clausulas_iniciales']} => {e['clausulas_finales']}\n"
+        cadena += f"Variables: {e['variables_iniciales']} => {e['variables_finales']}\n"
+        cadena += f"\tUnidades propagadas: {e['unidades']}\n"
+        cadena += f"\tLiterales puros: {e['puros']}\n"
+        cadena += f"\tCláusulas subsumidas: {e['subsumidas']}\n"
+        cadena += f"\tVariables eliminadas: {e['eliminadas']} ({e['resolventes']} resolventes)\n"
+        return cadena
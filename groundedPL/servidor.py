@@ -0,0 +1,312 @@
+'''
+Servidor local de consultas con procesos trabajadores ya inicializados.
+
+    python -m groundedPL.servidor --puerto 8765 --procesos 4 --teorias teorias.json
+    python -m groundedPL.servidor --socket /tmp/groundedPL.sock
+
+Cada trabajador tiene un LogicTester y una KnowledgeBase por cada
+teoría cargada al arrancar, de modo que las consultas no pagan la
+importación ni la compilación de las premisas. El archivo de teorías
+es un objeto JSON nombre => lista de premisas.
+
+Rutas (los cuerpos son JSON, con los mismos campos que en groundedPL.lote):
+    POST /implicacion, /equivalencia, /negacion, /satisfacibilidad, /modelos
+    POST /teorias/<nombre>       {"conclusion": "..."}
+    GET  /estadisticas           latencia y throughput por ruta
+    GET  /salud
+
+Una teoría que no compila hace fallar el arranque. Si ningún trabajador
+responde en --espera segundos, la petición recibe un 504.
+'''
+import argparse
+import json
+import multiprocessing as mp
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from groundedPL import lote, solvers
+from groundedPL.knowledge_base import KnowledgeBase
+
+
+CONSULTAS = ['implicacion', 'equivalencia', 'negacion', 'satisfacibilidad', 'modelos']
+
+# Estado de cada proceso trabajador
+_tester = None
+_bases: Dict[str, KnowledgeBase] = {}
+_timeout = None
+
+
+def compilar_teorias(configuracion:dict, teorias:Dict[str, List[str]]) -> Dict[str, KnowledgeBase]:
+    '''
+    Compila una KnowledgeBase por teoría. Un error indica qué teoría
+    no se pudo compilar.
+    '''
+    bases = {}
+    for nombre, premisas in teorias.items():
+        try:
+            bases[nombre] = KnowledgeBase(premisas, solver=configuracion.get('solver') or solvers.DEFAULT_SOLVER)
+        except Exception as e:
+            raise Exception(f'Error: No se pudo compilar la teoría {nombre}: {type(e).__name__}: {e}') from e
+    return bases
+
+
+def _inicializar(configuracion:dict, teorias:Optional[Dict[str, List[str]]]) -> None:
+    '''
+    Prepara un proceso trabajador. Si teorias es None, las bases ya
+    compiladas se heredaron del proceso principal (con fork).
+    '''
+    global _tester, _bases, _timeout
+    _tester = lote.crear_tester(configuracion)
+    _timeout = configuracion.get('timeout')
+    if teorias is not None:
+        _bases = compilar_teorias(configuracion, teorias)
+
+
+def _atender(ruta:str, cuerpo:dict) -> dict:
+    '''
+    Responde una consulta en un proceso trabajador.
+    '''
+    if ruta.startswith('/teorias/'):
+        nombre = ruta[len('/teorias/'):]
+        inicio = time.perf_counter()
+        salida = {'id': cuerpo.get('id'), 'teoria': nombre}
+        try:
+            if nombre not in _bases:
+                raise Exception(f'Error: Teoría {nombre} no cargada')
+            salida['resultado'] = _bases[nombre].entails(cuerpo['conclusion'], timeout=_timeout)
+        except Exception as e:
+            salida['error'] = f'{type(e).__name__}: {e}'
+        salida['segundos'] = round(time.perf_counter() - inicio, 4)
+        return salida
+    consulta = dict(cuerpo, consulta=ruta.strip('/'))
+    return lote.responder(consulta, _tester)
+
+
+class Contadores:
+    '''
+    Latencia y throughput por ruta, seguros entre hilos. Los percentiles
+    se calculan sobre las últimas `ventana` consultas.
+    '''
+
+    def __init__(self, ventana:int=1000) -> None:
+        self.inicio = time.monotonic()
+        self.ventana = ventana
+        self.lock = threading.Lock()
+        self.rutas = {}
+
+    def registrar(self, ruta:str, segundos:float, error:bool) -> None:
+        with self.lock:
+            r = self.rutas.get(ruta)
+            if r is None:
+                r = self.rutas[ruta] = {
+                    'consultas': 0, 'errores': 0, 'segundos': 0.0, 'maximo': 0.0,
+                    'recientes': deque(maxlen=self.ventana),
+                }
+            r['consultas'] += 1
+            r['errores'] += error
+            r['segundos'] += segundos
+            r['maximo'] = max(r['maximo'], segundos)
+            r['recientes'].append(segundos)
+
+    def resumen(self) -> dict:
+        with self.lock:
+            transcurrido = time.monotonic() - self.inicio
+            resumen = {'segundos_activo': round(transcurrido, 1), 'rutas': {}}
+            for ruta, r in self.rutas.items():
+                recientes = sorted(r['recientes'])
+                percentil = lambda p: recientes[min(len(recientes) - 1, int(p * len(recientes)))]
+                resumen['rutas'][ruta] = {
+                    'consultas': r['consultas'],
+                    'errores': r['errores'],
+                    'por_segundo': round(r['consultas'] / max(transcurrido, 1e-9), 2),
+                    'latencia_media_ms': round(1000 * r['segundos'] / r['consultas'], 3),
+                    'latencia_p50_ms': round(1000 * percentil(0.5), 3),
+                    'latencia_p99_ms': round(1000 * percentil(0.99), 3),
+                    'latencia_max_ms': round(1000 * r['maximo'], 3),
+                }
+            return resumen
+
+
+class Manejador(BaseHTTPRequestHandler):
+    '''
+    Traduce peticiones HTTP a tareas del pool (ver Servidor).
+    '''
+    server_version = 'groundedPL'
+
+    def responder_json(self, codigo:int, objeto) -> None:
+        datos = json.dumps(objeto, ensure_ascii=False).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_GET(self) -> None:
+        if self.path == '/estadisticas':
+            self.responder_json(200, self.server.contadores.resumen())
+        elif self.path == '/salud':
+            self.responder_json(200, {'ok': True, 'procesos': self.server.procesos, 'teorias': self.server.teorias})
+        else:
+            self.responder_json(404, {'error': f'Ruta desconocida {self.path}'})
+
+    def do_POST(self) -> None:
+        inicio = time.perf_counter()
+        ruta = self.path
+        if ruta.strip('/') not in CONSULTAS and not ruta.startswith('/teorias/'):
+            self.responder_json(404, {'error': f'Ruta desconocida {ruta}'})
+            return
+        try:
+            longitud = int(self.headers.get('Content-Length', 0))
+            cuerpo = json.loads(self.rfile.read(longitud) or b'{}')
+            if not isinstance(cuerpo, dict):
+                raise ValueError('se esperaba un objeto')
+        except ValueError as e:
+            self.responder_json(400, {'error': f'JSON inválido: {e}'})
+            return
+        clave = '/teorias' if ruta.startswith('/teorias/') else ruta
+        try:
+            salida = self.server.pool.apply_async(_atender, (ruta, cuerpo)).get(timeout=self.server.espera)
+        except mp.TimeoutError:
+            self.server.contadores.registrar(clave, time.perf_counter() - inicio, True)
+            self.responder_json(504, {'id': cuerpo.get('id'), 'error': f'Sin respuesta de los trabajadores en {self.server.espera} s'})
+            return
+        self.server.contadores.registrar(clave, time.perf_counter() - inicio, 'error' in salida)
+        self.responder_json(200, salida)
+
+    def address_string(self) -> str:
+        # En un socket Unix la dirección del cliente es una cadena vacía
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, formato, *args) -> None:
+        if self.server.debug:
+            super().log_message(formato, *args)
+
+
+class Servidor(ThreadingHTTPServer):
+    '''
+    Servidor HTTP con hilos por conexión. El trabajo pesado se hace en
+    un pool de procesos creado al arrancar, así que todos los
+    trabajadores están inicializados antes de la primera consulta. Las
+    teorías se compilan antes de crear el pool, de modo que una teoría
+    inválida hace fallar el arranque en lugar de los trabajadores.
+    '''
+    daemon_threads = True
+
+    def __init__(
+                self,
+                direccion,
+                procesos:int=1,
+                configuracion:Optional[dict]=None,
+                teorias:Optional[Dict[str, List[str]]]=None,
+                unix:bool=False,
+                espera:Optional[float]=60
+            ) -> None:
+        '''
+        Input:
+            - direccion, (host, puerto) o ruta del socket Unix
+            - procesos, número de procesos trabajadores
+            - configuracion, opciones para lote.crear_tester
+            - teorias, diccionario nombre => lista de premisas
+            - unix, si es True direccion es un socket Unix
+            - espera, segundos que una petición espera a un trabajador
+                        antes de responder 504 (None espera sin límite)
+        '''
+        global _bases
+        configuracion = configuracion or {}
+        teorias = teorias or {}
+        lote.crear_tester(configuracion)
+        bases = compilar_teorias(configuracion, teorias)
+        # server_close se llama también si falla el bind
+        self.pool = None
+        if unix:
+            self.address_family = socket.AF_UNIX
+            if os.path.exists(direccion):
+                os.remove(direccion)
+        super().__init__(direccion, Manejador)
+        self.debug = False
+        self.procesos = procesos
+        self.teorias = sorted(teorias)
+        self.espera = espera
+        self.contadores = Contadores()
+        metodos = mp.get_all_start_methods()
+        ctx = mp.get_context('fork' if 'fork' in metodos else None)
+        if ctx.get_start_method() == 'fork':
+            # Los trabajadores heredan las bases ya compiladas
+            _bases = bases
+            teorias = None
+        else:
+            for base in bases.values():
+                base.close()
+        self.pool = ctx.Pool(procesos, initializer=_inicializar, initargs=(configuracion, teorias))
+
+    def server_bind(self) -> None:
+        if self.address_family == socket.AF_UNIX:
+            # HTTPServer.server_bind espera una dirección (host, puerto)
+            self.socket.bind(self.server_address)
+            self.server_name, self.server_port = 'localhost', 0
+        else:
+            super().server_bind()
+
+    def server_close(self) -> None:
+        super().server_close()
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+        if self.address_family == socket.AF_UNIX and os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+def main(argumentos:Optional[List[str]]=None) -> int:
+    parser = argparse.ArgumentParser(description='Servidor local de consultas de groundedPL.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--socket', default=None, help='ruta de un socket Unix (en lugar de host y puerto)')
+    parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--teorias', default=None, help='archivo JSON nombre => lista de premisas')
+    parser.add_argument('--timeout', type=float, default=None, help='segundos de solver por consulta')
+    parser.add_argument('--solver', default=solvers.DEFAULT_SOLVER)
+    parser.add_argument('--espera', type=float, default=60, help='segundos de espera por un trabajador antes de responder 504')
+    parser.add_argument('--debug', action='store_true')
+    args = parser.parse_args(argumentos)
+    solvers.check_solver(args.solver)
+    teorias = {}
+    if args.teorias is not None:
+        with open(args.teorias, encoding='utf-8') as archivo:
+            teorias = json.load(archivo)
+    configuracion = {'timeout': args.timeout, 'solver': args.solver}
+    direccion = args.socket if args.socket is not None else (args.host, args.puerto)
+    try:
+        servidor = Servidor(
+            direccion, procesos=args.procesos, configuracion=configuracion,
+            teorias=teorias, unix=args.socket is not None, espera=args.espera
+        )
+    except Exception as e:
+        print(e, file=sys.stderr)
+        return 1
+    servidor.debug = args.debug
+
+    def terminar(*_):
+        raise KeyboardInterrupt
+
+    # SIGTERM cierra igual que Ctrl-C (termina el pool y borra el socket)
+    signal.signal(signal.SIGTERM, terminar)
+    print(f'Escuchando en {args.socket or f"http://{args.host}:{args.puerto}"} con {args.procesos} procesos', file=sys.stderr)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
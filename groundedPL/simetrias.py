@@ -0,0 +1,210 @@
+'''
+Ruptura de simetrías entre constantes intercambiables.
+
+Una permutación de constantes que deja igual la oración (salvo el orden
+de conjunciones y disyunciones), los hechos conocidos y los dominios
+también deja igual la teoría fundamentada, pues los cuantificadores se
+instancian con todo su dominio. Sus modelos se reparten entonces en
+órbitas equivalentes, y basta con buscar el menor de cada órbita en el
+orden lexicográfico de los átomos (restricciones lex-leader).
+'''
+from typing import Dict, List, Optional, Tuple
+
+from groundedPL.logUtils import LogUtils
+from groundedPL.analizador import AnalizadorLPO
+
+
+class Simetrias:
+    '''
+    Detecta clases de constantes intercambiables de una oración en un
+    modelo y genera las cláusulas lex-leader para las transposiciones
+    de constantes consecutivas de cada clase. Cualquier transposición
+    dentro de una clase es una simetría, así que las clases se
+    construyen probando cada constante solo contra el representante de
+    cada clase.
+    '''
+
+    def __init__(self, modelo, formula, limite:Optional[int]=None) -> None:
+        '''
+        Input:
+            - modelo, Modelo en el que se fundamenta la oración (ya poblado con ella)
+            - formula, oración cerrada de nltk o de AnalizadorLPO, tal como
+                        se va a fundamentar
+            - limite, máximo de átomos comparados por transposición (None
+                        compara todos); truncar la comparación sigue siendo correcto
+        '''
+        self.limite = limite
+        self.formula = formula
+        # El vocabulario y el descriptor se reemplazan (no se modifican) al
+        # crecer el modelo, así que basta con guardar las referencias
+        self.vocabulario = modelo.vocabulario
+        self.descriptor = modelo.descriptor
+        # Primera posición de cada nombre en el vocabulario (como list.index)
+        self.indices = {}
+        for i, nombre in enumerate(self.vocabulario):
+            self.indices.setdefault(nombre, i)
+        self.aridades = {p.nombre: p.aridad for p in modelo.predicados}
+        self.firmas = {}
+        for tipo in modelo.entidades:
+            for c in modelo.entidades[tipo]:
+                dominios = tuple(sorted(d for d in modelo.dominios if c.nombre in modelo.dominios[d]))
+                self.firmas[c.nombre] = (tipo, dominios)
+        analizador = AnalizadorLPO()
+        self.hechos = [(analizador.parse(clave), valor) for clave, valor in modelo.hechos.items()]
+        self.mencionadas = set(str(c.nombre) for c in LogUtils.obtener_vocabulario(formula)[0])
+        for hecho, _ in self.hechos:
+            self.mencionadas.update(c.nombre for c in LogUtils.obtener_vocabulario(hecho)[0])
+        self.original = self.canonica(formula, {})
+        self.hechos_originales = self.canonica_hechos({})
+        self.clases = self.detectar()
+        self.num_clausulas = 0
+
+    def canonica(self, formula, sustitucion:Dict[str, str]) -> tuple:
+        '''
+        Forma canónica de la fórmula con las constantes cambiadas según
+        sustitucion: las conjunciones y disyunciones se aplanan y sus
+        miembros se ordenan, igual que los dos lados de un bicondicional.
+        '''
+        tipo = LogUtils.obtener_type(formula)
+        if tipo == 'ApplicationExpression':
+            argumentos = tuple(sustitucion.get(str(a), str(a)) for a in formula.args)
+            return (tipo, str(formula.pred), argumentos)
+        elif tipo == 'EqualityExpression':
+            argumentos = tuple(sustitucion.get(str(a), str(a)) for a in (formula.first, formula.second))
+            return (tipo,) + argumentos
+        elif tipo == 'NegatedExpression':
+            return (tipo, self.canonica(formula.term, sustitucion))
+        elif tipo in ['AndExpression', 'OrExpression']:
+            miembros = []
+            pila = [formula]
+            while pila:
+                f = pila.pop()
+                if LogUtils.obtener_type(f) == tipo:
+                    pila.append(f.second)
+                    pila.append(f.first)
+                else:
+                    miembros.append(self.canonica(f, sustitucion))
+            return (tipo, tuple(sorted(miembros)))
+        elif tipo == 'ImpExpression':
+            return (tipo, self.canonica(formula.first, sustitucion), self.canonica(formula.second, sustitucion))
+        elif tipo == 'IffExpression':
+            lados = sorted([self.canonica(formula.first, sustitucion), self.canonica(formula.second, sustitucion)])
+            return (tipo,) + tuple(lados)
+        elif tipo in ['AllExpression', 'ExistsExpression']:
+            dominio = getattr(formula, 'dominio', None) or ''
+            return (tipo, formula.variable.name, dominio, self.canonica(formula.term, sustitucion))
+        raise Exception(f'¡Tipo de expresión desconocido! {tipo}')
+
+    def canonica_hechos(self, sustitucion:Dict[str, str]) -> set:
+        return set((self.canonica(hecho, sustitucion), valor) for hecho, valor in self.hechos)
+
+    def intercambiables(self, a:str, b:str) -> bool:
+        '''
+        Determina si la transposición de a y b deja igual la oración y los hechos.
+        '''
+        if self.firmas[a] != self.firmas[b]:
+            return False
+        if a not in self.mencionadas and b not in self.mencionadas:
+            return True
+        sustitucion = {a: b, b: a}
+        if self.canonica(self.formula, sustitucion) != self.original:
+            return False
+        return len(self.hechos) == 0 or self.canonica_hechos(sustitucion) == self.hechos_originales
+
+    def detectar(self) -> List[List[str]]:
+        '''
+        Output:
+            - clases, listas de constantes intercambiables (de al menos dos)
+        '''
+        clases = []
+        for c in self.firmas:
+            for clase in clases:
+                if self.intercambiables(clase[0], c):
+                    clase.append(c)
+                    break
+            else:
+                clases.append([c])
+        return [clase for clase in clases if len(clase) > 1]
+
+    def permutar(self, atomo:str, a:str, b:str) -> str:
+        '''
+        Átomo (codificado) que resulta de intercambiar las constantes a y b.
+        '''
+        lista_valores = list(self.descriptor.decodifica(atomo))
+        aridad = self.aridades[self.vocabulario[lista_valores[0]]]
+        i, j = self.indices[a], self.indices[b]
+        for k in range(1, aridad + 1):
+            if lista_valores[k] == i:
+                lista_valores[k] = j
+            elif lista_valores[k] == j:
+                lista_valores[k] = i
+        return self.descriptor.codifica(lista_valores)
+
+    def ordenar(self, atomos:List[str]) -> List[str]:
+        '''
+        Ordena los átomos por predicado y luego por argumentos (según su
+        posición en el vocabulario). Con este orden, la transposición de
+        dos constantes compara primero las filas o columnas en que
+        aparecen, lo que rompe mucho más que el orden de Tseitin.
+        '''
+        return sorted(atomos, key=lambda x: tuple(self.descriptor.decodifica(x)))
+
+    def pares(self, atomos:List[str], a:str, b:str) -> List[Tuple[str, str]]:
+        '''
+        Pares (x, imagen de x) que compara la restricción lex-leader de la
+        transposición de a y b, en el orden de ordenar. Se omiten los
+        átomos fijos y los pares (y, x) posteriores a un par (x, y), que
+        se cumplen siempre que el prefijo sea igual.
+        '''
+        conjunto = set(atomos)
+        pares = []
+        vistos = set()
+        for x in self.ordenar(atomos):
+            y = self.permutar(x, a, b)
+            if y == x or x in vistos:
+                continue
+            if y not in conjunto:
+                # Solo pasa si la teoría no es simétrica en este átomo: se
+                # trunca la comparación, lo cual sigue siendo correcto
+                break
+            vistos.add(y)
+            pares.append((x, y))
+            if self.limite is not None and len(pares) >= self.limite:
+                break
+        return pares
+
+    def clausulas(self, atomos:List[str]) -> List[List[str]]:
+        '''
+        Cláusulas lex-leader, como listas de literales, para las
+        transposiciones de constantes consecutivas de cada clase.
+        Input:
+            - atomos, letras proposicionales de la fórmula fundamentada
+        Output:
+            - clausal, cláusulas con variables auxiliares lex<k>_<i>, donde
+                        lex<k>_<i> es verdadera sii los primeros i + 1 pares
+                        de la transposición k son iguales
+        '''
+        clausal = []
+        k = 0
+        for clase in self.clases:
+            for a, b in zip(clase, clase[1:]):
+                pares = self.pares(atomos, a, b)
+                if len(pares) == 0:
+                    continue
+                igual = [f'lex{k}_{i}' for i in range(len(pares))]
+                k += 1
+                for i, (x, y) in enumerate(pares):
+                    previo = [f'-{igual[i - 1]}'] if i > 0 else []
+                    # Si el prefijo es igual, x <= y
+                    clausal.append(previo + [f'-{x}', y])
+                    if i == len(pares) - 1:
+                        continue
+                    # igual[i] sii prefijo igual y x == y
+                    if i > 0:
+                        clausal.append([f'-{igual[i]}', igual[i - 1]])
+                    clausal.append([f'-{igual[i]}', f'-{x}', y])
+                    clausal.append([f'-{igual[i]}', x, f'-{y}'])
+                    clausal.append(previo + [igual[i], x, y])
+                    clausal.append(previo + [igual[i], f'-{x}', f'-{y}'])
+        self.num_clausulas += len(clausal)
+        return clausal
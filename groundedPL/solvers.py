@@ -0,0 +1,320 @@
+'''
+Solvers SAT (backends de pysat) que usa LogicTester.
+'''
+import queue as queue_
+import threading
+import time
+import multiprocessing as mp
+
+from typing import List, Optional, Tuple, Union
+from pysat.solvers import Solver, SolverNames
+
+
+DEFAULT_SOLVER = 'minisat22'
+UNKNOWN = 'UNKNOWN'
+# Backends cuyos bindings de pysat no se pueden interrumpir; sus límites
+# de tiempo se hacen cumplir corriéndolos en otro proceso
+NO_INTERRUPT = ('cadical103', 'cadical153', 'cadical195', 'cadical300', 'kissat404', 'lingeling')
+# Backends sin límite de conflictos o de propagaciones en pysat
+NO_CONF_BUDGET = ('lingeling',)
+NO_PROP_BUDGET = ('cadical103', 'cadical153', 'cadical195', 'cadical300', 'kissat404', 'lingeling')
+
+
+class Interrupt:
+    '''
+    Permite detener desde otro hilo una resolución en curso.
+    '''
+
+    def __init__(self) -> None:
+        self.cancelled = False
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    def cancel(self) -> None:
+        '''
+        Interrumpe la resolución, que entonces devuelve UNKNOWN.
+        '''
+        with self._lock:
+            self.cancelled = True
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback()
+
+    def attach(self, callback) -> None:
+        '''
+        Registra una función a llamar al cancelar. Si ya se había
+        cancelado, la función se llama de inmediato.
+        '''
+        with self._lock:
+            self._callbacks.append(callback)
+            cancelled = self.cancelled
+        if cancelled:
+            callback()
+
+    def detach(self, callback) -> None:
+        with self._lock:
+            self._callbacks.remove(callback)
+
+
+def available_solvers() -> List[str]:
+    '''
+    Lista los backends de pysat que se pueden instanciar en esta instalación.
+    '''
+    names = []
+    for name in vars(SolverNames):
+        if name.startswith('_'):
+            continue
+        try:
+            with Solver(name=name):
+                names.append(name)
+        except Exception:
+            pass
+    return names
+
+
+def check_solver(name:str) -> str:
+    '''
+    Verifica que el nombre de un solver (o uno de sus alias en pysat)
+    exista y devuelve el nombre canónico.
+    '''
+    for canonical, aliases in vars(SolverNames).items():
+        if not canonical.startswith('_') and name in aliases:
+            return canonical
+    raise Exception(f'Error: Unknown solver {name}. Available solvers: {available_solvers()}')
+
+
+def check_budgets(solver:str, conf_budget:Optional[int]=None, prop_budget:Optional[int]=None) -> None:
+    '''
+    Verifica que el solver admita los límites pedidos, en lugar de dejar
+    que pysat lance NotImplementedError al resolver.
+    '''
+    if conf_budget is not None and solver in NO_CONF_BUDGET:
+        raise Exception(f'Error: Solver {solver} does not support conf_budget; use a different backend')
+    if prop_budget is not None and solver in NO_PROP_BUDGET:
+        raise Exception(f'Error: Solver {solver} does not support prop_budget; use a different backend')
+
+
+def solve(
+            clauses:List[List[int]],
+            solver:str=DEFAULT_SOLVER,
+            timeout:Optional[float]=None,
+            conf_budget:Optional[int]=None,
+            prop_budget:Optional[int]=None,
+            interrupt:Optional[Interrupt]=None
+        ) -> Union[List[int], str]:
+    '''
+    Resuelve una FNC con un solo backend.
+    Input:
+        - clauses, lista (o iterador) de listas de enteros
+        - solver, nombre del solver de pysat
+        - timeout, límite de tiempo real en segundos
+        - conf_budget, límite de conflictos
+        - prop_budget, límite de propagaciones
+        - interrupt, objeto Interrupt para cancelar desde otro hilo
+    Output:
+        - model, lista de enteros, 'UNSAT', o 'UNKNOWN' si se alcanzó un
+                    límite o se canceló
+    '''
+    solver = check_solver(solver)
+    check_budgets(solver, conf_budget, prop_budget)
+    limited = timeout is not None or conf_budget is not None or prop_budget is not None or interrupt is not None
+    if not limited:
+        with Solver(name=solver, bootstrap_with=clauses) as m:
+            if m.solve():
+                return m.get_model()
+            return 'UNSAT'
+    if solver in NO_INTERRUPT and (timeout is not None or interrupt is not None):
+        return solve_portfolio(
+            clauses, [solver], timeout=timeout, conf_budget=conf_budget,
+            prop_budget=prop_budget, interrupt=interrupt, processes=True
+        )[0]
+    if interrupt is not None and interrupt.cancelled:
+        return UNKNOWN
+    with Solver(name=solver, bootstrap_with=clauses) as m:
+        if conf_budget is not None:
+            m.conf_budget(conf_budget)
+        if prop_budget is not None:
+            m.prop_budget(prop_budget)
+        timer = None
+        if timeout is not None:
+            timer = threading.Timer(timeout, m.interrupt)
+            timer.start()
+        if interrupt is not None:
+            interrupt.attach(m.interrupt)
+        try:
+            res = m.solve_limited(expect_interrupt=True)
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if interrupt is not None:
+                interrupt.detach(m.interrupt)
+        if res is None:
+            return UNKNOWN
+        elif res:
+            return m.get_model()
+        return 'UNSAT'
+
+
+def _portfolio_worker(clauses:List[List[int]], solver:str, conf_budget, prop_budget, queue) -> None:
+    try:
+        queue.put((solver, solve(clauses, solver, conf_budget=conf_budget, prop_budget=prop_budget)))
+    except Exception as e:
+        queue.put((solver, e))
+
+
+def solve_portfolio(
+            clauses:List[List[int]],
+            solvers:List[str],
+            timeout:Optional[float]=None,
+            conf_budget:Optional[int]=None,
+            prop_budget:Optional[int]=None,
+            interrupt:Optional[Interrupt]=None,
+            processes:bool=False
+        ) -> Tuple[Union[List[int], str], str]:
+    '''
+    Pone a competir varios backends sobre la misma FNC, cada uno en su
+    proceso. Gana la primera respuesta y los demás procesos se terminan.
+    Input:
+        - clauses, lista (o iterador) de listas de enteros
+        - solvers, lista de nombres de solvers de pysat
+        - timeout, conf_budget, prop_budget, interrupt, como en solve
+        - processes, si es True también un solo solver corre en otro proceso
+    Output:
+        - model, lista de enteros, 'UNSAT' o 'UNKNOWN'
+        - solver, nombre del backend que respondió primero (None si UNKNOWN)
+    '''
+    solvers = [check_solver(s) for s in solvers]
+    for s in solvers:
+        check_budgets(s, conf_budget, prop_budget)
+    if len(solvers) == 1 and not processes:
+        res = solve(
+            clauses, solvers[0], timeout=timeout, conf_budget=conf_budget,
+            prop_budget=prop_budget, interrupt=interrupt
+        )
+        return res, (solvers[0] if res != UNKNOWN else None)
+    if interrupt is not None and interrupt.cancelled:
+        return UNKNOWN, None
+    # Con fork los hijos heredan las cláusulas en lugar de recibirlas serializadas
+    methods = mp.get_all_start_methods()
+    ctx = mp.get_context('fork' if 'fork' in methods else None)
+    if ctx.get_start_method() != 'fork' and not isinstance(clauses, list):
+        # Un iterador de cláusulas no se puede serializar
+        clauses = list(clauses)
+    queue = ctx.Queue()
+    workers = [
+        ctx.Process(target=_portfolio_worker, args=(clauses, s, conf_budget, prop_budget, queue), daemon=True)
+            for s in solvers
+    ]
+    for p in workers:
+        p.start()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        errors = []
+        unknown = 0
+        while len(errors) + unknown < len(workers):
+            if interrupt is not None and interrupt.cancelled:
+                return UNKNOWN, None
+            wait = 0.05
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return UNKNOWN, None
+                wait = min(wait, remaining)
+            try:
+                solver, res = queue.get(timeout=wait)
+            except queue_.Empty:
+                continue
+            if isinstance(res, Exception):
+                errors.append(f'{solver}: {res}')
+            elif res == UNKNOWN:
+                unknown += 1
+            else:
+                return res, solver
+        if unknown > 0:
+            return UNKNOWN, None
+        raise Exception('Error: Every solver in the portfolio failed\n' + '\n'.join(errors))
+    finally:
+        for p in workers:
+            if p.is_alive():
+                p.terminate()
+        for p in workers:
+            p.join()
+        queue.close()
+
+
+def solve_with_core(
+            clauses:List[List[int]],
+            assumptions:List[int],
+            solver:str=DEFAULT_SOLVER,
+            minimize:bool=False,
+            timeout:Optional[float]=None,
+            conf_budget:Optional[int]=None,
+            prop_budget:Optional[int]=None,
+            interrupt:Optional[Interrupt]=None
+        ) -> Tuple[Union[List[int], str], Optional[List[int]]]:
+    '''
+    Resuelve una FNC bajo suposiciones y, si es insatisfacible, devuelve
+    el subconjunto de suposiciones que usó el solver para refutarla.
+    Input:
+        - clauses, lista de listas de enteros
+        - assumptions, lista de literales enteros que se suponen verdaderos
+        - solver, nombre del solver de pysat
+        - minimize, si es True el núcleo se reduce quitando suposiciones,
+                    sobre el mismo solver, hasta que ninguna sobre
+        - timeout, conf_budget, prop_budget, interrupt, como en solve. Los
+                    límites cubren toda la llamada; si se alcanzan mientras
+                    se minimiza, se devuelve el núcleo actual (que es válido)
+    Output:
+        - model, lista de enteros, 'UNSAT' o 'UNKNOWN'
+        - core, lista de literales de suposición si es UNSAT, si no None
+    '''
+    solver = check_solver(solver)
+    check_budgets(solver, conf_budget, prop_budget)
+    if solver in NO_INTERRUPT and (timeout is not None or interrupt is not None):
+        raise Exception(f'Error: Solver {solver} cannot be interrupted; use a different backend for cores with timeouts')
+    if interrupt is not None and interrupt.cancelled:
+        return UNKNOWN, None
+    with Solver(name=solver, bootstrap_with=clauses) as m:
+
+        def limited(assumed:List[int]) -> Optional[bool]:
+            if conf_budget is not None:
+                m.conf_budget(conf_budget)
+            if prop_budget is not None:
+                m.prop_budget(prop_budget)
+            if conf_budget is None and prop_budget is None and timeout is None and interrupt is None:
+                return m.solve(assumptions=assumed)
+            return m.solve_limited(assumptions=assumed, expect_interrupt=True)
+
+        timer = None
+        if timeout is not None:
+            timer = threading.Timer(timeout, m.interrupt)
+            timer.start()
+        if interrupt is not None:
+            interrupt.attach(m.interrupt)
+        try:
+            res = limited(assumptions)
+            if res is None:
+                return UNKNOWN, None
+            elif res:
+                return m.get_model(), None
+            core = m.get_core() or []
+            if minimize:
+                i = 0
+                while i < len(core):
+                    candidate = core[:i] + core[i + 1:]
+                    res = limited(candidate)
+                    if res is None:
+                        break
+                    elif res:
+                        # core[i] es necesaria
+                        i += 1
+                    else:
+                        # El nuevo núcleo puede quitar más que core[i]
+                        kept = set(m.get_core() or [])
+                        core = [l for l in candidate if l in kept]
+            return 'UNSAT', core
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if interrupt is not None:
+                interrupt.detach(m.interrupt)
@@ -0,0 +1,286 @@
+'''
+Restricciones de tableros (tipo buscaminas) escritas directamente
+como cláusulas de enteros, sin pasar por fórmulas de primer orden.
+
+Los predicados son los del cuaderno: MINA(x,y), ELECCION(x,y) y
+NUM(x,y,n). Se declaran en un Modelo (con dominios fila, columna y
+numero), de modo que los modelos se decodifican con su vocabulario.
+Los átomos se numeran de forma densa por aritmética, sin pasar por el
+Descriptor, cuyo rango de caracteres no alcanza para tableros grandes.
+'''
+import numpy as np
+
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from pysat.solvers import Solver
+
+from groundedPL import solvers
+from groundedPL.codificacion import Modelo
+from groundedPL.tseitin import TseitinTransform
+
+
+NUMEROS = 9
+
+
+class Tablero:
+    '''
+    Genera las reglas de un tablero de filas x columnas:
+        - exclusividad: a lo sumo un número por casilla, y una casilla
+                    con número no tiene mina
+        - conteo: NUM(x,y,n) implica que exactamente n vecinos tienen
+                    mina (con un totalizador por casilla)
+        - elección: ELECCION(x,y) sii la casilla no tiene mina ni número
+    Las cláusulas se guardan en un arreglo de int32, cada una terminada en 0.
+    '''
+
+    def __init__(self, filas:int, columnas:int, modelo:Optional[Modelo]=None, diagonales:bool=True) -> None:
+        '''
+        Input:
+            - filas, columnas, tamaño del tablero
+            - modelo, Modelo en el que se declaran dominios y predicados
+                        (por defecto, uno nuevo)
+            - diagonales, si es False los vecinos son solo los 4 ortogonales
+        '''
+        self.filas = filas
+        self.columnas = columnas
+        self.diagonales = diagonales
+        self.modelo = modelo if modelo is not None else Modelo()
+        self.declarar()
+        # Numeración densa: MINA, ELECCION y NUM ocupan bloques consecutivos
+        casillas = filas * columnas
+        self.bloques = {
+            'MINA': 1,
+            'ELECCION': 1 + casillas,
+            'NUM': 1 + 2 * casillas,
+        }
+        self.num_variables = 2 * casillas + casillas * NUMEROS
+        self.num_atomos = self.num_variables
+        self.clausulas = array('i')
+        self.num_clausulas = 0
+        self._vocabulario = None
+        self._indices = {}
+
+    def declarar(self) -> None:
+        '''
+        Declara en el modelo los dominios, los predicados y sus firmas.
+        '''
+        modelo = self.modelo
+        modelo.declarar_dominio('fila', range(self.filas))
+        modelo.declarar_dominio('columna', range(self.columnas))
+        modelo.declarar_dominio('numero', range(NUMEROS))
+        modelo.poblar_con(modelo.nltk_log_parser.parse('(MINA(0,0) & ELECCION(0,0) & NUM(0,0,0))'))
+        modelo.declarar_firma('MINA', ['fila', 'columna'])
+        modelo.declarar_firma('ELECCION', ['fila', 'columna'])
+        modelo.declarar_firma('NUM', ['fila', 'columna', 'numero'])
+
+    def var(self, predicado:str, x:int, y:int, n:Optional[int]=None) -> int:
+        '''
+        Variable del átomo predicado(x,y) o NUM(x,y,n).
+        '''
+        casilla = x * self.columnas + y
+        if predicado == 'NUM':
+            return self.bloques['NUM'] + casilla * NUMEROS + n
+        return self.bloques[predicado] + casilla
+
+    def atomo(self, v:int) -> str:
+        '''
+        Decodifica una variable como átomo, con los nombres del vocabulario del modelo.
+        '''
+        if v > self.num_atomos:
+            raise Exception(f'Error: {v} es una variable auxiliar.')
+        vocabulario = self.modelo.vocabulario
+        if v >= self.bloques['NUM']:
+            casilla, n = divmod(v - self.bloques['NUM'], NUMEROS)
+            x, y = divmod(casilla, self.columnas)
+            predicado, argumentos = 'NUM', [x, y, n]
+        else:
+            predicado = 'ELECCION' if v >= self.bloques['ELECCION'] else 'MINA'
+            argumentos = list(divmod(v - self.bloques[predicado], self.columnas))
+        # Mismo formato que Modelo.decodificar
+        argumentos = ', '.join(vocabulario[self.indices[str(a)]] for a in argumentos)
+        return f'{predicado}({argumentos})'
+
+    @property
+    def indices(self) -> Dict[str, int]:
+        '''
+        Índice de cada nombre en el vocabulario del modelo (se recalcula
+        si el vocabulario cambió).
+        '''
+        vocabulario = self.modelo.vocabulario
+        if self._vocabulario is not vocabulario:
+            self._vocabulario = vocabulario
+            self._indices = {nombre: i for i, nombre in enumerate(vocabulario)}
+        return self._indices
+
+    def nueva_variable(self) -> int:
+        self.num_variables += 1
+        return self.num_variables
+
+    def agregar(self, clausula:List[int]) -> None:
+        self.clausulas.extend(clausula)
+        self.clausulas.append(0)
+        self.num_clausulas += 1
+
+    def vecinos(self, x:int, y:int) -> List[Tuple[int, int]]:
+        if self.diagonales:
+            candidatos = [(x + i, y + j) for i in (-1, 0, 1) for j in (-1, 0, 1) if (i, j) != (0, 0)]
+        else:
+            candidatos = [(x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)]
+        return [(a, b) for a, b in candidatos if 0 <= a < self.filas and 0 <= b < self.columnas]
+
+    def totalizador(self, entradas:List[int]) -> List[int]:
+        '''
+        Codifica la suma de las entradas en unario.
+        Output:
+            - salidas, lista de variables donde salidas[j - 1] es
+                        verdadera sii al menos j entradas son verdaderas
+        '''
+        if len(entradas) <= 1:
+            return list(entradas)
+        mitad = len(entradas) // 2
+        a = self.totalizador(entradas[:mitad])
+        b = self.totalizador(entradas[mitad:])
+        p, q = len(a), len(b)
+        r = [self.nueva_variable() for _ in range(p + q)]
+        for i in range(p + 1):
+            for j in range(q + 1):
+                # a_i y b_j implican r_{i+j}
+                if i + j > 0:
+                    self.agregar(
+                        ([-a[i - 1]] if i > 0 else []) + ([-b[j - 1]] if j > 0 else []) + [r[i + j - 1]]
+                    )
+                # no a_{i+1} y no b_{j+1} implican no r_{i+j+1}
+                if i + j < p + q:
+                    self.agregar(
+                        ([a[i]] if i < p else []) + ([b[j]] if j < q else []) + [-r[i + j]]
+                    )
+        return r
+
+    def reglas(self) -> None:
+        '''
+        Agrega las reglas de exclusividad, conteo y elección.
+        '''
+        for x in range(self.filas):
+            for y in range(self.columnas):
+                mina = self.var('MINA', x, y)
+                eleccion = self.var('ELECCION', x, y)
+                nums = [self.var('NUM', x, y, n) for n in range(NUMEROS)]
+                # Exclusividad
+                for i, u in enumerate(nums):
+                    self.agregar([-u, -mina])
+                    for w in nums[i + 1:]:
+                        self.agregar([-u, -w])
+                # Conteo
+                vecinos = [self.var('MINA', a, b) for a, b in self.vecinos(x, y)]
+                k = len(vecinos)
+                suma = self.totalizador(vecinos)
+                for n, u in enumerate(nums):
+                    if n > k:
+                        self.agregar([-u])
+                        continue
+                    if n >= 1:
+                        self.agregar([-u, suma[n - 1]])
+                    if n < k:
+                        self.agregar([-u, -suma[n]])
+                # Elección
+                self.agregar([-eleccion, -mina])
+                for u in nums:
+                    self.agregar([-eleccion, -u])
+                self.agregar([eleccion, mina] + nums)
+
+    def observar(self, tablero:Dict[Tuple[int, int], Optional[int]]) -> None:
+        '''
+        Fija el estado visible: cada casilla destapada con su número, y
+        las tapadas sin número (como regla_tablero en el cuaderno).
+        Input:
+            - tablero, diccionario (x, y) => número, o None si está tapada;
+                        las casillas ausentes quedan sin restricción
+        '''
+        for (x, y), n in tablero.items():
+            if n is None:
+                for m in range(NUMEROS):
+                    self.agregar([-self.var('NUM', x, y, m)])
+            else:
+                self.agregar([self.var('NUM', x, y, n)])
+
+    def agregar_formula(self, formula) -> None:
+        '''
+        Agrega una fórmula de primer orden sobre los mismos predicados,
+        fundamentada y codificada con el pipeline usual. Sus átomos se
+        traducen a las variables del tablero a través del vocabulario del
+        modelo, así que solo sirve mientras los códigos del Descriptor
+        caben en un carácter (tableros pequeños).
+        '''
+        modelo = self.modelo
+        if isinstance(formula, str):
+            formula = modelo.nltk_log_parser.parse(formula)
+        formula_lp = modelo.codificar_lp(modelo.fundamentar(formula))
+        tseitin = TseitinTransform()
+        clausal = tseitin.tseitin(formula_lp)
+        variables = {a: self.nueva_variable() for a in tseitin.atomos_tseitin}
+        for a in tseitin.atomos:
+            indices = modelo.descriptor.decodifica(a)
+            nombre = modelo.vocabulario[indices[0]]
+            argumentos = [int(modelo.vocabulario[i]) for i in indices[1:4 if nombre == 'NUM' else 3]]
+            variables[a] = self.var(nombre, *argumentos)
+        for C in clausal:
+            self.agregar([-variables[l[1:]] if l[0] == '-' else variables[l] for l in C])
+
+    def iterar_clausulas(self) -> Iterator[List[int]]:
+        literales = np.frombuffer(self.clausulas, dtype=np.int32)
+        inicio = 0
+        for fin in np.flatnonzero(literales == 0).tolist():
+            yield literales[inicio:fin].tolist()
+            inicio = fin + 1
+
+    def solver(self, nombre:str=solvers.DEFAULT_SOLVER) -> Solver:
+        '''
+        Crea un solver incremental con todas las cláusulas.
+        '''
+        s = Solver(name=solvers.check_solver(nombre))
+        s.append_formula(self.iterar_clausulas())
+        return s
+
+    def resolver(self, nombre:str=solvers.DEFAULT_SOLVER) -> Union[List[int], str]:
+        with self.solver(nombre) as s:
+            if s.solve():
+                return s.get_model()
+            return 'UNSAT'
+
+    def deducir(self, casillas:List[Tuple[int, int]], nombre:str=solvers.DEFAULT_SOLVER) -> Dict[Tuple[int, int], Optional[bool]]:
+        '''
+        Para cada casilla dice si tiene mina con certeza (True), si es
+        segura con certeza (False) o si no se puede deducir (None), con
+        dos consultas por casilla sobre el mismo solver incremental.
+        '''
+        deducciones = {}
+        with self.solver(nombre) as s:
+            for x, y in casillas:
+                mina = self.var('MINA', x, y)
+                if not s.solve(assumptions=[mina]):
+                    deducciones[(x, y)] = False
+                elif not s.solve(assumptions=[-mina]):
+                    deducciones[(x, y)] = True
+                else:
+                    deducciones[(x, y)] = None
+        return deducciones
+
+    def decodificar(self, modelo:List[int]) -> List[str]:
+        '''
+        Átomos verdaderos de un modelo del solver (sin variables auxiliares).
+        '''
+        return [self.atomo(l) for l in modelo if 0 < l <= self.num_atomos]
+
+    def tensores(self, modelo:List[int]) -> Dict[str, np.ndarray]:
+        '''
+        El modelo como arreglos booleanos: MINA y ELECCION de forma
+        (filas, columnas) y NUM de forma (filas, columnas, 9).
+        '''
+        valores = np.asarray(modelo[:self.num_atomos]) > 0
+        casillas = self.filas * self.columnas
+        forma = (self.filas, self.columnas)
+        return {
+            'MINA': valores[:casillas].reshape(forma),
+            'ELECCION': valores[casillas:2 * casillas].reshape(forma),
+            'NUM': valores[2 * casillas:].reshape(forma + (NUMEROS,)),
+        }
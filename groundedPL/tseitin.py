@@ -133,7 +133,7 @@ class TseitinTransform :
         Pila = [] # Inicializamos pila
         i = -1 # Inicializamos contador de variables nuevas
         s = A[0] # Inicializamos símbolo de trabajo
-        pbar = tqdm(total=len(A))
+        pbar = tqdm(total=len(A), disable=not self.debug)
         while len(A) > 0: # Recorremos la cadena
             if self.debug:
                 print(A)
@@ -142,14 +142,12 @@ class TseitinTransform :
                 i += 1
                 atomo = letrasp_tseitin[i]
                 Pila = Pila[:-1]
-                Pila.append(atomo)
                 L.append(atomo + "=-" + s)
                 if self.debug:
                     print(f'A la pila: {atomo + "=-" + s}')
-                    pbar.update(1)
-                A = A[1:]
-                if len(A) > 0:
-                    s = A[0]
+                # El átomo nuevo se procesa como símbolo de trabajo, por si
+                # hay otra negación debajo en la pila (p.ej. --p)
+                s = atomo
             elif s == ')':
                 left = Pila[-3]
                 conectivo = Pila[-2]